@@ -0,0 +1,83 @@
+"""Throughput benchmark for split_text.
+
+Chunks synthetic paper-like text of increasing size and prints MB/s for the
+current chunker and, for comparison, the previous regex-rescanning version.
+
+    poetry run python benchmarks/bench_chunker.py [--sizes 0.1 1 4] [--tokens]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.tools.utils import split_text
+from fixtures import synthetic_text
+
+def legacy_split_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
+    """The chunker this module replaced, kept here as the comparison baseline."""
+    text = re.sub(r'\s+', ' ', text.strip())
+    chunks = []
+    start = 0
+    while start < len(text):
+        ideal_end = start + chunk_size
+        if ideal_end >= len(text):
+            chunk = text[start:].strip()
+            if chunk:
+                chunks.append(chunk)
+            break
+        split_point = _legacy_split_point(text, start, ideal_end, chunk_size)
+        chunk = text[start:split_point].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = max(start + 1, split_point - overlap)
+    return chunks
+
+
+def _legacy_split_point(text: str, start: int, ideal_end: int, chunk_size: int) -> int:
+    search_start = max(start, ideal_end - chunk_size // 4)
+    search_end = min(len(text), ideal_end + chunk_size // 4)
+    search_text = text[search_start:search_end]
+    for pattern in (r'\n\s*\n', r'\n\s*[-=*]{3,}\s*\n', r'\n\s*\d+\.\s*\n', r'[.!?]+\s+', r'\s+'):
+        matches = list(re.finditer(pattern, search_text))
+        if matches:
+            best = min(matches, key=lambda m: abs((search_start + m.end()) - ideal_end))
+            return search_start + best.end()
+    return ideal_end
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1.0, 4.0], help="text sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tokens", action="store_true", help="also benchmark token-measured chunks")
+    parser.add_argument("--no-legacy", action="store_true", help="skip the old implementation")
+    args = parser.parse_args()
+
+    print(f"{'size MB':>8} {'impl':>14} {'chunks':>8} {'seconds':>9} {'MB/s':>9}")
+    for size_mb in args.sizes:
+        text = synthetic_text(int(size_mb * 1024 * 1024))
+        runs = [("split_text", lambda t: split_text(t, 500, 50))]
+        if args.tokens:
+            runs.append(("split_text/tok", lambda t: split_text(t, 128, 16, length="tokens")))
+        if not args.no_legacy:
+            runs.append(("legacy", lambda t: legacy_split_text(t, 500, 50)))
+        for name, fn in runs:
+            chunks = len(fn(text))
+            seconds = bench(fn, text, args.repeat)
+            print(f"{size_mb:8.1f} {name:>14} {chunks:8d} {seconds:9.3f} {size_mb / seconds:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Deterministic synthetic inputs for the benchmarks: paper-like text, PDFs, retrieval hits."""
+import random
+
+WORDS = (
+    "model training data loss gradient attention layer token embedding vector "
+    "retrieval benchmark dataset evaluation baseline transformer network result "
+    "section figure table equation theorem proof lemma arxiv"
+).split()
+
+# Roughly what one page of an arXiv paper extracts to.
+CHARS_PER_PAGE = 3000
+
+
+def synthetic_text(n_chars: int, seed: int = 0) -> str:
+    """Paper-like text: sentences, paragraphs and occasional section dividers."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < n_chars:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = rng.choices(WORDS, k=rng.randint(6, 24))
+            sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+        para = " ".join(sentences)
+        if rng.random() < 0.05:
+            para += "\n---"
+        parts.append(para)
+        size += len(para) + 2
+    return "\n\n".join(parts)[:n_chars]
+
+
+def synthetic_pdf(pages: int, seed: int = 0) -> bytes:
+    """A PDF of `pages` pages, each filled with about CHARS_PER_PAGE of synthetic text."""
+    import fitz
+
+    doc = fitz.open()
+    text = synthetic_text(CHARS_PER_PAGE * pages, seed)
+    for i in range(pages):
+        page = doc.new_page()
+        body = text[i * CHARS_PER_PAGE:(i + 1) * CHARS_PER_PAGE]
+        page.insert_textbox(fitz.Rect(36, 36, page.rect.width - 36, page.rect.height - 36), body, fontsize=7)
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+def synthetic_vector(rng: random.Random, dim: int) -> list[float]:
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+def synthetic_chunks(n: int, chunk_chars: int = 500, seed: int = 0) -> list[str]:
+    text = synthetic_text(n * chunk_chars, seed)
+    return [text[i * chunk_chars:(i + 1) * chunk_chars] for i in range(n)]
+
+
+def synthetic_matches(n: int, chunk_chars: int = 500, seed: int = 0) -> list[dict]:
+    """Query matches as ragService receives them from query_chunks."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"ns-{i:020d}",
+            "score": rng.uniform(0.3, 0.95),
+            "text": chunk,
+            "metadata": {"text": chunk, "title": f"Paper {i % 17}", "section": f"{i % 9 + 1}. Results"},
+        }
+        for i, chunk in enumerate(synthetic_chunks(n, chunk_chars, seed))
+    ]
+
+
+def synthetic_query_response(n: int, dim: int = 1536, include_values: bool = False, seed: int = 0) -> dict:
+    """A vector-store query response shaped like Pinecone's: {"matches": [{id, score, metadata[, values]}]}."""
+    rng = random.Random(seed)
+    matches = []
+    for match in synthetic_matches(n, seed=seed):
+        entry = {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+        if include_values:
+            entry["values"] = synthetic_vector(rng, dim)
+        matches.append(entry)
+    return {"matches": matches}
@@ -0,0 +1,221 @@
+"""Offline micro-benchmarks for the CPU-bound hot paths.
+
+Each case runs on synthetic inputs of growing size (1 to 1000 pages, or the
+equivalent number of chunks/matches) and reports the best time, throughput
+and peak Python heap (tracemalloc, measured in a separate run so it doesn't
+skew timings; memory of the PDF extraction worker processes isn't counted).
+
+    poetry run python benchmarks/run.py                      # run and print
+    poetry run python benchmarks/run.py --save-baseline      # record benchmarks/baseline.json
+    poetry run python benchmarks/run.py --check --tolerance 0.2
+
+--check exits with status 1 when a case's throughput drops, or its peak
+memory grows, by more than the tolerance relative to the baseline. Record
+the baseline on the machine that runs the check; numbers don't transfer
+across hosts.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep every case offline and away from the developer's caches.
+os.environ.setdefault("PDF_CACHE_ENABLED", "0")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")
+os.environ.setdefault("VECTOR_STORE", "local")
+
+from fixtures import (  # noqa: E402
+    CHARS_PER_PAGE, synthetic_text, synthetic_pdf, synthetic_chunks, synthetic_matches, synthetic_query_response,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PAGE_SIZES = (1, 10, 100, 1000)
+# One timing sample loops the case until it takes at least this long.
+MIN_SAMPLE_S = 0.02
+EMBEDDING_DIM = 1536
+
+# setup(size) -> (callable to time, work units per call, unit name)
+Setup = Callable[[int], Tuple[Callable[[], object], float, str]]
+
+
+def _split_text(pages: int):
+    from src.agents.tools.utils import split_text
+
+    text = synthetic_text(pages * CHARS_PER_PAGE)
+    return (lambda: split_text(text, 500, 50)), len(text.encode()) / 1e6, "MB"
+
+def _find_best_split_point(pages: int):
+    from src.agents.tools.utils import find_best_split_point
+
+    text = synthetic_text(pages * CHARS_PER_PAGE)
+    # Each call indexes the whole text, so sample a fixed number of split points.
+    starts = [int(i * (len(text) - 600) / 50) for i in range(50)]
+    return (lambda: [find_best_split_point(text, s, s + 500, 500) for s in starts]), len(starts), "calls"
+
+def _extract_text_from_pdf(pages: int):
+    from src.agents.tools.utils import extract_text_from_pdf
+
+    pdf = synthetic_pdf(pages)
+    return (lambda: extract_text_from_pdf(pdf)), pages, "pages"
+
+def _build_context(pages: int):
+    from src.modules.analysis.ragService import _build_context as build, _context_budget
+
+    matches = synthetic_matches(pages * 6)
+    budget = _context_budget("How does attention scale with sequence length?")
+    return (lambda: build(matches, budget)), len(matches), "matches"
+
+def _upsert_payloads(pages: int):
+    import numpy as np
+    from src.modules.pinecone.pineconeService import _build_payloads
+
+    chunks = synthetic_chunks(pages * 6)
+    # Shaped like get_embeddings output: one float32 matrix.
+    vectors = np.random.default_rng(0).random((len(chunks), EMBEDDING_DIM), dtype=np.float32)
+    meta = {"arxiv_id": "2401.00001", "title": "Synthetic"}
+    return (lambda: _build_payloads(chunks, vectors, "bench", meta)), len(chunks), "chunks"
+
+def _query_payloads(pages: int):
+    from src.modules.pinecone.pineconeService import _to_matches
+    from src.modules.pinecone.pineconeStore import PineconeVectorStore
+    from src.modules.vectorstore.writeBuffer import merge_hits
+
+    top_k = pages * 6
+    response = synthetic_query_response(top_k, EMBEDDING_DIM, include_values=True)
+
+    def run():
+        hits = PineconeVectorStore._to_hits(response, include_values=True)
+        return _to_matches(merge_hits(hits, [], top_k), 0.5)
+    return run, top_k, "matches"
+
+CASES: Dict[str, Setup] = {
+    "split_text": _split_text,
+    "find_best_split_point": _find_best_split_point,
+    "extract_text_from_pdf": _extract_text_from_pdf,
+    "build_context": _build_context,
+    "upsert_payloads": _upsert_payloads,
+    "query_payloads": _query_payloads,
+}
+
+
+def measure(fn: Callable[[], object], repeat: int, budget_s: float) -> float:
+    """Best seconds per call over `repeat` samples (fewer if `budget_s` runs out)."""
+    fn()  # warm-up: imports, pools, tokenizer
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_S or number >= 1 << 16:
+            break
+        number *= 2
+    best = elapsed / number
+    deadline = time.perf_counter() + budget_s
+    for _ in range(repeat - 1):
+        if time.perf_counter() > deadline:
+            break
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases: List[str], sizes: List[int], repeat: int, budget_s: float) -> Dict[str, dict]:
+    results = {}
+    print(f"{'case':<24}{'pages':>6}{'best s':>12}{'throughput':>16}{'peak MB':>10}")
+    for name in cases:
+        for size in sizes:
+            fn, units, unit = CASES[name](size)
+            seconds = measure(fn, repeat, budget_s)
+            peak = peak_memory(fn)
+            throughput = units / seconds
+            results[f"{name}/{size}"] = {"seconds": seconds, "throughput": throughput, "unit": f"{unit}/s", "peak_bytes": peak}
+            print(f"{name:<24}{size:>6}{seconds:>12.6f}{throughput:>11.1f} {unit + '/s':<5}{peak / 1e6:>9.2f}")
+    return results
+
+def check(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (a fraction) in throughput or peak memory."""
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            failures.append(
+                f"{key}: throughput {result['throughput']:.1f} {result['unit']} vs baseline "
+                f"{base['throughput']:.1f} ({result['throughput'] / base['throughput'] - 1:+.0%})"
+            )
+        if base.get("peak_bytes") and result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance):
+            failures.append(
+                f"{key}: peak memory {result['peak_bytes'] / 1e6:.2f} MB vs baseline "
+                f"{base['peak_bytes'] / 1e6:.2f} MB ({result['peak_bytes'] / base['peak_bytes'] - 1:+.0%})"
+            )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(PAGE_SIZES), help="sizes in pages")
+    parser.add_argument("--quick", action="store_true", help="skip the 1000-page size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds of repeats per case and size")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {os.path.relpath(BASELINE_PATH, ROOT)}")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, as a fraction")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes if not (args.quick and s >= 1000)]
+    results = run(args.cases, sizes, args.repeat, args.budget)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        # Merge, so re-recording one case keeps the others.
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f).get("results", {})
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"machine": f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}",
+                 "results": {**existing, **results}},
+                f, indent=2, sort_keys=True,
+            )
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f"No baseline at {args.baseline}; run with --save-baseline first")
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        failures = check(results, baseline, args.tolerance)
+        if failures:
+            print(f"\n{len(failures)} regression(s) beyond {args.tolerance:.0%}:")
+            for failure in failures:
+                print(f"  {failure}")
+            raise SystemExit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Drive the app end to end against local stand-ins and report latency and throughput.
+
+Starts the OpenAI, Pinecone and arXiv stand-ins (loadtest/stubs.py), launches
+the app under uvicorn with its caches in a temporary directory, seeds a
+namespace through /analysis/processor, then keeps `--concurrency` requests
+in flight against each scenario for `--duration` seconds (or `--requests`
+requests) and reports throughput, error counts, p50/p95/p99 latency and,
+for the SSE endpoint, time to first event.
+
+    poetry run python loadtest/driver.py --scenarios answer answer_sync --concurrency 32 --duration 30
+    poetry run python loadtest/driver.py --scenarios processor --requests 200 --openai-latency-ms 300
+    poetry run python loadtest/driver.py --error-rate 0.02 --json loadtest-results.json
+
+Scenarios:
+    answer       POST /analysis/answer (SSE); latency runs to the "complete" event
+    answer_sync  POST /analysis/answer/sync
+    processor    POST /analysis/processor with a fresh ~page-sized document per request
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from stubs import add_stub_arguments, stubs_from_args  # noqa: E402
+from fixtures import CHARS_PER_PAGE, WORDS, synthetic_text  # noqa: E402
+
+NAMESPACE = "loadtest"
+
+# One request: (seconds, seconds to first event or None, ok)
+Sample = Tuple[float, Optional[float], bool]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def _questions(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"How does {' '.join(rng.choices(WORDS, k=4))} affect the results?" for _ in range(n)]
+
+
+class Scenario:
+    """A request factory for one endpoint."""
+
+    def __init__(self, name: str, run: Callable[[httpx.AsyncClient, int], Awaitable[Sample]]):
+        self.name = name
+        self.run = run
+
+
+def build_scenarios(args: argparse.Namespace) -> Dict[str, Scenario]:
+    questions = _questions(args.distinct_questions)
+
+    def answer_body(i: int) -> dict:
+        return {"question": questions[i % len(questions)], "namespace": NAMESPACE, "threshold": args.threshold}
+
+    async def answer(client: httpx.AsyncClient, i: int) -> Sample:
+        started = time.perf_counter()
+        first = None
+        ok = False
+        async with client.stream("POST", "/analysis/answer", json=answer_body(i)) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return time.perf_counter() - started, None, False
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if first is None:
+                    first = time.perf_counter() - started
+                payload = json.loads(line[6:])
+                if payload.get("event") == "error":
+                    ok = False
+                    break
+                if payload.get("event") == "complete":
+                    ok = True
+        return time.perf_counter() - started, first, ok
+
+    async def answer_sync(client: httpx.AsyncClient, i: int) -> Sample:
+        started = time.perf_counter()
+        response = await client.post("/analysis/answer/sync", json=answer_body(i))
+        ok = response.status_code == 200
+        return time.perf_counter() - started, None, ok
+
+    async def processor(client: httpx.AsyncClient, i: int) -> Sample:
+        started = time.perf_counter()
+        body = {
+            "text": synthetic_text(CHARS_PER_PAGE * args.processor_pages, seed=10_000 + i),
+            "namespace": f"{NAMESPACE}-processor",
+            "meta": {"title": f"Load test document {i}"},
+        }
+        response = await client.post("/analysis/processor", json=body)
+        ok = response.status_code == 201
+        return time.perf_counter() - started, None, ok
+
+    return {
+        "answer": Scenario("answer", answer),
+        "answer_sync": Scenario("answer_sync", answer_sync),
+        "processor": Scenario("processor", processor),
+    }
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, concurrency: int,
+                duration: Optional[float], requests: Optional[int]) -> Tuple[List[Sample], float]:
+    """Keep `concurrency` requests in flight until the duration or request count is reached."""
+    samples: List[Sample] = []
+    counter = iter(range(requests if requests else sys.maxsize))
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        for i in counter:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            sent = time.perf_counter()
+            try:
+                samples.append(await scenario.run(client, i))
+            except httpx.HTTPError:
+                samples.append((time.perf_counter() - sent, None, False))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: List[Sample], elapsed: float) -> dict:
+    ok = [s for s in samples if s[2]]
+    latencies = [s[0] for s in ok]
+    firsts = [s[1] for s in ok if s[1] is not None]
+    summary = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "latency_s": {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+    }
+    if firsts:
+        summary["first_event_s"] = {f"p{q}": percentile(firsts, q) for q in (50, 95, 99)}
+    return summary
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+def print_report(results: Dict[str, dict]) -> None:
+    print(f"\n{'scenario':<14}{'reqs':>7}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttfe p50':>10}{'ttfe p95':>10}{'ttfe p99':>10}")
+    for name, r in results.items():
+        lat = r["latency_s"]
+        first = r.get("first_event_s", {})
+        print(f"{name:<14}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>9.1f}"
+              f"{_ms(lat['p50']):>9}{_ms(lat['p95']):>9}{_ms(lat['p99']):>9}"
+              f"{_ms(first.get('p50')):>10}{_ms(first.get('p95')):>10}{_ms(first.get('p99')):>10}")
+
+
+def start_app(env: Dict[str, str], port: int, workers: int, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+def wait_for_app(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/metrics", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"app did not come up at {url}")
+
+
+async def seed(client: httpx.AsyncClient, documents: int, pages: int) -> None:
+    """Index some documents so the answer scenarios have something to retrieve."""
+    for i in range(documents):
+        response = await client.post("/analysis/processor", json={
+            "text": synthetic_text(CHARS_PER_PAGE * pages, seed=i),
+            "namespace": NAMESPACE,
+            "meta": {"title": f"Seed document {i}"},
+            "docId": f"seed:{i}",
+        })
+        response.raise_for_status()
+
+
+async def run(args: argparse.Namespace, url: str) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        if args.seed_documents and any(s != "processor" for s in args.scenarios):
+            await seed(client, args.seed_documents, args.seed_pages)
+        scenarios = build_scenarios(args)
+        results = {}
+        for name in args.scenarios:
+            if args.warmup:
+                await drive(client, scenarios[name], min(args.concurrency, args.warmup), None, args.warmup)
+            samples, elapsed = await drive(client, scenarios[name], args.concurrency, args.duration, args.requests)
+            results[name] = summarize(samples, elapsed)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=["answer", "answer_sync", "processor"],
+                        default=["answer", "answer_sync", "processor"])
+    parser.add_argument("--concurrency", type=int, default=16, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, default=None, help="requests per scenario (overrides --duration)")
+    parser.add_argument("--warmup", type=int, default=4, help="untimed requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="answer score threshold; the default keeps requests on the RAG path")
+    parser.add_argument("--distinct-questions", type=int, default=50)
+    parser.add_argument("--no-answer-cache", action="store_true", help="disable the semantic answer cache")
+    parser.add_argument("--seed-documents", type=int, default=5)
+    parser.add_argument("--seed-pages", type=int, default=10)
+    parser.add_argument("--processor-pages", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=18000)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--app-url", help="drive an already running app instead of launching one")
+    parser.add_argument("--json", help="also write results to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    if args.requests:
+        args.duration = None
+
+    stubs = stubs_from_args(args)
+    stubs.start()
+    process = None
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        try:
+            url = args.app_url
+            if url is None:
+                env = {
+                    **stubs.app_env(),
+                    "PDF_CACHE_DIR": os.path.join(tmp, "pdfs"),
+                    "EMBEDDING_CACHE_PATH": os.path.join(tmp, "embeddings.sqlite3"),
+                    "NAMESPACE_VERSIONS_PATH": os.path.join(tmp, "namespace_versions.sqlite3"),
+                    "CHUNK_MANIFESTS_PATH": os.path.join(tmp, "chunk_manifests.sqlite3"),
+                    "INGEST_JOBS_DB": os.path.join(tmp, "ingest_jobs.sqlite3"),
+                    "OPENAI_RATE_LIMIT_DB": os.path.join(tmp, "openai_ratelimits.sqlite3"),
+                    "LEXICAL_INDEX_PATH": os.path.join(tmp, "lexical.sqlite3"),
+                    "ANSWER_CACHE_ENABLED": "0" if args.no_answer_cache else "1",
+                }
+                url = f"http://127.0.0.1:{args.app_port}"
+                log_path = os.path.join(tmp, "app.log")
+                process = start_app(env, args.app_port, args.app_workers, log_path)
+                try:
+                    wait_for_app(url, process)
+                except RuntimeError:
+                    with open(log_path) as f:
+                        print(f.read()[-4000:], file=sys.stderr)
+                    raise
+            results = asyncio.run(run(args, url))
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            stubs.stop()
+
+    print_report(results)
+    print(f"\nstand-ins: {json.dumps(stubs.stats())}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results, "stubs": stubs.stats()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""Local stand-ins for the OpenAI, Pinecone and arXiv endpoints the app calls.
+
+Each service is a small FastAPI app with configurable latency and error
+rate; they implement just enough of the real APIs for the official SDKs
+(openai, pinecone) and tools/utils to work unmodified:
+
+    OpenAI   POST /v1/embeddings (float and base64), POST /v1/chat/completions (incl. streaming)
+    Pinecone POST /vectors/upsert, /query, /vectors/delete, /describe_index_stats, GET /vectors/fetch
+    arXiv    GET /api/query (Atom feed), GET /pdf/{id}.pdf (synthetic PDF)
+
+Run standalone to point a manually started app at them:
+
+    poetry run python loadtest/stubs.py --openai-latency-ms 150 --error-rate 0.01
+"""
+import os
+import sys
+import json
+import time
+import base64
+import re
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fixtures import synthetic_pdf, synthetic_text  # noqa: E402
+
+EMBEDDING_DIM = 1536
+
+
+class StubConfig:
+    """Latency (mean and jitter, in ms) and error rate for one stand-in service."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self) -> None:
+        ms = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        if ms:
+            await asyncio.sleep(ms / 1000)
+
+    def fail(self) -> Optional[Response]:
+        """An injected error response, or None to serve the request."""
+        self.requests += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse(
+                {"error": {"message": "injected by stub", "type": "stub_error"}},
+                status_code=self.error_status,
+                headers={"retry-after-ms": "50"},
+            )
+        return None
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+def _vector(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Deterministic unit vector for a text: the sum of its hashed word vectors,
+    so texts sharing words score higher against each other, as real embeddings would."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()) or [text]:
+        vec += _word_vector(word, dim)
+    return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+
+# ---------------------------------------------------------------- OpenAI
+
+def openai_app(config: StubConfig, stream_tokens: int = 60, token_interval_ms: float = 10.0) -> FastAPI:
+    app = FastAPI()
+    answer_words = synthetic_text(stream_tokens * 8, seed=1).split()[:stream_tokens]
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dim = int(body.get("dimensions") or EMBEDDING_DIM)
+        data = []
+        for i, text in enumerate(inputs):
+            vec = _vector(str(text), dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vec.astype("<f4").tobytes()).decode()
+            else:
+                embedding = vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(str(t)) // 4 + 1 for t in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _completion_id() -> str:
+        return "chatcmpl-stub" + hashlib.md5(str(time.time_ns()).encode()).hexdigest()[:12]
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        model = body.get("model", "gpt-4o-mini")
+        prompt_tokens = sum(len(str(m.get("content") or "")) // 4 + 1 for m in body.get("messages", []))
+        words = answer_words[: max(1, min(len(answer_words), body.get("max_tokens") or len(answer_words)))]
+        created = int(time.time())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+        headers = {
+            "x-ratelimit-limit-requests": "10000",
+            "x-ratelimit-limit-tokens": "10000000",
+            "x-ratelimit-remaining-requests": "9999",
+            "x-ratelimit-remaining-tokens": "9990000",
+        }
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": _completion_id(),
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }, headers=headers)
+
+        completion_id = _completion_id()
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        def chunk(delta: dict, finish_reason=None, choices=True, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if choices else [],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                if token_interval_ms:
+                    await asyncio.sleep(token_interval_ms / 1000)
+                yield chunk({"content": word if i == 0 else " " + word})
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield chunk({}, choices=False, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    return app
+
+
+# ---------------------------------------------------------------- Pinecone
+
+class _Namespace:
+    def __init__(self):
+        self.ids: list = []
+        self.positions: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.metadata: list = []
+
+    def upsert(self, records: list) -> None:
+        if self.vectors is None:
+            self.vectors = np.zeros((0, len(records[0]["values"])), dtype=np.float32)
+        appended = {}
+        for record in records:
+            vec = np.asarray(record["values"], dtype=np.float32)
+            vec = vec / max(float(np.linalg.norm(vec)), 1e-12)
+            i = self.positions.get(record["id"])
+            if i is None:
+                i = self.positions[record["id"]] = len(self.ids)
+                self.ids.append(record["id"])
+                self.metadata.append(None)
+            self.metadata[i] = record.get("metadata") or {}
+            if i < len(self.vectors):
+                self.vectors[i] = vec
+            else:
+                appended[i] = vec
+        if appended:
+            self.vectors = np.vstack([self.vectors, np.stack([appended[i] for i in sorted(appended)])])
+
+    def delete(self, ids: list) -> None:
+        if self.vectors is None:
+            return
+        ids = set(ids)
+        keep = [i for i, id_ in enumerate(self.ids) if id_ not in ids]
+        self.ids = [self.ids[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self.vectors = self.vectors[keep]
+        self.positions = {id_: i for i, id_ in enumerate(self.ids)}
+
+
+def pinecone_app(config: StubConfig) -> FastAPI:
+    app = FastAPI()
+    namespaces: Dict[str, _Namespace] = {}
+    lock = threading.Lock()
+
+    def ns(name: str) -> _Namespace:
+        return namespaces.setdefault(name or "", _Namespace())
+
+    @app.post("/vectors/upsert")
+    async def upsert(request: Request):
+        body = await request.json()
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        with lock:
+            ns(body.get("namespace", "")).upsert(body["vectors"])
+        return {"upsertedCount": len(body["vectors"])}
+
+    @app.post("/query")
+    async def query(request: Request):
+        body = await request.json()
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        with lock:
+            space = ns(body.get("namespace", ""))
+            q = np.asarray(body["vector"], dtype=np.float32)
+            q = q / max(float(np.linalg.norm(q)), 1e-12)
+            scores = space.vectors @ q if space.ids else np.zeros(0, dtype=np.float32)
+            top = np.argsort(-scores)[: int(body.get("topK", 10))]
+            matches = []
+            for i in top:
+                match = {"id": space.ids[i], "score": float(scores[i])}
+                if body.get("includeMetadata"):
+                    match["metadata"] = space.metadata[i]
+                if body.get("includeValues"):
+                    match["values"] = space.vectors[i].tolist()
+                matches.append(match)
+        return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 1}}
+
+    @app.get("/vectors/fetch")
+    async def fetch(request: Request):
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        namespace = request.query_params.get("namespace", "")
+        ids = request.query_params.getlist("ids")
+        with lock:
+            space = ns(namespace)
+            vectors = {
+                id_: {"id": id_, "values": space.vectors[space.positions[id_]].tolist(),
+                      "metadata": space.metadata[space.positions[id_]]}
+                for id_ in ids if id_ in space.positions
+            }
+        return {"vectors": vectors, "namespace": namespace, "usage": {"readUnits": 1}}
+
+    @app.post("/vectors/delete")
+    async def delete(request: Request):
+        body = await request.json()
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        with lock:
+            if body.get("deleteAll"):
+                namespaces.pop(body.get("namespace", ""), None)
+            else:
+                ns(body.get("namespace", "")).delete(body.get("ids") or [])
+        return {}
+
+    @app.api_route("/describe_index_stats", methods=["GET", "POST"])
+    async def describe_index_stats():
+        with lock:
+            counts = {name: {"vectorCount": len(space.ids)} for name, space in namespaces.items()}
+        return {
+            "namespaces": counts,
+            "dimension": EMBEDDING_DIM,
+            "indexFullness": 0.0,
+            "totalVectorCount": sum(c["vectorCount"] for c in counts.values()),
+        }
+
+    return app
+
+
+# ---------------------------------------------------------------- arXiv
+
+_FEED_ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/{id}v1</id>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>{title}</title>
+    <summary>{summary}</summary>
+    <author><name>Stub Author</name></author>
+    <link href="http://arxiv.org/abs/{id}v1" rel="alternate" type="text/html"/>
+  </entry>
+"""
+
+def arxiv_app(config: StubConfig, pdf_pages: int = 12) -> FastAPI:
+    app = FastAPI()
+    pdfs: Dict[str, bytes] = {}
+
+    @app.get("/api/query")
+    async def search(search_query: str = "", max_results: int = 5):
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        seed = int(hashlib.md5(search_query.encode()).hexdigest()[:8], 16)
+        entries = "".join(
+            _FEED_ENTRY.format(
+                id=f"2401.{(seed + i) % 100000:05d}",
+                title=f"Stub paper {i} for {search_query[:40]}",
+                summary=synthetic_text(400, seed + i),
+            )
+            for i in range(max_results)
+        )
+        feed = f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n{entries}</feed>\n'
+        return Response(feed, media_type="application/atom+xml")
+
+    @app.get("/pdf/{arxiv_id:path}")
+    async def pdf(arxiv_id: str):
+        await config.delay()
+        if (error := config.fail()) is not None:
+            return error
+        arxiv_id = arxiv_id.removesuffix(".pdf")
+        if arxiv_id not in pdfs:
+            seed = int(hashlib.md5(arxiv_id.encode()).hexdigest()[:8], 16)
+            pdfs[arxiv_id] = await asyncio.to_thread(synthetic_pdf, pdf_pages, seed)
+        content = pdfs[arxiv_id]
+        return Response(content, media_type="application/pdf", headers={"ETag": f'"{hashlib.md5(content).hexdigest()}"'})
+
+    return app
+
+
+# ---------------------------------------------------------------- runner
+
+class StubServers:
+    """Run the three stand-ins on local ports in a background thread."""
+
+    def __init__(self, openai: StubConfig, pinecone: StubConfig, arxiv: StubConfig, host: str = "127.0.0.1",
+                 base_port: int = 18100, stream_tokens: int = 60, token_interval_ms: float = 10.0, pdf_pages: int = 12):
+        self.host = host
+        self.configs = {"openai": openai, "pinecone": pinecone, "arxiv": arxiv}
+        self.ports = {"openai": base_port, "pinecone": base_port + 1, "arxiv": base_port + 2}
+        self.apps = {
+            "openai": openai_app(openai, stream_tokens, token_interval_ms),
+            "pinecone": pinecone_app(pinecone),
+            "arxiv": arxiv_app(arxiv, pdf_pages),
+        }
+        self._servers = []
+        self._thread: Optional[threading.Thread] = None
+
+    def url(self, name: str) -> str:
+        return f"http://{self.host}:{self.ports[name]}"
+
+    def app_env(self) -> Dict[str, str]:
+        """Environment that points the app at these stand-ins."""
+        return {
+            "OPENAI_API_KEY": "sk-stub",
+            "OPENAI_BASE_URL": f"{self.url('openai')}/v1",
+            "PINECONE_API_KEY": "stub",
+            "PINECONE_INDEX_HOST": self.url("pinecone"),
+            "VECTOR_STORE": "pinecone",
+            "ARXIV_API_URL": f"{self.url('arxiv')}/api/query",
+            "ARXIV_PDF_URL": f"{self.url('arxiv')}/pdf",
+            "ARXIV_MIN_INTERVAL_S": "0",
+        }
+
+    def start(self) -> None:
+        self._servers = [
+            uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.ports[name], log_level="warning"))
+            for name, app in self.apps.items()
+        ]
+
+        async def serve():
+            await asyncio.gather(*(server.serve() for server in self._servers))
+
+        self._thread = threading.Thread(target=lambda: asyncio.run(serve()), daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not all(server.started for server in self._servers):
+            if time.monotonic() > deadline:
+                raise RuntimeError("stub servers did not start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: config.stats() for name, config in self.configs.items()}
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("stand-in services")
+    group.add_argument("--stub-port", type=int, default=18100, help="first of three consecutive ports")
+    for name, latency in (("openai", 150.0), ("pinecone", 25.0), ("arxiv", 200.0)):
+        group.add_argument(f"--{name}-latency-ms", type=float, default=latency)
+        group.add_argument(f"--{name}-jitter-ms", type=float, default=latency / 4)
+        group.add_argument(f"--{name}-error-rate", type=float, default=None, help="overrides --error-rate")
+    group.add_argument("--error-rate", type=float, default=0.0, help="error rate for every stand-in")
+    group.add_argument("--stream-tokens", type=int, default=60, help="tokens per chat completion")
+    group.add_argument("--token-interval-ms", type=float, default=10.0, help="delay between streamed tokens")
+    group.add_argument("--pdf-pages", type=int, default=12)
+
+def stubs_from_args(args: argparse.Namespace) -> StubServers:
+    def config(name: str, error_status: int) -> StubConfig:
+        rate = getattr(args, f"{name}_error_rate")
+        return StubConfig(
+            latency_ms=getattr(args, f"{name}_latency_ms"),
+            jitter_ms=getattr(args, f"{name}_jitter_ms"),
+            error_rate=args.error_rate if rate is None else rate,
+            error_status=error_status,
+        )
+    return StubServers(
+        openai=config("openai", 429),
+        pinecone=config("pinecone", 503),
+        arxiv=config("arxiv", 503),
+        base_port=args.stub_port,
+        stream_tokens=args.stream_tokens,
+        token_interval_ms=args.token_interval_ms,
+        pdf_pages=args.pdf_pages,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    stubs = stubs_from_args(args)
+    stubs.start()
+    print("Stand-ins running; start the app with:")
+    for key, value in stubs.app_env().items():
+        print(f"  export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
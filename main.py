@@ -1,8 +1,26 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import Response
 from src.modules.analysis.analysisController import analysisRouter
+from src.modules.ingestion.ingestionController import ingestionRouter
 from fastapi.middleware.cors import CORSMiddleware
+from src.lifecycle import WARMUP_ENABLED, warm_up, resume_jobs, shutdown
+from src.modules.metrics.metrics import render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.modules.metrics.middleware import MetricsMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        timings = await warm_up()
+        print("Warm-up: " + ", ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in timings.items()))
+    resume_jobs()
+    yield
+    await shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,3 +31,9 @@ app.add_middleware(
 )
 
 app.include_router(analysisRouter)
+app.include_router(ingestionRouter)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,86 @@
+"""Report where worker start-up time goes.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, then
+prints the slowest modules by cumulative import time, the cost per top-level
+package, and (unless --no-warmup) how long each lifespan warm-up step takes.
+
+    poetry run python scripts/startup_report.py [--top 25] [--no-warmup]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(target: str = "main") -> list[tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every module imported by `target`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "ANALYZER_WARMUP": "0"},
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((module, int(self_us), int(cumulative_us)))
+    return rows
+
+def warmup_times() -> dict[str, float]:
+    sys.path.insert(0, ROOT)
+    import asyncio
+    from src.lifecycle import warm_up
+    return asyncio.run(warm_up())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=25, help="number of modules to list")
+    parser.add_argument("--no-warmup", action="store_true", help="skip timing the warm-up hook (no network)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    rows = import_times()
+    total_us = next((cum for module, _, cum in rows if module == "main"), sum(s for _, s, _ in rows))
+
+    by_package: dict[str, int] = defaultdict(int)
+    for module, self_us, _ in rows:
+        by_package[module.split(".")[0]] += self_us
+
+    report = {
+        "total_import_ms": total_us / 1000,
+        "slowest_modules": [
+            {"module": m, "self_ms": s / 1000, "cumulative_ms": c / 1000}
+            for m, s, c in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+        ],
+        "by_package_ms": {
+            pkg: us / 1000 for pkg, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+        },
+    }
+    if not args.no_warmup:
+        report["warmup_ms"] = {name: secs * 1000 for name, secs in warmup_times().items()}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import main: {report['total_import_ms']:.1f} ms\n")
+    print(f"{'module':60} {'self ms':>9} {'cum ms':>9}")
+    for row in report["slowest_modules"]:
+        print(f"{row['module'][:60]:60} {row['self_ms']:9.1f} {row['cumulative_ms']:9.1f}")
+    print(f"\n{'package':60} {'self ms':>9}")
+    for pkg, ms in report["by_package_ms"].items():
+        print(f"{pkg[:60]:60} {ms:9.1f}")
+    if "warmup_ms" in report:
+        print(f"\n{'warm-up step':60} {'ms':>9}")
+        for name, ms in report["warmup_ms"].items():
+            print(f"{name:60} {ms:9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
 from .tools import scout_tool, reader_tool, processor_tool
+from .tools import scout_tool_async, reader_tool_async, processor_tool_async
 
-__all__ = ['scout_tool', 'reader_tool', 'processor_tool']
+__all__ = [
+    'scout_tool', 'reader_tool', 'processor_tool',
+    'scout_tool_async', 'reader_tool_async', 'processor_tool_async',
+]
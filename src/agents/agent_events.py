@@ -0,0 +1,65 @@
+from typing import Optional, Callable, Dict, Any
+from datetime import datetime
+import time
+
+from src.modules.metrics.metrics import observe, count_error
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import AgentAction, AgentFinish
+
+class AgentEventsHandler(BaseCallbackHandler):
+    def __init__(self, emit: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.emit = emit
+        # run_id -> perf_counter at on_llm_start, for the agent_llm latency metric.
+        self._llm_started: Dict[Any, float] = {}
+
+    def _ts(self) -> str:
+        return datetime.now().isoformat()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        if self.emit:
+            self.emit("agent.tool.start", {"tool": serialized.get("name"), "input": input_str, "ts": self._ts()})
+
+    def on_tool_end(self, output, **kwargs):
+        if self.emit:
+            self.emit("agent.tool.end", {"output_preview": str(output)[:300], "ts": self._ts()})
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._llm_started[kwargs.get("run_id")] = time.perf_counter()
+        if self.emit:
+            preview = str(prompts[0])[:200] if prompts else ""
+            self.emit("agent.llm.start", {"prompt_preview": preview, "ts": self._ts()})
+
+    def on_llm_end(self, response, **kwargs):
+        started = self._llm_started.pop(kwargs.get("run_id"), None)
+        if started is not None:
+            observe("agent_llm", time.perf_counter() - started)
+        if self.emit:
+            try:
+                txt = response.generations[0][0].text
+            except Exception:
+                txt = "No text"
+            self.emit("agent.llm.end", {"output_preview": txt[:300], "ts": self._ts()})
+
+    def on_llm_error(self, error, **kwargs):
+        self._llm_started.pop(kwargs.get("run_id"), None)
+        count_error("agent_llm")
+
+    def on_agent_action(self, action: AgentAction, **kwargs):
+        if self.emit:
+            self.emit("agent.decision", {
+                "action": "use_tool",
+                "tool": action.tool,
+                "input": action.tool_input,
+                "reasoning": action.log,
+                "ts": self._ts()
+            })
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs):
+        if self.emit:
+            self.emit("agent.decision", {
+                "action": "finish",
+                "output": finish.return_values.get("output", ""),
+                "reasoning": finish.log,
+                "ts": self._ts()
+            })
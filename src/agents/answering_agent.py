@@ -1,117 +1,155 @@
 from typing import Optional, Callable, Dict, Any, AsyncGenerator
-from datetime import datetime
-import asyncio
 import time
+import asyncio
+import threading
+import weakref
 
-from langchain.callbacks.base import BaseCallbackHandler
-from langchain_openai import ChatOpenAI
-from langchain.agents import initialize_agent, AgentType
-from langchain.schema import AgentAction, AgentFinish
-
-from src.modules.analysis.ragService import answer_with_rag
-from src.agents.tools.scout_tool import scout_tool, scout_lc_tool
-from src.agents.tools.reader_tool import reader_tool, reader_lc_tool
-from src.agents.tools.processor_tool import processor_tool, processor_lc_tool
+from src.modules.analysis.ragService import stream_answer_with_rag_async
+from src.agents.tools import scout_tool_async, get_lc_tools
+from src.agents.tools.utils import ArxivSearchError
+from src.modules.openai.openaiService import get_client, get_async_client
+from src.agents.tools.ingest_pipeline import ingest_arxiv_stream
+from src.modules.pinecone.pineconeService import wait_until_visible_async
 
-TOOLS = [t for t in [scout_lc_tool, reader_lc_tool, processor_lc_tool] if t is not None]
+def __getattr__(name: str):
+    # LangChain pieces are imported on first use to keep worker boot fast.
+    if name == "TOOLS":
+        return get_lc_tools()
+    if name == "AgentEventsHandler":
+        from src.agents.agent_events import AgentEventsHandler
+        return AgentEventsHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class AgentEventsHandler(BaseCallbackHandler):
-    def __init__(self, emit: Optional[Callable[[str, Dict[str, Any]], None]] = None):
-        self.emit = emit
+Emit = Optional[Callable[[str, Dict[str, Any]], None]]
 
-    def _ts(self) -> str:
-        return datetime.now().isoformat()
 
-    def on_tool_start(self, serialized, input_str, **kwargs):
-        if self.emit:
-            self.emit("agent.tool.start", {"tool": serialized.get("name"), "input": input_str, "ts": self._ts()})
+class AnswerContext:
+    """Per-request state handed to a shared agent: target namespace and event sink."""
 
-    def on_tool_end(self, output, **kwargs):
-        if self.emit:
-            self.emit("agent.tool.end", {"output_preview": str(output)[:300], "ts": self._ts()})
+    __slots__ = ("namespace", "emit")
 
-    def on_llm_start(self, serialized, prompts, **kwargs):
-        if self.emit:
-            preview = str(prompts[0])[:200] if prompts else ""
-            self.emit("agent.llm.start", {"prompt_preview": preview, "ts": self._ts()})
+    def __init__(self, namespace: str, emit: Emit = None):
+        self.namespace = namespace
+        self.emit = emit
 
-    def on_llm_end(self, response, **kwargs):
-        if self.emit:
-            try:
-                txt = response.generations[0][0].text
-            except Exception:
-                txt = "No text"
-            self.emit("agent.llm.end", {"output_preview": txt[:300], "ts": self._ts()})
-
-    def on_agent_action(self, action: AgentAction, **kwargs):
-        if self.emit:
-            self.emit("agent.decision", {
-                "action": "use_tool",
-                "tool": action.tool,
-                "input": action.tool_input,
-                "reasoning": action.log,
-                "ts": self._ts()
-            })
-
-    def on_agent_finish(self, finish: AgentFinish, **kwargs):
-        if self.emit:
-            self.emit("agent.decision", {
-                "action": "finish",
-                "output": finish.return_values.get("output", ""),
-                "reasoning": finish.log,
-                "ts": self._ts()
-            })
+    def events_handler(self):
+        """LangChain callback handler forwarding agent events to `emit`."""
+        from src.agents.agent_events import AgentEventsHandler
+        return AgentEventsHandler(self.emit)
+
+
+# ChatOpenAI holds one async client, and AsyncOpenAI pools are bound to a loop,
+# so chat models are cached per running loop (None outside of one).
+_chat_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_sync_chat_llms: dict = {}
+
+def get_chat_llm(model: str = "gpt-4o-mini", temperature: float = 0, max_tokens: int = 300):
+    """ChatOpenAI per configuration, on the pooled OpenAI clients from openaiService."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    cache = _sync_chat_llms if loop is None else _chat_llms.setdefault(loop, {})
+    key = (model, temperature, max_tokens)
+    llm = cache.get(key)
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        client = get_client()
+        clients = {"root_client": client, "client": client.chat.completions}
+        if loop is not None:
+            async_client = get_async_client()
+            clients.update(root_async_client=async_client, async_client=async_client.chat.completions)
+        llm = cache[key] = ChatOpenAI(model=model, temperature=temperature, max_tokens=max_tokens, **clients)
+    return llm
 
 
 class IntelligentAnsweringAgent:
-    """RAG-first answering agent with tool fallback."""
+    """RAG-first answering agent with tool fallback.
+
+    Holds no per-request state, so one instance serves every request; the
+    namespace and emit callback travel in an AnswerContext.
+    """
+
+    def __init__(self):
+        self._agent = None
+        self._agent_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        return get_chat_llm()
+
+    @property
+    def agent(self):
+        """LangChain tool-calling executor, built only when a code path needs it.
+
+        Pass `ctx.events_handler()` as a callback when invoking it.
+        """
+        if self._agent is None:
+            with self._agent_lock:
+                if self._agent is None:
+                    from langchain.agents import initialize_agent, AgentType
+                    self._agent = initialize_agent(
+                        tools=get_lc_tools(),
+                        llm=self.llm,
+                        agent=AgentType.OPENAI_FUNCTIONS,
+                        handle_parsing_errors=True,
+                    )
+        return self._agent
+
+    @staticmethod
+    async def _stream_rag(question: str, ctx: AnswerContext, threshold: float, outcome: dict) -> AsyncGenerator[Dict[str, Any], None]:
+        """Forward answer tokens as `answer.delta` items; the RAG result lands in `outcome`."""
+        async for item in stream_answer_with_rag_async(question, ctx.namespace, threshold=threshold, emit=ctx.emit):
+            if item["type"] == "delta":
+                yield {"type": "answer.delta", "text": item["text"]}
+            else:
+                outcome.update((k, v) for k, v in item.items() if k != "type")
 
-    def __init__(self, namespace: str, emit: Optional[Callable[[str, Dict[str, Any]], None]] = None):
-        self.namespace = namespace
-        self.emit = emit
-        self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=300)
-        self.handler = AgentEventsHandler(emit)
-        self.agent = initialize_agent(
-            tools=TOOLS,
-            llm=self.llm,
-            agent=AgentType.OPENAI_FUNCTIONS,
-            handle_parsing_errors=True,
-        )
-
-    async def answer_question(self, question: str, threshold: float = 0.5) -> AsyncGenerator[Dict[str, Any], None]:
-        rag = answer_with_rag(question, self.namespace, threshold, emit=self.emit)
+    async def answer_question(self, question: str, ctx: AnswerContext, threshold: float = 0.5) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield `answer.delta` items while the answer streams, then one final answer or error item."""
+        rag: Dict[str, Any] = {}
+        async for delta in self._stream_rag(question, ctx, threshold, rag):
+            yield delta
         if rag.get("ok"):
             yield {"type": "answer", "source": "rag", **rag}
             return
 
         try:
-            search_results = scout_tool(question, max_results=3)
+            try:
+                search_results = await scout_tool_async(question, max_results=3, emit=ctx.emit, raise_errors=True)
+            except ArxivSearchError as e:
+                reason = "arXiv is rate limiting searches, try again shortly" if e.rate_limited else str(e)
+                yield {"type": "error", "message": f"Paper search failed: {reason}"}
+                return
             if not search_results:
                 yield {"type": "error", "message": "No papers found"}
                 return
 
             best_paper = search_results[0]
-            pdf_result = reader_tool(best_paper["url"], emit=self.emit)
-            
-            if not pdf_result.get("ok"):
-                yield {"type": "error", "message": f"Failed to read PDF: {pdf_result.get('error')}"}
-                return
-
-            process_result = processor_tool(
-                pdf_result["text"], 
-                namespace=self.namespace, 
-                meta={"title": best_paper["title"], "url": best_paper["url"]}
+            ingest_result = await ingest_arxiv_stream(
+                best_paper["url"],
+                namespace=ctx.namespace,
+                meta={"title": best_paper["title"], "url": best_paper["url"]},
+                emit=ctx.emit,
             )
-            
-            if not process_result.get("ok"):
-                yield {"type": "error", "message": f"Failed to process PDF: {process_result.get('error')}"}
+
+            if not ingest_result.get("ok"):
+                yield {"type": "error", "message": f"Failed to ingest PDF: {ingest_result.get('error')}"}
                 return
 
-            if self.emit:
-                self.emit("agent.waiting_for_indexing", {"delay_seconds": 3})
-            time.sleep(3)
-            
-            final_rag = answer_with_rag(question, self.namespace, threshold=0.3, emit=self.emit)
+            # Wait for the index to serve the new chunks; anything still
+            # lagging at the deadline is answered from the write buffer.
+            ids = ingest_result.get("ids", [])
+            if ctx.emit:
+                ctx.emit("agent.waiting_for_indexing", {"ids": len(ids)})
+            started = time.perf_counter()
+            visible = await wait_until_visible_async(ids, ctx.namespace)
+            if ctx.emit:
+                ctx.emit("agent.indexing_ready", {"visible": visible, "seconds": round(time.perf_counter() - started, 3)})
+
+            final_rag: Dict[str, Any] = {}
+            async for delta in self._stream_rag(question, ctx, 0.3, final_rag):
+                yield delta
             if final_rag.get("ok"):
                 yield {"type": "answer", "source": "agent+rag", **final_rag}
             else:
@@ -121,32 +159,50 @@ class IntelligentAnsweringAgent:
             yield {"type": "error", "message": f"Processing failed: {str(e)}"}
 
 
+_agent: Optional[IntelligentAnsweringAgent] = None
+_agent_lock = threading.Lock()
+
+def get_answering_agent() -> IntelligentAnsweringAgent:
+    """Return the process-wide answering agent."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = IntelligentAnsweringAgent()
+    return _agent
+
+
 async def run_answering_agent_stream(
     question: str,
     namespace: str,
     threshold: float = 0.50,
-    emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    emit: Emit = None,
 ) -> AsyncGenerator[Dict[str, Any], None]:
-    agent = IntelligentAnsweringAgent(namespace, emit)
-    async for result in agent.answer_question(question, threshold):
+    ctx = AnswerContext(namespace, emit)
+    async for result in get_answering_agent().answer_question(question, ctx, threshold):
         yield result
 
 
+async def run_answering_agent_async(
+    question: str,
+    namespace: str,
+    threshold: float = 0.50,
+    emit: Emit = None,
+) -> dict:
+    last: Optional[Dict[str, Any]] = None
+    async for r in run_answering_agent_stream(question, namespace, threshold, emit):
+        last = r
+    if last and last.get("type") == "answer":
+        return {"ok": True, "source": last.get("source"), "answer": last.get("answer"), "matches": last.get("matches", [])}
+    error = last.get("message") if last and last.get("type") == "error" else None
+    return {"ok": False, "source": "agent", "answer": None, "matches": [], "error": error}
+
+
 def run_answering_agent(
     question: str,
     namespace: str,
     threshold: float = 0.50,
-    emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    emit: Emit = None,
 ) -> dict:
-    results = []
-
-    async def collect():
-        async for r in run_answering_agent_stream(question, namespace, threshold, emit):
-            results.append(r)
-
-    asyncio.run(collect())
-    if results:
-        last = results[-1]
-        if last.get("type") == "answer":
-            return {"ok": True, "source": last.get("source"), "answer": last.get("answer"), "matches": last.get("matches", [])}
-    return {"ok": False, "source": "agent", "answer": None, "matches": []}
+    """Blocking entry point for scripts; must not be called from a running event loop."""
+    return asyncio.run(run_answering_agent_async(question, namespace, threshold, emit))
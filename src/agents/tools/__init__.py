@@ -1,5 +1,25 @@
-from .scout_tool import scout_tool, scout_lc_tool
-from .reader_tool import reader_tool, reader_lc_tool
-from .processor_tool import processor_tool, processor_lc_tool
+from .scout_tool import scout_tool, scout_tool_async, get_scout_lc_tool
+from .reader_tool import reader_tool, reader_tool_async, get_reader_lc_tool
+from .processor_tool import processor_tool, processor_tool_async, get_processor_lc_tool
 
-__all__ = ['scout_tool', 'reader_tool', 'processor_tool', 'scout_lc_tool', 'reader_lc_tool', 'processor_lc_tool'] 
\ No newline at end of file
+__all__ = [
+    'scout_tool', 'reader_tool', 'processor_tool',
+    'scout_tool_async', 'reader_tool_async', 'processor_tool_async',
+    'scout_lc_tool', 'reader_lc_tool', 'processor_lc_tool',
+    'get_lc_tools',
+]
+
+_LC_TOOLS = {
+    'scout_lc_tool': get_scout_lc_tool,
+    'reader_lc_tool': get_reader_lc_tool,
+    'processor_lc_tool': get_processor_lc_tool,
+}
+
+def get_lc_tools() -> list:
+    """Return the LangChain tools that could be built, importing LangChain on first call."""
+    return [t for t in (build() for build in _LC_TOOLS.values()) if t is not None]
+
+def __getattr__(name: str):
+    if name in _LC_TOOLS:
+        return _LC_TOOLS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,179 @@
+import re
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import List, Optional
+
+import numpy as np
+
+from src.modules.openai.tokenizer import get_encoding
+
+# A blank line or a divider line (---, ===, ***) separates paragraphs.
+_PARAGRAPH_RE = re.compile(r"\n[^\S\n]*(?:[-=*]{3,}[^\S\n]*)?\n")
+
+_SENTENCE_END = np.array([ord("."), ord("!"), ord("?")], dtype=np.uint32)
+_NEWLINE = 10
+
+_CHARS_PER_TOKEN = 4
+
+# Content-defined chunking: a sentence end is a cut point when the hash of the
+# text just before it hits 0 mod a divisor, so cuts depend on nearby content
+# and not on where the previous chunk happened to start.
+_CDC_WINDOW = 48
+_AVG_SENTENCE_CHARS = 120
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse whitespace like the old split_text did, but keep paragraph breaks."""
+    paragraphs = (" ".join(p.split()) for p in _PARAGRAPH_RE.split(text))
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+class BoundaryIndex:
+    """Sorted split positions for a text, found in a single pass.
+
+    Positions are the offsets right after a separator (where the next chunk
+    would start). Every paragraph end is also a sentence end and every sentence
+    end is also a word end, so lower levels are always a fallback.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # One vectorized pass over the code points: find every whitespace run,
+        # then classify it by what precedes it and how many newlines it holds.
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        is_space = ((codes == 32) | ((codes >= 9) & (codes <= 13))).astype(np.int8)
+        edges = np.diff(is_space, prepend=0, append=0)
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        newlines = np.concatenate(([0], np.cumsum(codes == _NEWLINE, dtype=np.int32)))
+        paragraph = (newlines[run_ends] - newlines[run_starts]) >= 2
+        before = codes[np.maximum(run_starts - 1, 0)]
+        sentence = paragraph | ((run_starts > 0) & np.isin(before, _SENTENCE_END))
+
+        self.words: List[int] = run_ends.tolist()
+        self.sentences: List[int] = run_ends[sentence].tolist()
+        self.paragraphs: List[int] = run_ends[paragraph].tolist()
+
+    @staticmethod
+    def _closest(positions: List[int], lo: int, hi: int, target: int) -> Optional[int]:
+        left = bisect_left(positions, lo)
+        right = bisect_right(positions, hi)
+        if left >= right:
+            return None
+        i = bisect_left(positions, target, left, right)
+        best = None
+        for j in (i - 1, i):
+            if left <= j < right and (best is None or abs(positions[j] - target) < abs(best - target)):
+                best = positions[j]
+        return best
+
+    def best_split(self, start: int, ideal_end: int, window: int) -> int:
+        """Split point closest to `ideal_end` within `window`, preferring
+        paragraph breaks, then sentence ends, then word boundaries."""
+        lo = max(start + 1, ideal_end - window)
+        hi = min(len(self.text), ideal_end + window)
+        for positions in (self.paragraphs, self.sentences, self.words):
+            best = self._closest(positions, lo, hi, ideal_end)
+            if best is not None:
+                return best
+        return ideal_end
+
+    def content_split(self, lo: int, hi: int, divisor: int) -> Optional[int]:
+        """First sentence end in [lo, hi] whose preceding window hashes to 0 mod `divisor`."""
+        for pos in self.sentences[bisect_left(self.sentences, lo):bisect_right(self.sentences, hi)]:
+            window = self.text[max(0, pos - _CDC_WINDOW):pos]
+            if zlib.crc32(window.encode("utf-8")) % divisor == 0:
+                return pos
+        return None
+
+    def next_word_start(self, pos: int, limit: int) -> int:
+        """First word start at or after `pos`, if it comes before `limit`."""
+        i = bisect_left(self.words, pos)
+        if i < len(self.words) and self.words[i] < limit:
+            return self.words[i]
+        return pos
+
+
+class _TokenOffsets:
+    """Map between character offsets and token positions of a text."""
+
+    def __init__(self, text: str, model: str):
+        enc = get_encoding(model)
+        if enc is None:
+            self.starts = list(range(0, len(text), _CHARS_PER_TOKEN))
+        else:
+            _, self.starts = enc.decode_with_offsets(enc.encode(text, disallowed_special=()))
+        self.length = len(text)
+
+    def token_at(self, char_pos: int) -> int:
+        return bisect_right(self.starts, char_pos) - 1
+
+    def char_at(self, token_pos: int) -> int:
+        if token_pos >= len(self.starts):
+            return self.length
+        return self.starts[max(token_pos, 0)]
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    length: str = "chars",
+    model: str = "text-embedding-3-small",
+    content_defined: bool = False,
+) -> List[str]:
+    """Split text into chunks of about `chunk_size` with `overlap`.
+
+    `length` selects the unit for chunk_size/overlap: "chars" or "tokens"
+    (counted with the embedding model's tokenizer). Split points come from a
+    BoundaryIndex, so the whole text is scanned once and each split is a few
+    bisections; chunking is linear in the text length.
+
+    With `content_defined`, chunks end at sentence ends picked by a hash of
+    the surrounding text (chunks range from half to twice `chunk_size`). An
+    edit then only changes the chunks around it; the ones after it come out
+    identical, which is what lets re-ingestion skip them.
+    """
+    if length not in ("chars", "tokens"):
+        raise ValueError("length must be 'chars' or 'tokens'")
+    text = normalize_whitespace(text)
+    if not text:
+        return []
+    index = BoundaryIndex(text)
+    tokens = _TokenOffsets(text, model) if length == "tokens" else None
+
+    def advance(pos: int, amount: int) -> int:
+        if tokens is None:
+            return pos + amount
+        return tokens.char_at(tokens.token_at(pos) + amount)
+
+    sentence_length = _AVG_SENTENCE_CHARS if tokens is None else _AVG_SENTENCE_CHARS // _CHARS_PER_TOKEN
+    # Expected chunk: chunk_size // 2 of minimum, then about `divisor` sentences.
+    divisor = max(1, round(chunk_size / 2 / sentence_length))
+
+    chunks = []
+    start = 0
+    n = len(text)
+    while start < n:
+        split_point = None
+        if content_defined:
+            min_end = advance(start, chunk_size // 2)
+            max_end = advance(start, chunk_size * 2)
+            if min_end < n:
+                split_point = index.content_split(min_end, min(max_end, n - 1), divisor)
+        else:
+            max_end = advance(start, chunk_size)
+        if split_point is None:
+            if max_end >= n:
+                chunk = text[start:].strip()
+                if chunk:
+                    chunks.append(chunk)
+                break
+            window = max(1, advance(start, chunk_size // 4) - start)
+            split_point = index.best_split(start, max_end, window)
+        chunk = text[start:split_point].strip()
+        if chunk:
+            chunks.append(chunk)
+        overlap_start = max(start + 1, advance(split_point, -overlap))
+        start = index.next_word_start(overlap_start, split_point) if overlap else split_point
+    return chunks
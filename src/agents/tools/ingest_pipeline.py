@@ -0,0 +1,230 @@
+import time
+import asyncio
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, Tuple
+
+from .utils import split_text, iter_pdf_pages, extract_arxiv_id, download_pdf_async, document_id
+from .pdf_cache import get_pdf_cache
+from src.modules.openai.openaiService import get_embeddings_async
+from src.modules.openai.embeddingDimensions import namespace_dimensions
+from src.modules.pinecone.pineconeService import upsert_chunks_async, DocumentSync
+
+Emit = Optional[Callable[[str, Dict[str, Any]], None]]
+
+# End-of-stream marker. On failure no marker is sent; the stages are cancelled instead.
+_DONE = object()
+
+
+async def _put_all(queue: asyncio.Queue, items) -> None:
+    for item in items:
+        await queue.put(item)
+
+
+async def _extract_stage(pages: Iterator[Tuple[int, str]], out: asyncio.Queue, stats: dict, emit: Emit) -> None:
+    """Pull pages off the (blocking) PDF iterator in a worker thread, one at a time."""
+    while True:
+        page = await asyncio.to_thread(next, pages, None)
+        if page is None:
+            break
+        page_no, text = page
+        stats["pages"] = page_no
+        if emit:
+            emit("pipeline.extract.page", {"page": page_no, "chars": len(text)})
+        await out.put(text)
+    await out.put(_DONE)
+
+
+async def _chunk_stage(inp: asyncio.Queue, out: asyncio.Queue, stats: dict, emit: Emit,
+                       chunk_size: int, overlap: int, sync: Optional[DocumentSync]) -> None:
+    """Chunk text as pages arrive, holding back the last (possibly partial) chunk.
+
+    The held-back tail is prefixed to the next page, so chunks never end at a
+    page break just because the page did. With a DocumentSync, chunks are
+    content-defined and the ones already in the index are not passed on.
+    Items sent downstream are (content id or None, chunk).
+    """
+    async def send(chunks: list[str]) -> None:
+        stats["chunks"] += len(chunks)
+        if emit:
+            emit("pipeline.chunk.progress", {"chunks": stats["chunks"]})
+        for chunk in chunks:
+            if sync is None:
+                await out.put((None, chunk))
+                continue
+            id_ = sync.admit(chunk)
+            if id_ is None:
+                stats["skipped"] += 1
+            else:
+                await out.put((id_, chunk))
+
+    content_defined = sync is not None
+    buffer = ""
+    flush_at = chunk_size * 4
+    while True:
+        text = await inp.get()
+        if text is _DONE:
+            break
+        buffer = f"{buffer} {text}" if buffer else text
+        if len(buffer) < flush_at:
+            continue
+        chunks = await asyncio.to_thread(
+            split_text, buffer, chunk_size=chunk_size, overlap=overlap, content_defined=content_defined
+        )
+        buffer = chunks.pop() if chunks else ""
+        await send(chunks)
+    if buffer.strip():
+        await send(await asyncio.to_thread(
+            split_text, buffer, chunk_size=chunk_size, overlap=overlap, content_defined=content_defined
+        ))
+    await out.put(_DONE)
+
+
+async def _embed_stage(inp: asyncio.Queue, out: asyncio.Queue, stats: dict, emit: Emit, batch_size: int,
+                       dimensions: int) -> None:
+    """Group chunks into batches and embed each batch as soon as it fills."""
+    index = 0
+
+    async def flush(batch: list[tuple]) -> None:
+        nonlocal index
+        ids, chunks = zip(*batch)
+        vectors = await get_embeddings_async(list(chunks), dimensions=dimensions)
+        stats["embedded"] += len(batch)
+        if emit:
+            emit("pipeline.embed.batch", {"size": len(batch), "embedded": stats["embedded"]})
+        await out.put((index, list(chunks), vectors, None if ids[0] is None else list(ids)))
+        index += len(batch)
+
+    batch: list[tuple] = []
+    while True:
+        chunk = await inp.get()
+        if chunk is _DONE:
+            break
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    await out.put(_DONE)
+
+
+async def _upsert_stage(inp: asyncio.Queue, stats: dict, emit: Emit, namespace: str, meta: dict, started: float,
+                        ids: list[str]) -> None:
+    while True:
+        item = await inp.get()
+        if item is _DONE:
+            break
+        start_index, chunks, vectors, chunk_ids = item
+        written = await upsert_chunks_async(
+            chunks, vectors, namespace, metadata=meta, start_index=start_index, ids=chunk_ids
+        )
+        ids.extend(written)
+        stats["upserted"] += len(written)
+        if stats["first_searchable_s"] is None:
+            stats["first_searchable_s"] = round(time.perf_counter() - started, 3)
+            if emit:
+                emit("pipeline.first_searchable", {"seconds": stats["first_searchable_s"], "namespace": namespace})
+        if emit:
+            emit("pipeline.upsert.batch", {"size": len(chunks), "upserted": stats["upserted"]})
+
+
+async def ingest_pdf_stream(
+    pdf_content: bytes,
+    namespace: str = "default",
+    meta: Optional[Dict] = None,
+    emit: Emit = None,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    embed_batch_size: int = 64,
+    queue_size: int = 8,
+    pages: Optional[Iterable[Tuple[int, str]]] = None,
+    doc_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Extract, chunk, embed and upsert a PDF as concurrent, bounded-queue stages.
+
+    Pages flow through the stages one at a time, so the first chunks are
+    searchable before the last page is extracted and the full document text
+    is never materialized. Pass `pages` to skip extraction (e.g. text that
+    is already cached). Pass `doc_id` to re-ingest incrementally: only chunks
+    missing from the document's manifest are embedded and upserted, and
+    chunks the new text no longer has are deleted.
+    Returns: {ok, namespace, pages, chunks_count, upserted, skipped, deleted, ids, first_searchable_s}
+    or {ok: False, error}
+    """
+    started = time.perf_counter()
+    stats = {"pages": 0, "chunks": 0, "embedded": 0, "upserted": 0, "skipped": 0, "first_searchable_s": None}
+    sync = await asyncio.to_thread(DocumentSync, namespace, doc_id) if doc_id else None
+    if doc_id:
+        meta = {**(meta or {}), "doc_id": doc_id}
+    ids: list[str] = []
+    pages_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    chunks_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size * embed_batch_size)
+    vectors_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    if emit:
+        emit("pipeline.start", {"namespace": namespace, "size_bytes": len(pdf_content)})
+
+    tasks = [
+        asyncio.create_task(_extract_stage(iter(pages) if pages is not None else iter_pdf_pages(pdf_content), pages_q, stats, emit)),
+        asyncio.create_task(_chunk_stage(pages_q, chunks_q, stats, emit, chunk_size, overlap, sync)),
+        asyncio.create_task(_embed_stage(chunks_q, vectors_q, stats, emit, embed_batch_size, namespace_dimensions(namespace))),
+        asyncio.create_task(_upsert_stage(vectors_q, stats, emit, namespace, meta or {}, started, ids)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if sync is not None:
+            await asyncio.to_thread(sync.abort, ids)
+        if emit:
+            emit("pipeline.error", {"error": str(e), **stats})
+        return {"ok": False, "error": str(e), "namespace": namespace, **stats}
+
+    # A document that produced no text keeps its old chunks rather than losing them all.
+    deleted = await sync.commit_async() if sync is not None and stats["chunks"] else []
+    result = {
+        "ok": True,
+        "namespace": namespace,
+        "pages": stats["pages"],
+        "chunks_count": stats["chunks"],
+        "upserted": stats["upserted"],
+        "skipped": stats["skipped"],
+        "deleted": len(deleted),
+        "first_searchable_s": stats["first_searchable_s"],
+        "total_s": round(time.perf_counter() - started, 3),
+    }
+    if emit:
+        emit("pipeline.complete", result)
+    return {**result, "ids": ids}
+
+
+async def ingest_arxiv_stream(
+    arxiv_url: str,
+    namespace: str = "default",
+    meta: Optional[Dict] = None,
+    emit: Emit = None,
+) -> Dict[str, Any]:
+    """Download an ArXiv PDF and feed it through ingest_pdf_stream.
+
+    The paper is ingested incrementally under its unversioned id, so a new
+    arXiv version only adds the chunks that changed and removes the old ones.
+    """
+    arxiv_id = extract_arxiv_id(arxiv_url)
+    if not arxiv_id:
+        return {"ok": False, "error": "Invalid ArXiv URL format", "url": arxiv_url}
+
+    if emit:
+        emit("reader.download.start", {"arxiv_id": arxiv_id})
+    pdf_content = await download_pdf_async(arxiv_id)
+    if not pdf_content:
+        return {"ok": False, "error": f"Could not download PDF for {arxiv_id}. Check server logs for details.", "arxiv_id": arxiv_id, "url": arxiv_url}
+    if emit:
+        emit("reader.download.end", {"arxiv_id": arxiv_id, "size_bytes": len(pdf_content)})
+
+    cache = get_pdf_cache()
+    pages = await asyncio.to_thread(cache.get_pages, arxiv_id) if cache is not None else None
+    result = await ingest_pdf_stream(
+        pdf_content, namespace=namespace, meta=meta, emit=emit, pages=pages, doc_id=document_id(arxiv_id)
+    )
+    return {"arxiv_id": arxiv_id, **result}
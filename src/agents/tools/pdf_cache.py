@@ -0,0 +1,350 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, Optional, List, Tuple
+
+import httpx
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".cache/pdfs")
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "2048"))
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "1") != "0"
+# Unversioned ids ("2410.16930") follow the latest version, so their copy is
+# revalidated with a conditional GET once it is older than this.
+PDF_CACHE_REVALIDATE_S = float(os.getenv("PDF_CACHE_REVALIDATE_S", "86400"))
+
+# Evict down to this fraction of the cap so we don't evict on every fill.
+_LOW_WATER = 0.9
+_VERSIONED_RE = re.compile(r"v\d+$")
+
+Pages = List[Tuple[int, str]]
+
+
+def is_versioned(arxiv_id: str) -> bool:
+    """Versioned ids ("2410.16930v2") name immutable content."""
+    return bool(_VERSIONED_RE.search(arxiv_id))
+
+def _file_stem(arxiv_id: str) -> str:
+    # Old-style ids contain a slash ("hep-th/9901001").
+    return arxiv_id.replace("/", "_")
+
+def _digest(pdf_content) -> str:
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+class PdfCache:
+    """On-disk cache of arXiv PDFs and their extracted per-page text.
+
+    Files live under `root` (<id>.pdf and <id>.pages.json); a SQLite index
+    keeps validators (ETag / Last-Modified), sizes and last access for LRU
+    eviction once the total passes `max_bytes`. Downloads stream into a temp
+    file that is renamed into place, so readers never see a partial PDF and
+    several workers can share the directory. Concurrent fills of the same id
+    within a process wait on one lock and reuse the first download.
+    """
+
+    def __init__(
+        self,
+        root: str = PDF_CACHE_DIR,
+        max_bytes: int = int(PDF_CACHE_MAX_MB * 1024 * 1024),
+        revalidate_after: float = PDF_CACHE_REVALIDATE_S,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        # arxiv id -> [lock, holders and waiters]; an entry lives only while in use.
+        self._fill_locks: dict[str, list] = {}
+        # Weak values: an asyncio lock disappears once no coroutine holds or awaits it.
+        self._async_fill_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, weakref.WeakValueDictionary[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pdfs (
+                arxiv_id TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                text_size INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pdfs_lru ON pdfs (last_access)")
+
+    # -- paths and index -------------------------------------------------
+
+    def _pdf_path(self, arxiv_id: str) -> str:
+        return os.path.join(self.root, _file_stem(arxiv_id) + ".pdf")
+
+    def _pages_path(self, arxiv_id: str) -> str:
+        return os.path.join(self.root, _file_stem(arxiv_id) + ".pages.json")
+
+    def _entry(self, arxiv_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, digest, fetched_at FROM pdfs WHERE arxiv_id = ?", (arxiv_id,)
+            ).fetchone()
+        if row is None or not os.path.exists(self._pdf_path(arxiv_id)):
+            return None
+        return {"etag": row[0], "last_modified": row[1], "digest": row[2], "fetched_at": row[3]}
+
+    def _touch(self, arxiv_id: str, fetched: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if fetched:
+                self._conn.execute("UPDATE pdfs SET last_access = ?, fetched_at = ? WHERE arxiv_id = ?", (now, now, arxiv_id))
+            else:
+                self._conn.execute("UPDATE pdfs SET last_access = ? WHERE arxiv_id = ?", (now, arxiv_id))
+
+    def _is_fresh(self, arxiv_id: str, entry: dict) -> bool:
+        return is_versioned(arxiv_id) or time.time() - entry["fetched_at"] < self.revalidate_after
+
+    def _read(self, arxiv_id: str) -> Optional[bytes]:
+        try:
+            with open(self._pdf_path(arxiv_id), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _conditional_headers(entry: Optional[dict]) -> dict:
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _tmp_file(self):
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix=".fill-", suffix=".part", delete=False)
+
+    def _commit(self, arxiv_id: str, tmp_path: str, response: httpx.Response) -> bytes:
+        """Move a completed download into place and record it; returns its bytes."""
+        with open(tmp_path, "rb") as f:
+            content = f.read()
+        os.replace(tmp_path, self._pdf_path(arxiv_id))
+        try:
+            os.remove(self._pages_path(arxiv_id))
+        except OSError:
+            pass
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO pdfs
+                   (arxiv_id, etag, last_modified, digest, size, text_size, fetched_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, 0, ?, ?)""",
+                (arxiv_id, response.headers.get("etag"), response.headers.get("last-modified"),
+                 _digest(content), len(content), now, now),
+            )
+            self._evict_if_needed()
+        return content
+
+    @staticmethod
+    def _discard(tmp_path: str) -> None:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    # -- fetch -----------------------------------------------------------
+
+    @contextmanager
+    def _fill_lock(self, arxiv_id: str) -> Iterator[None]:
+        """Hold the per-id fill lock; it is forgotten once nobody holds or waits on it."""
+        with self._lock:
+            entry = self._fill_locks.setdefault(arxiv_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._fill_locks[arxiv_id]
+
+    def _async_fill_lock(self, arxiv_id: str) -> asyncio.Lock:
+        locks = self._async_fill_locks.setdefault(asyncio.get_running_loop(), weakref.WeakValueDictionary())
+        lock = locks.get(arxiv_id)
+        if lock is None:
+            lock = locks[arxiv_id] = asyncio.Lock()
+        return lock
+
+    def fetch(self, arxiv_id: str, url: str, client: httpx.Client) -> bytes:
+        """Return the PDF for `arxiv_id`, downloading or revalidating as needed.
+
+        Raises the underlying httpx error when there is no usable cached copy.
+        """
+        with self._fill_lock(arxiv_id):
+            entry = self._entry(arxiv_id)
+            if entry and self._is_fresh(arxiv_id, entry):
+                content = self._read(arxiv_id)
+                if content is not None:
+                    self.hits += 1
+                    self._touch(arxiv_id)
+                    return content
+            try:
+                with client.stream("GET", url, headers=self._conditional_headers(entry)) as response:
+                    if response.status_code == 304 and entry:
+                        return self._not_modified(arxiv_id)
+                    response.raise_for_status()
+                    with self._tmp_file() as tmp:
+                        try:
+                            for block in response.iter_bytes():
+                                tmp.write(block)
+                        except BaseException:
+                            tmp.close()
+                            self._discard(tmp.name)
+                            raise
+                self.misses += 1
+                return self._commit(arxiv_id, tmp.name, response)
+            except Exception as e:
+                return self._stale_or_raise(arxiv_id, entry, e)
+
+    async def fetch_async(self, arxiv_id: str, url: str, client: httpx.AsyncClient) -> bytes:
+        """Async variant of fetch; file I/O runs in worker threads."""
+        async with self._async_fill_lock(arxiv_id):
+            entry = await asyncio.to_thread(self._entry, arxiv_id)
+            if entry and self._is_fresh(arxiv_id, entry):
+                content = await asyncio.to_thread(self._read, arxiv_id)
+                if content is not None:
+                    self.hits += 1
+                    await asyncio.to_thread(self._touch, arxiv_id)
+                    return content
+            try:
+                async with client.stream("GET", url, headers=self._conditional_headers(entry)) as response:
+                    if response.status_code == 304 and entry:
+                        return await asyncio.to_thread(self._not_modified, arxiv_id)
+                    response.raise_for_status()
+                    tmp = await asyncio.to_thread(self._tmp_file)
+                    try:
+                        async for block in response.aiter_bytes():
+                            await asyncio.to_thread(tmp.write, block)
+                    except BaseException:
+                        tmp.close()
+                        self._discard(tmp.name)
+                        raise
+                    tmp.close()
+                self.misses += 1
+                return await asyncio.to_thread(self._commit, arxiv_id, tmp.name, response)
+            except Exception as e:
+                return await asyncio.to_thread(self._stale_or_raise, arxiv_id, entry, e)
+
+    def _not_modified(self, arxiv_id: str) -> bytes:
+        content = self._read(arxiv_id)
+        if content is None:
+            raise FileNotFoundError(self._pdf_path(arxiv_id))
+        self.revalidated += 1
+        self._touch(arxiv_id, fetched=True)
+        return content
+
+    def _stale_or_raise(self, arxiv_id: str, entry: Optional[dict], error: Exception) -> bytes:
+        # Serving a stale copy beats failing the request while arXiv is unreachable.
+        content = self._read(arxiv_id) if entry else None
+        if content is None:
+            raise error
+        print(f"Revalidating cached PDF {arxiv_id} failed, serving stale copy: {error}")
+        self._touch(arxiv_id)
+        return content
+
+    # -- extracted text --------------------------------------------------
+
+    def get_pages(self, arxiv_id: str) -> Optional[Pages]:
+        """Cached [(page number, text), ...] for the current PDF, or None."""
+        try:
+            with open(self._pages_path(arxiv_id), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(arxiv_id)
+        return [(page, text) for page, text in data]
+
+    def put_pages(self, arxiv_id: str, pdf_content: bytes, pages: Pages) -> None:
+        """Store extracted pages, unless the cached PDF changed since `pdf_content` was read."""
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM pdfs WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        if row is None or row[0] != _digest(pdf_content):
+            return
+        data = json.dumps(pages, ensure_ascii=False).encode("utf-8")
+        with self._tmp_file() as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, self._pages_path(arxiv_id))
+        with self._lock:
+            self._conn.execute("UPDATE pdfs SET text_size = ? WHERE arxiv_id = ?", (len(data), arxiv_id))
+            self._evict_if_needed()
+
+    # -- housekeeping ----------------------------------------------------
+
+    def _evict_if_needed(self) -> None:
+        # Caller holds self._lock. Other workers may share the directory, so
+        # the total is read from the index rather than tracked in memory.
+        total = self._conn.execute("SELECT COALESCE(SUM(size + text_size), 0) FROM pdfs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * _LOW_WATER)
+        rows = self._conn.execute("SELECT arxiv_id, size + text_size FROM pdfs ORDER BY last_access").fetchall()
+        for arxiv_id, size in rows:
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM pdfs WHERE arxiv_id = ?", (arxiv_id,))
+            for path in (self._pdf_path(arxiv_id), self._pages_path(arxiv_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size + text_size), 0) FROM pdfs").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT arxiv_id FROM pdfs")]
+            self._conn.execute("DELETE FROM pdfs")
+        for arxiv_id in ids:
+            for path in (self._pdf_path(arxiv_id), self._pages_path(arxiv_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_cache: Optional[PdfCache] = None
+_cache_lock = threading.Lock()
+
+def get_pdf_cache() -> Optional[PdfCache]:
+    """Return the process-wide PDF cache, or None when disabled via PDF_CACHE_ENABLED=0."""
+    global _cache
+    if not PDF_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PdfCache()
+    return _cache
@@ -0,0 +1,155 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from multiprocessing import shared_memory
+from typing import Optional, List, Tuple, Iterator, Union
+
+# Documents with at least this many pages are split across the process pool.
+PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "64"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+Pages = List[Tuple[int, str]]
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _extract_range(pdf_content: Buffer, start: int, stop: int) -> Pages:
+    """Extract pages [start, stop) as (1-based page number, text)."""
+    import fitz
+
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        return [(i + 1, doc[i].get_text()) for i in range(start, stop)]
+
+def _extract_range_shared(shm_name: str, size: int, start: int, stop: int) -> Pages:
+    # Runs in a pool worker: read the parent's PDF bytes in place instead of
+    # receiving a pickled copy per task.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[:size]
+        try:
+            return _extract_range(view, start, stop)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+def page_count(pdf_content: Buffer) -> int:
+    import fitz
+
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        return doc.page_count
+
+def _page_ranges(pages: int, workers: int) -> List[Tuple[int, int]]:
+    # A few ranges per worker so one slow (image-heavy) range doesn't dominate.
+    parts = max(1, min(pages, workers * 3))
+    step = -(-pages // parts)
+    return [(start, min(start + step, pages)) for start in range(0, pages, step)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded server process is not safe.
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class _SharedPdf:
+    """PDF bytes copied once into shared memory for the duration of an extraction."""
+
+    def __init__(self, pdf_content: Buffer):
+        self.size = len(pdf_content)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self.shm.buf[: self.size] = pdf_content
+
+    def submit(self, pool: ProcessPoolExecutor, start: int, stop: int) -> Future:
+        return pool.submit(_extract_range_shared, self.shm.name, self.size, start, stop)
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+def _use_pool(pages: int, parallel_threshold: int, max_workers: int) -> bool:
+    return max_workers > 1 and pages >= parallel_threshold
+
+def iter_pages(
+    pdf_content: Buffer,
+    parallel_threshold: int = PDF_PARALLEL_PAGE_THRESHOLD,
+    max_workers: int = PDF_EXTRACT_WORKERS,
+) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) in page order.
+
+    Small documents are read in-process straight from memory (no temp file).
+    Large ones are split into page ranges extracted in parallel by the process
+    pool; ranges are yielded in order as soon as each one is ready.
+    """
+    pages = page_count(pdf_content)
+    if not _use_pool(pages, parallel_threshold, max_workers):
+        import fitz
+
+        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            for page in doc:
+                yield page.number + 1, page.get_text()
+        return
+
+    shared = _SharedPdf(pdf_content)
+    futures = [shared.submit(_get_pool(), start, stop) for start, stop in _page_ranges(pages, max_workers)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        # Let in-flight workers detach before the segment goes away.
+        for future in futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        shared.close()
+
+def extract_pages(
+    pdf_content: Buffer,
+    parallel_threshold: int = PDF_PARALLEL_PAGE_THRESHOLD,
+    max_workers: int = PDF_EXTRACT_WORKERS,
+) -> Pages:
+    """Return [(page number, text), ...] for the whole document."""
+    return list(iter_pages(pdf_content, parallel_threshold, max_workers))
+
+async def extract_pages_async(
+    pdf_content: Buffer,
+    parallel_threshold: int = PDF_PARALLEL_PAGE_THRESHOLD,
+    max_workers: int = PDF_EXTRACT_WORKERS,
+) -> Pages:
+    """Like extract_pages, but never runs extraction on the event-loop thread."""
+    pages = await asyncio.to_thread(page_count, pdf_content)
+    if not _use_pool(pages, parallel_threshold, max_workers):
+        return await asyncio.to_thread(_extract_range, pdf_content, 0, pages)
+
+    shared = _SharedPdf(pdf_content)
+    try:
+        futures = [
+            asyncio.wrap_future(shared.submit(_get_pool(), start, stop))
+            for start, stop in _page_ranges(pages, max_workers)
+        ]
+        results = await asyncio.gather(*futures)
+    finally:
+        shared.close()
+    return [page for chunk in results for page in chunk]
@@ -1,37 +1,106 @@
 from typing import Optional, Dict, Any
+import hashlib
 import json
-import time
+from functools import lru_cache
+import asyncio
 
-from .utils import split_text
-from src.modules.openai.openaiService import get_embeddings
-from src.modules.pinecone.pineconeService import upsert_chunks
+from .utils import split_text, document_id
+from src.modules.openai.openaiService import get_embeddings, get_embeddings_async
+from src.modules.openai.embeddingDimensions import namespace_dimensions
+from src.modules.pinecone.pineconeService import upsert_chunks, upsert_chunks_async, DocumentSync
 
-def processor_tool(text: str, namespace: str = "default", meta: Optional[Dict] = None) -> Dict[str, Any]:
+def default_doc_id(text: str, meta: Optional[Dict] = None) -> str:
+    """Document id for a processor call that did not pass one.
+
+    Taken from the metadata when it identifies the source (an explicit
+    doc_id, an arXiv id or a URL), otherwise from a hash of the text, so
+    resubmitting the same text is a no-op instead of a second copy.
+    """
+    meta = meta or {}
+    if meta.get("doc_id"):
+        return str(meta["doc_id"])
+    if meta.get("arxiv_id"):
+        return document_id(str(meta["arxiv_id"]))
+    if meta.get("url"):
+        return f"url:{meta['url']}"
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+def processor_tool(text: str, namespace: str = "default", meta: Optional[Dict] = None,
+                   doc_id: Optional[str] = None) -> Dict[str, Any]:
+    """Chunk, embed and upsert text as one document (see `default_doc_id`).
+    Re-processing the same document only upserts changed chunks and deletes
+    removed ones."""
     try:
-        chunks = split_text(text, chunk_size=500, overlap=50)
-        vectors = get_embeddings(chunks)
-        upserted = upsert_chunks(chunks, vectors, namespace, metadata=meta or {})
-        return {"ok": True, "namespace": namespace, "chunks_count": len(chunks), "upserted": upserted}
+        doc_id = doc_id or default_doc_id(text, meta)
+        chunks = split_text(text, chunk_size=500, overlap=50, content_defined=True)
+        sync = DocumentSync(namespace, doc_id)
+        new = [(id_, chunk) for id_, chunk in ((sync.admit(c), c) for c in chunks) if id_]
+        ids = []
+        try:
+            if new:
+                new_ids, new_chunks = map(list, zip(*new))
+                vectors = get_embeddings(new_chunks, dimensions=namespace_dimensions(namespace))
+                ids = upsert_chunks(new_chunks, vectors, namespace, metadata={**(meta or {}), "doc_id": doc_id}, ids=new_ids)
+            deleted = sync.commit() if chunks else []
+        except Exception:
+            sync.abort(ids)
+            raise
+        return {"ok": True, "namespace": namespace, "doc_id": doc_id, "chunks_count": len(chunks),
+                "upserted": len(ids), "skipped": sync.skipped, "deleted": len(deleted)}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-try:
-    from pydantic import BaseModel, Field
-    from langchain.tools import StructuredTool
+async def processor_tool_async(text: str, namespace: str = "default", meta: Optional[Dict] = None,
+                               doc_id: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        doc_id = doc_id or default_doc_id(text, meta)
+        chunks = await asyncio.to_thread(split_text, text, chunk_size=500, overlap=50, content_defined=True)
+        sync = await asyncio.to_thread(DocumentSync, namespace, doc_id)
+        new = [(id_, chunk) for id_, chunk in ((sync.admit(c), c) for c in chunks) if id_]
+        ids = []
+        try:
+            if new:
+                new_ids, new_chunks = map(list, zip(*new))
+                vectors = await get_embeddings_async(new_chunks, dimensions=namespace_dimensions(namespace))
+                ids = await upsert_chunks_async(
+                    new_chunks, vectors, namespace, metadata={**(meta or {}), "doc_id": doc_id}, ids=new_ids
+                )
+            deleted = await sync.commit_async() if chunks else []
+        except Exception:
+            await asyncio.to_thread(sync.abort, ids)
+            raise
+        return {"ok": True, "namespace": namespace, "doc_id": doc_id, "chunks_count": len(chunks),
+                "upserted": len(ids), "skipped": sync.skipped, "deleted": len(deleted)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
 
-    class _ProcessorArgs(BaseModel):
-        text: str = Field(..., description="Raw document text to index")
-        namespace: str = Field("default", description="Pinecone namespace to store vectors")
-        meta: Optional[Dict] = Field(None, description="Optional metadata to attach to each chunk")
+@lru_cache(maxsize=None)
+def get_processor_lc_tool():
+    """Build the LangChain tool on first use; None when LangChain is unavailable."""
+    try:
+        from pydantic import BaseModel, Field
+        from langchain.tools import StructuredTool
 
-    processor_lc_tool = StructuredTool.from_function(
-        name="process_and_upsert_tool",
-        description="Split text, create OpenAI embeddings, and upsert to Pinecone under a namespace.",
-        func=processor_tool,
-        args_schema=_ProcessorArgs,
-    )
-except Exception:
-    processor_lc_tool = None
+        class _ProcessorArgs(BaseModel):
+            text: str = Field(..., description="Raw document text to index")
+            namespace: str = Field("default", description="Pinecone namespace to store vectors")
+            meta: Optional[Dict] = Field(None, description="Optional metadata to attach to each chunk")
+
+        return StructuredTool.from_function(
+            name="process_and_upsert_tool",
+            description="Split text, create OpenAI embeddings, and upsert to Pinecone under a namespace.",
+            func=processor_tool,
+            coroutine=processor_tool_async,
+            args_schema=_ProcessorArgs,
+        )
+    except Exception:
+        return None
+
+def __getattr__(name: str):
+    # Importing LangChain is slow, so `processor_lc_tool` is resolved lazily.
+    if name == "processor_lc_tool":
+        return get_processor_lc_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 processor_openai_schema = {
     "name": "process_and_upsert_tool",
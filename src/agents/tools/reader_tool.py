@@ -1,6 +1,7 @@
 import json
+from functools import lru_cache
 from typing import Dict, Any
-from .utils import extract_arxiv_id, download_pdf, extract_text_from_pdf
+from .utils import extract_arxiv_id, download_pdf, download_pdf_async, extract_arxiv_pages, extract_arxiv_pages_async
 
 def reader_tool(arxiv_url: str, emit=None) -> Dict[str, Any]:
     """Download and extract text from an ArXiv PDF.
@@ -27,7 +28,7 @@ def reader_tool(arxiv_url: str, emit=None) -> Dict[str, Any]:
         emit("reader.extract.start", {"arxiv_id": arxiv_id})
 
     try:
-        text = extract_text_from_pdf(pdf_content)
+        text = "".join(page_text for _, page_text in extract_arxiv_pages(arxiv_id, pdf_content))
         if emit:
             emit("reader.extract.end", {"arxiv_id": arxiv_id, "chars": len(text)})
         return {"ok": True, "arxiv_id": arxiv_id, "text": text}
@@ -37,21 +38,67 @@ def reader_tool(arxiv_url: str, emit=None) -> Dict[str, Any]:
             emit("reader.extract.error", {"arxiv_id": arxiv_id, "error": error_msg})
         return {"ok": False, "error": error_msg, "arxiv_id": arxiv_id}
 
-try:
-    from pydantic import BaseModel, Field
-    from langchain.tools import StructuredTool
-
-    class _ReaderArgs(BaseModel):
-        arxiv_url: str = Field(..., description="ArXiv abstract URL, e.g. https://arxiv.org/abs/2410.16930")
-
-    reader_lc_tool = StructuredTool.from_function(
-        name="read_arxiv_pdf_tool",
-        description="Download and extract full text from an ArXiv PDF given its abstract URL. Returns {ok, text, arxiv_id}.",
-        func=reader_tool,
-        args_schema=_ReaderArgs,
-    )
-except Exception:
-    reader_lc_tool = None
+async def reader_tool_async(arxiv_url: str, emit=None) -> Dict[str, Any]:
+    """Async variant of reader_tool: downloads on the pooled async client and
+    extracts off the event loop (worker thread, or the process pool for large PDFs).
+    """
+    if emit:
+        emit("reader.start", {"url": arxiv_url})
+
+    arxiv_id = extract_arxiv_id(arxiv_url)
+    if not arxiv_id:
+        return {"ok": False, "error": "Invalid ArXiv URL format", "url": arxiv_url}
+
+    if emit:
+        emit("reader.download.start", {"arxiv_id": arxiv_id})
+
+    pdf_content = await download_pdf_async(arxiv_id)
+    if not pdf_content:
+        return {"ok": False, "error": f"Could not download PDF for {arxiv_id}. Check server logs for details.", "arxiv_id": arxiv_id, "url": arxiv_url}
+
+    if emit:
+        emit("reader.download.end", {"arxiv_id": arxiv_id, "size_bytes": len(pdf_content)})
+
+    if emit:
+        emit("reader.extract.start", {"arxiv_id": arxiv_id})
+
+    try:
+        pages = await extract_arxiv_pages_async(arxiv_id, pdf_content)
+        text = "".join(page_text for _, page_text in pages)
+        if emit:
+            emit("reader.extract.end", {"arxiv_id": arxiv_id, "chars": len(text), "pages": len(pages)})
+        return {"ok": True, "arxiv_id": arxiv_id, "text": text, "pages": len(pages)}
+    except Exception as e:
+        error_msg = f"Failed to extract text from PDF: {str(e)}"
+        if emit:
+            emit("reader.extract.error", {"arxiv_id": arxiv_id, "error": error_msg})
+        return {"ok": False, "error": error_msg, "arxiv_id": arxiv_id}
+
+@lru_cache(maxsize=None)
+def get_reader_lc_tool():
+    """Build the LangChain tool on first use; None when LangChain is unavailable."""
+    try:
+        from pydantic import BaseModel, Field
+        from langchain.tools import StructuredTool
+
+        class _ReaderArgs(BaseModel):
+            arxiv_url: str = Field(..., description="ArXiv abstract URL, e.g. https://arxiv.org/abs/2410.16930")
+
+        return StructuredTool.from_function(
+            name="read_arxiv_pdf_tool",
+            description="Download and extract full text from an ArXiv PDF given its abstract URL. Returns {ok, text, arxiv_id}.",
+            func=reader_tool,
+            coroutine=reader_tool_async,
+            args_schema=_ReaderArgs,
+        )
+    except Exception:
+        return None
+
+def __getattr__(name: str):
+    # Importing LangChain is slow, so `reader_lc_tool` is resolved lazily.
+    if name == "reader_lc_tool":
+        return get_reader_lc_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 reader_openai_schema = {
     "name": "read_arxiv_pdf_tool",
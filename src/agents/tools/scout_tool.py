@@ -1,32 +1,69 @@
 from typing import List, Dict, Any
 import json
-from .utils import search_arxiv
+from functools import lru_cache
+from .utils import search_arxiv, search_arxiv_async, ArxivSearchError
 
-def scout_tool(query: str, max_results: int = 5, emit=None) -> List[Dict[str, Any]]:
-    """Search arXiv for papers and return a list of dicts (title, url, authors, summary, published)."""
+def _search_failed(query: str, e: ArxivSearchError, emit, raise_errors: bool) -> List[Dict[str, Any]]:
+    print(f"Scout search failed: {e}")
+    if emit:
+        emit("scout.error", {"query": query, "error": str(e), "rate_limited": e.rate_limited})
+    if raise_errors:
+        raise e
+    return []
+
+def scout_tool(query: str, max_results: int = 5, emit=None, raise_errors: bool = False) -> List[Dict[str, Any]]:
+    """Search arXiv for papers and return a list of dicts (title, url, authors, summary, published).
+    A failed search is logged and emitted as `scout.error`; it then yields no
+    results, or re-raises the ArxivSearchError with `raise_errors`.
+    """
     if emit:
         emit("scout.start", {"query": query, "max_results": max_results})
-    results = search_arxiv(query, max_results)
+    try:
+        results = search_arxiv(query, max_results)
+    except ArxivSearchError as e:
+        return _search_failed(query, e, emit, raise_errors)
     if emit:
         emit("scout.end", {"results_count": len(results)})
     return results
 
-try:
-    from pydantic import BaseModel, Field
-    from langchain.tools import StructuredTool
-
-    class _ScoutArgs(BaseModel):
-        query: str = Field(..., description="ArXiv search query")
-        max_results: int = Field(5, description="Number of results to return")
-
-    scout_lc_tool = StructuredTool.from_function(
-        name="search_arxiv_tool",
-        description="Search arXiv for papers and return a list of dicts with title, url, authors, summary, and published date.",
-        func=scout_tool,
-        args_schema=_ScoutArgs,
-    )
-except Exception:
-    scout_lc_tool = None
+async def scout_tool_async(query: str, max_results: int = 5, emit=None, raise_errors: bool = False) -> List[Dict[str, Any]]:
+    """Async variant of scout_tool for use inside the event loop."""
+    if emit:
+        emit("scout.start", {"query": query, "max_results": max_results})
+    try:
+        results = await search_arxiv_async(query, max_results)
+    except ArxivSearchError as e:
+        return _search_failed(query, e, emit, raise_errors)
+    if emit:
+        emit("scout.end", {"results_count": len(results)})
+    return results
+
+@lru_cache(maxsize=None)
+def get_scout_lc_tool():
+    """Build the LangChain tool on first use; None when LangChain is unavailable."""
+    try:
+        from pydantic import BaseModel, Field
+        from langchain.tools import StructuredTool
+
+        class _ScoutArgs(BaseModel):
+            query: str = Field(..., description="ArXiv search query")
+            max_results: int = Field(5, description="Number of results to return")
+
+        return StructuredTool.from_function(
+            name="search_arxiv_tool",
+            description="Search arXiv for papers and return a list of dicts with title, url, authors, summary, and published date.",
+            func=scout_tool,
+            coroutine=scout_tool_async,
+            args_schema=_ScoutArgs,
+        )
+    except Exception:
+        return None
+
+def __getattr__(name: str):
+    # Importing LangChain is slow, so `scout_lc_tool` is resolved lazily.
+    if name == "scout_lc_tool":
+        return get_scout_lc_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 scout_openai_schema = {
     "name": "search_arxiv_tool",
@@ -0,0 +1,194 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+ARXIV_SEARCH_TTL_S = float(os.getenv("ARXIV_SEARCH_TTL_S", "3600"))
+ARXIV_SEARCH_CACHE_SIZE = int(os.getenv("ARXIV_SEARCH_CACHE_SIZE", "1024"))
+# arXiv asks API clients for no more than one request every three seconds.
+ARXIV_MIN_INTERVAL_S = float(os.getenv("ARXIV_MIN_INTERVAL_S", "3"))
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query, used as cache key."""
+    return _SPACE_RE.sub(" ", query).strip().lower()
+
+
+class _LeaderGone(Exception):
+    """The caller fetching a key was cancelled; its waiters join again."""
+
+
+class SearchCache:
+    """TTL + LRU cache with singleflight fills.
+
+    Concurrent lookups of a missing key (from threads or from coroutines on
+    any event loop) wait for one fetch instead of each calling upstream.
+    Failed fetches are not cached; every waiter sees the error. If the
+    fetching caller is cancelled instead (a client disconnect), its waiters
+    start over and one of them fetches.
+    """
+
+    def __init__(self, ttl: float = ARXIV_SEARCH_TTL_S, max_entries: int = ARXIV_SEARCH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        # Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _join(self, key: Hashable) -> tuple[bool, Any, Optional[Future], bool]:
+        """Return (hit, value, future, leader); the leader must fetch and settle the future."""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+                return True, value, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, None, future, False
+            self.misses += 1
+            future = Future()
+            self._inflight[key] = future
+            return False, None, future, True
+
+    def _settle(self, key: Hashable, future: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        if error is None:
+            self.put(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def _abandon(self, key: Hashable, future: Future) -> None:
+        """Drop an in-flight fill whose leader was cancelled, without caching or sharing why."""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_exception(_LeaderGone())
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        while True:
+            hit, value, future, leader = self._join(key)
+            if hit:
+                return value
+            if not leader:
+                try:
+                    return future.result()
+                except _LeaderGone:
+                    continue
+            try:
+                value = fetch()
+            except Exception as e:
+                self._settle(key, future, error=e)
+                raise
+            except BaseException:
+                self._abandon(key, future)
+                raise
+            self._settle(key, future, value)
+            return value
+
+    async def get_or_fetch_async(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            hit, value, future, leader = self._join(key)
+            if hit:
+                return value
+            if not leader:
+                try:
+                    # Shielded: a cancelled waiter must not cancel the shared future.
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except _LeaderGone:
+                    continue
+            try:
+                value = await fetch()
+            except Exception as e:
+                self._settle(key, future, error=e)
+                raise
+            except BaseException:
+                self._abandon(key, future)
+                raise
+            self._settle(key, future, value)
+            return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class Throttle:
+    """Hands out request slots at least `min_interval` apart, in arrival order.
+
+    Sync and async callers share one schedule, so the process as a whole
+    stays under the upstream limit. `back_off` pushes the next slot out,
+    e.g. after a 429/503 with Retry-After.
+    """
+
+    def __init__(self, min_interval: float = ARXIV_MIN_INTERVAL_S):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def back_off(self, seconds: float) -> None:
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+search_cache = SearchCache()
+arxiv_throttle = Throttle()
@@ -1,35 +1,65 @@
-import fitz
 import os
 import httpx
 import re
-import feedparser
-from tempfile import NamedTemporaryFile
-from typing import Optional, List
+import asyncio
+import weakref
+from typing import Optional, List, Iterator, Tuple
+
+from .pdf_extractor import extract_pages, extract_pages_async, iter_pages
+from .chunker import chunk_text, BoundaryIndex
+from .pdf_cache import get_pdf_cache
+from .search_cache import search_cache, arxiv_throttle, normalize_query, ARXIV_MIN_INTERVAL_S
+from src.modules.metrics.metrics import timed, count_bytes, count_items
 
 # ArXiv API configuration
-ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+ARXIV_PDF_URL = os.getenv("ARXIV_PDF_URL", "https://arxiv.org/pdf")
+ARXIV_MAX_RETRIES = int(os.getenv("ARXIV_MAX_RETRIES", "2"))
+
+# Shared HTTP clients. The sync client is process-wide; async clients are bound to
+# the event loop they were created on, so keep one per running loop.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+_sync_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_http_client() -> httpx.Client:
+    """Return the pooled, process-wide sync HTTP client."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(follow_redirects=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    return _sync_client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(follow_redirects=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+        _async_clients[loop] = client
+    return client
 
-def split_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
+async def close_http_clients() -> None:
+    """Close pooled clients; call from the app shutdown hook."""
+    global _sync_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def split_text(text: str, chunk_size: int = 500, overlap: int = 50, length: str = "chars",
+               content_defined: bool = False) -> list[str]:
     """
     Split text into chunks with specified size and overlap.
+    `length` is "chars" or "tokens"; see chunker.chunk_text.
     """
-    text = re.sub(r'\s+', ' ', text.strip())
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        ideal_end = start + chunk_size
-        if ideal_end >= len(text):
-            chunk = text[start:].strip()
-            if chunk:
-                chunks.append(chunk)
-            break
-        split_point = find_best_split_point(text, start, ideal_end, chunk_size)
-        chunk = text[start:split_point].strip()
-        if chunk:
-            chunks.append(chunk)
-        start = max(start + 1, split_point - overlap)
-    
+    with timed("chunk"):
+        chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap, length=length, content_defined=content_defined)
+    count_bytes("chunk", len(text))
+    count_items("chunk", len(chunks))
     return chunks
 
 def find_best_split_point(text: str, start: int, ideal_end: int, chunk_size: int) -> int:
@@ -39,133 +69,192 @@ def find_best_split_point(text: str, start: int, ideal_end: int, chunk_size: int
     2. Sentence endings (. ! ?)
     3. Word boundaries
     4. Fallback to character boundary
+    Indexes the whole text on every call; split_text builds the index once.
     """
-    search_start = max(start, ideal_end - chunk_size // 4)
-    search_end = min(len(text), ideal_end + chunk_size // 4)
-    search_text = text[search_start:search_end]
-    
-    para_patterns = [
-        r'\n\s*\n',  # Double newlines
-        r'\n\s*[-=*]{3,}\s*\n',  # Section dividers
-        r'\n\s*\d+\.\s*\n',  # Numbered sections
-    ]
-    
-    for pattern in para_patterns:
-        matches = list(re.finditer(pattern, search_text))
-        if matches:
-            best_match = None
-            best_distance = float('inf')
-            for match in matches:
-                distance = abs((search_start + match.end()) - ideal_end)
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match = match
-            
-            if best_match:
-                return search_start + best_match.end()
-    
-    sentence_pattern = r'[.!?]+\s+'
-    matches = list(re.finditer(sentence_pattern, search_text))
-    if matches:
-        best_match = None
-        best_distance = float('inf')
-        for match in matches:
-            distance = abs((search_start + match.end()) - ideal_end)
-            if distance < best_distance:
-                best_distance = distance
-                best_match = match
-        
-        if best_match:
-            return search_start + best_match.end()
-    
-    word_pattern = r'\s+'
-    matches = list(re.finditer(word_pattern, search_text))
-    if matches:
-        # Find the match closest to ideal_end
-        best_match = None
-        best_distance = float('inf')
-        for match in matches:
-            distance = abs((search_start + match.end()) - ideal_end)
-            if distance < best_distance:
-                best_distance = distance
-                best_match = match
-        
-        if best_match:
-            return search_start + best_match.end()
-
-    return ideal_end
+    return BoundaryIndex(text).best_split(start, ideal_end, chunk_size // 4)
 
 def extract_arxiv_id(arxiv_url: str) -> Optional[str]:
     """Extract ArXiv ID from URL, handling version numbers properly."""
     match = re.search(r'arxiv\.org/abs/([^/]+(?:/[^/]+)?)(?:v\d+)?', arxiv_url)
     return match.group(1) if match else None
 
+def document_id(arxiv_id: str) -> str:
+    """Id shared by every version of a paper ("2410.16930v2" -> "arxiv:2410.16930")."""
+    return "arxiv:" + re.sub(r"v\d+$", "", arxiv_id)
+
+def _pdf_url(arxiv_id: str) -> str:
+    return f"{ARXIV_PDF_URL}/{arxiv_id}.pdf"
+
 def download_pdf(arxiv_id: str) -> Optional[bytes]:
-    """Download PDF content from ArXiv."""
-    pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-    
+    """Download PDF content from ArXiv, through the on-disk PDF cache when enabled."""
+    cache = get_pdf_cache()
     try:
-        with httpx.Client(follow_redirects=True, timeout=30.0) as client:
-            response = client.get(pdf_url)
-            response.raise_for_status()
-            return response.content
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP error downloading PDF {arxiv_id}: {e.response.status_code} - {e.response.text[:200]}")
+        with timed("pdf_download"):
+            if cache is not None:
+                content = cache.fetch(arxiv_id, _pdf_url(arxiv_id), get_http_client())
+            else:
+                response = get_http_client().get(_pdf_url(arxiv_id))
+                response.raise_for_status()
+                content = response.content
+        count_bytes("pdf_download", len(content))
+        return content
+    except Exception as e:
+        _log_download_error(arxiv_id, e)
         return None
-    except httpx.TimeoutException as e:
-        print(f"Timeout downloading PDF {arxiv_id}: {e}")
+
+async def download_pdf_async(arxiv_id: str) -> Optional[bytes]:
+    """Download PDF content from ArXiv without blocking the event loop."""
+    cache = get_pdf_cache()
+    try:
+        with timed("pdf_download"):
+            if cache is not None:
+                content = await cache.fetch_async(arxiv_id, _pdf_url(arxiv_id), get_async_http_client())
+            else:
+                response = await get_async_http_client().get(_pdf_url(arxiv_id))
+                response.raise_for_status()
+                content = response.content
+        count_bytes("pdf_download", len(content))
+        return content
+    except Exception as e:
+        _log_download_error(arxiv_id, e)
         return None
-    except httpx.RequestError as e:
+
+def _log_download_error(arxiv_id: str, e: Exception) -> None:
+    if isinstance(e, httpx.HTTPStatusError):
+        print(f"HTTP error downloading PDF {arxiv_id}: {e.response.status_code}")
+    elif isinstance(e, httpx.TimeoutException):
+        print(f"Timeout downloading PDF {arxiv_id}: {e}")
+    elif isinstance(e, httpx.RequestError):
         print(f"Request error downloading PDF {arxiv_id}: {e}")
-        return None
-    except Exception as e:
+    else:
         print(f"Unexpected error downloading PDF {arxiv_id}: {e}")
-        return None
 
 def extract_text_from_pdf(pdf_content: bytes) -> str:
     """Extract text content from PDF bytes using PyMuPDF."""
-    with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-        tmp_pdf.write(pdf_content)
-        tmp_pdf_path = tmp_pdf.name
+    return "".join(text for _, text in extract_pages(pdf_content))
 
-    try:
-        doc = fitz.open(tmp_pdf_path)
-        full_text = ""
-        for page in doc:
-            full_text += page.get_text()
-        return full_text
-    finally:
-        os.remove(tmp_pdf_path)
+def _count_extracted(pdf_content: bytes, pages: List[Tuple[int, str]]) -> None:
+    count_bytes("pdf_extract", len(pdf_content))
+    count_items("pdf_extract", len(pages))
 
-def search_arxiv(query: str, max_results: int = 5) -> List[dict]:
-    """Search arXiv API and return parsed results."""
-    params = {
+def extract_arxiv_pages(arxiv_id: str, pdf_content: bytes) -> List[Tuple[int, str]]:
+    """Per-page text of an arXiv PDF, served from the PDF cache when already extracted."""
+    cache = get_pdf_cache()
+    pages = cache.get_pages(arxiv_id) if cache is not None else None
+    if pages is None:
+        with timed("pdf_extract"):
+            pages = extract_pages(pdf_content)
+        _count_extracted(pdf_content, pages)
+        if cache is not None:
+            cache.put_pages(arxiv_id, pdf_content, pages)
+    return pages
+
+async def extract_arxiv_pages_async(arxiv_id: str, pdf_content: bytes) -> List[Tuple[int, str]]:
+    """Async variant of extract_arxiv_pages; extraction never runs on the event loop."""
+    cache = get_pdf_cache()
+    pages = await asyncio.to_thread(cache.get_pages, arxiv_id) if cache is not None else None
+    if pages is None:
+        with timed("pdf_extract"):
+            pages = await extract_pages_async(pdf_content)
+        _count_extracted(pdf_content, pages)
+        if cache is not None:
+            await asyncio.to_thread(cache.put_pages, arxiv_id, pdf_content, pages)
+    return pages
+
+def iter_pdf_pages(pdf_content: bytes) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) one page at a time, 1-based, opening the PDF from memory."""
+    return iter_pages(pdf_content)
+
+def _arxiv_params(query: str, max_results: int) -> dict:
+    return {
         "search_query": f"all:{query}",
         "start": 0,
         "max_results": max_results
     }
 
+def _parse_arxiv_feed(feed_text: str) -> List[dict]:
+    import feedparser
+
+    feed = feedparser.parse(feed_text)
+
+    results = []
+    for entry in feed.entries:
+        results.append({
+            "title": entry.title,
+            "summary": entry.summary,
+            "authors": [author.name for author in entry.authors],
+            "published": entry.published,
+            "url": entry.link
+        })
+
+    return results
+
+class ArxivSearchError(Exception):
+    """arXiv search failed (network error, HTTP error or rate limiting that outlasted retries)."""
+
+    def __init__(self, message: str, rate_limited: bool = False):
+        super().__init__(message)
+        self.rate_limited = rate_limited
+
+
+def _retry_after(response: httpx.Response) -> float:
     try:
-        with httpx.Client(follow_redirects=True) as client:
-            response = client.get(ARXIV_API_URL, params=params)
-            response.raise_for_status()
-
-        feed = feedparser.parse(response.text)
-
-        results = []
-        for entry in feed.entries:
-            results.append({
-                "title": entry.title,
-                "summary": entry.summary,
-                "authors": [author.name for author in entry.authors],
-                "published": entry.published,
-                "url": entry.link
-            })
-
-        return results
-    except httpx.HTTPStatusError as e:
-        pass 
-        return []
-    except Exception as e:
-        pass 
-        return [] 
\ No newline at end of file
+        return min(float(response.headers.get("retry-after")), 60.0)
+    except (TypeError, ValueError):
+        return ARXIV_MIN_INTERVAL_S * 2
+
+def _search_response(response: httpx.Response, query: str) -> Optional[List[dict]]:
+    """Parsed results, or None when arXiv asked us to slow down and the call should be retried."""
+    if response.status_code in (429, 503):
+        arxiv_throttle.back_off(_retry_after(response))
+        return None
+    if response.is_error:
+        raise ArxivSearchError(f"arXiv search for {query!r} failed: HTTP {response.status_code}")
+    return _parse_arxiv_feed(response.text)
+
+def _fetch_arxiv(query: str, max_results: int) -> List[dict]:
+    with timed("scout_search"):
+        for _ in range(ARXIV_MAX_RETRIES + 1):
+            arxiv_throttle.wait()
+            try:
+                response = get_http_client().get(ARXIV_API_URL, params=_arxiv_params(query, max_results))
+            except httpx.HTTPError as e:
+                raise ArxivSearchError(f"arXiv search for {query!r} failed: {e}") from e
+            results = _search_response(response, query)
+            if results is not None:
+                return results
+        raise ArxivSearchError(
+            f"arXiv search for {query!r} is still rate limited after {ARXIV_MAX_RETRIES} retries", rate_limited=True
+        )
+
+async def _fetch_arxiv_async(query: str, max_results: int) -> List[dict]:
+    with timed("scout_search"):
+        for _ in range(ARXIV_MAX_RETRIES + 1):
+            await arxiv_throttle.wait_async()
+            try:
+                response = await get_async_http_client().get(ARXIV_API_URL, params=_arxiv_params(query, max_results))
+            except httpx.HTTPError as e:
+                raise ArxivSearchError(f"arXiv search for {query!r} failed: {e}") from e
+            results = _search_response(response, query)
+            if results is not None:
+                return results
+        raise ArxivSearchError(
+            f"arXiv search for {query!r} is still rate limited after {ARXIV_MAX_RETRIES} retries", rate_limited=True
+        )
+
+def search_arxiv(query: str, max_results: int = 5) -> List[dict]:
+    """Search arXiv API and return parsed results.
+
+    Results are cached per normalized query; concurrent identical searches
+    share one upstream call, and upstream calls are spaced to arXiv's rate
+    limit. Raises ArxivSearchError on failure.
+    """
+    query = normalize_query(query)
+    results = search_cache.get_or_fetch((query, max_results), lambda: _fetch_arxiv(query, max_results))
+    return [dict(r) for r in results]
+
+async def search_arxiv_async(query: str, max_results: int = 5) -> List[dict]:
+    """Async variant of search_arxiv using the pooled async client."""
+    query = normalize_query(query)
+    results = await search_cache.get_or_fetch_async((query, max_results), lambda: _fetch_arxiv_async(query, max_results))
+    return [dict(r) for r in results]
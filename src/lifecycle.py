@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable
+
+from src.modules.metrics.metrics import REGISTRY
+
+# Services are imported inside the hooks below: main imports this module at
+# startup, and the clients, caches and agent should load only when used.
+
+WARMUP_ENABLED = os.getenv("ANALYZER_WARMUP", "1") != "0"
+
+
+async def _warm_openai() -> None:
+    from src.modules.openai.openaiService import get_client, get_async_client
+    await asyncio.to_thread(get_client)
+    get_async_client()
+
+async def _warm_vector_store() -> None:
+    from src.modules.vectorstore import get_vector_store
+    await asyncio.to_thread(lambda: get_vector_store().warm_up())
+
+async def _warm_embedding_cache() -> None:
+    from src.modules.openai.embeddingCache import get_embedding_cache
+    await asyncio.to_thread(get_embedding_cache)
+
+async def _warm_tokenizer() -> None:
+    # Loads (and on a fresh host downloads) the BPE ranks.
+    from src.modules.openai.tokenizer import count_tokens
+    await asyncio.to_thread(count_tokens, "warm up", "text-embedding-3-small")
+
+async def _warm_http() -> None:
+    from src.agents.tools.utils import get_async_http_client
+    get_async_http_client()
+
+async def _warm_agent() -> None:
+    from src.agents.answering_agent import get_answering_agent
+    get_answering_agent()
+
+WARMUP_STEPS: dict[str, Callable[[], Awaitable[None]]] = {
+    "openai": _warm_openai,
+    "vector_store": _warm_vector_store,
+    "embedding_cache": _warm_embedding_cache,
+    "tokenizer": _warm_tokenizer,
+    "http": _warm_http,
+    "agent": _warm_agent,
+}
+
+def _cache_stats() -> dict[str, dict]:
+    from src.modules.openai.embeddingCache import get_embedding_cache
+    from src.modules.analysis.answerCache import get_answer_cache
+    from src.agents.tools.pdf_cache import get_pdf_cache
+    from src.agents.tools.search_cache import search_cache
+    caches = {
+        "embedding": get_embedding_cache(),
+        "pdf": get_pdf_cache(),
+        "arxiv_search": search_cache,
+        "answer": get_answer_cache(),
+    }
+    return {name: cache.stats() for name, cache in caches.items() if cache is not None}
+
+def _collect_cache_metrics():
+    # Read at scrape time from each cache's own counters; lookups record nothing extra.
+    stats = _cache_stats()
+    yield "analyzer_cache_hits_total", "counter", "Cache lookups served from cache.", [
+        ("analyzer_cache_hits_total", {"cache": name}, s.get("hits", 0)) for name, s in stats.items()
+    ]
+    yield "analyzer_cache_misses_total", "counter", "Cache lookups that missed.", [
+        ("analyzer_cache_misses_total", {"cache": name}, s.get("misses", 0)) for name, s in stats.items()
+    ]
+    yield "analyzer_cache_hit_ratio", "gauge", "Hit ratio since process start.", [
+        ("analyzer_cache_hit_ratio", {"cache": name}, s.get("hit_ratio", 0.0)) for name, s in stats.items()
+    ]
+
+REGISTRY.register_collector(_collect_cache_metrics)
+
+async def warm_up() -> dict[str, float]:
+    """Build clients and index handles before the first request.
+
+    Steps run concurrently; a failing step is logged and left to lazy
+    initialization on first use, so a brief Pinecone outage does not stop
+    the worker from booting. Returns seconds spent per step.
+    """
+    async def timed(name: str, step: Callable[[], Awaitable[None]]) -> tuple[str, float]:
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            print(f"Warm-up step '{name}' failed, deferring to first use: {e}")
+        return name, time.perf_counter() - start
+
+    results = await asyncio.gather(*(timed(name, step) for name, step in WARMUP_STEPS.items()))
+    return dict(results)
+
+def resume_jobs() -> None:
+    """Restart ingestion jobs whose process went away before they finished."""
+    from src.modules.ingestion.ingestionService import get_job_runner
+    try:
+        resumed = get_job_runner().resume()
+    except Exception as e:
+        print(f"Could not resume ingestion jobs: {e}")
+        return
+    if resumed:
+        print(f"Resumed {len(resumed)} ingestion job(s)")
+
+async def shutdown() -> None:
+    from src.modules.ingestion.ingestionService import get_job_runner
+    from src.modules.openai.openaiService import get_async_client
+    from src.agents.tools.utils import close_http_clients
+    from src.agents.tools.pdf_extractor import shutdown_pool
+    await get_job_runner().shutdown()
+    await close_http_clients()
+    shutdown_pool()
+    try:
+        await get_async_client().close()
+    except Exception:
+        pass
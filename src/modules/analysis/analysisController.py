@@ -1,12 +1,13 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any
-import json
 import asyncio
 
-from src.agents.tools import scout_tool, reader_tool, processor_tool
-from src.agents.answering_agent import run_answering_agent_stream, run_answering_agent
+from src.agents.tools import scout_tool_async, reader_tool_async, processor_tool_async
+from src.agents.tools.utils import ArxivSearchError
+from src.agents.answering_agent import run_answering_agent_stream, run_answering_agent_async
+from .events import EventBus, sse
 
 analysisRouter = APIRouter(prefix="/analysis", tags=["analysis"])
 
@@ -20,6 +21,7 @@ class ProcessorText(BaseModel):
     text: str
     namespace: str = "default"
     meta: Dict[str, Any] | None = None
+    docId: str | None = None
 
 
 class AnswerRequest(BaseModel):
@@ -29,19 +31,26 @@ class AnswerRequest(BaseModel):
 
 @analysisRouter.post("/arxiv-query", status_code=status.HTTP_201_CREATED)
 async def create_analysis(body: CreateAnalysisBody):
-    results = scout_tool(body.analysisQuery)
+    try:
+        results = await scout_tool_async(body.analysisQuery, raise_errors=True)
+    except ArxivSearchError as e:
+        # 503 while arXiv keeps throttling us, 502 when it failed outright.
+        code = status.HTTP_503_SERVICE_UNAVAILABLE if e.rate_limited else status.HTTP_502_BAD_GATEWAY
+        raise HTTPException(status_code=code, detail=str(e))
     return {"arxiv_results": results}
 
 
 @analysisRouter.post("/pdf", status_code=status.HTTP_201_CREATED)
 async def read_pdf(body: ReadPdfBody):
-    results = reader_tool(body.pdfUrl)
+    results = await reader_tool_async(body.pdfUrl)
     return {"pdf_text": results}
 
 
 @analysisRouter.post("/processor", status_code=status.HTTP_201_CREATED)
 async def process_text(body: ProcessorText):
-    results = processor_tool(body.text, namespace=body.namespace, meta=body.meta)
+    results = await processor_tool_async(
+        body.text, namespace=body.namespace, meta=body.meta, doc_id=body.docId
+    )
     return {"processor_result": results}
 
 
@@ -52,28 +61,37 @@ async def answer(req: AnswerRequest):
     """
 
     async def event_generator():
-        steps: List[Dict[str, Any]] = []
-
-        def emit(event: str, data: Dict[str, Any]):
-            steps.append({"event": event, "data": data})
-
+        bus = EventBus()
+
+        async def run_agent():
+            try:
+                async for result in run_answering_agent_stream(
+                    question=req.question,
+                    namespace=req.namespace,
+                    threshold=req.threshold,
+                    emit=bus.publish
+                ):
+                    if result.get("type") == "answer.delta":
+                        bus.publish("answer.delta", {"text": result["text"]})
+                    else:
+                        bus.publish("result", result)
+            except Exception as e:
+                bus.publish("error", {"error": str(e)})
+            finally:
+                bus.close()
+
+        # The agent runs alongside the stream; events go out as they are published.
+        task = asyncio.create_task(run_agent())
         try:
-            async for result in run_answering_agent_stream(
-                question=req.question,
-                namespace=req.namespace,
-                threshold=req.threshold,
-                emit=emit
-            ):
-                yield f"data: {json.dumps({'type': 'result', 'data': result})}\n\n"
-
-        except Exception as e:
-            error_msg = {"event": "error", "data": {"error": str(e)}}
-            yield f"data: {json.dumps(error_msg)}\n\n"
-
-        for step in steps:
-            yield f"data: {json.dumps(step)}\n\n"
-
-        yield f"data: {json.dumps({'event': 'complete', 'data': {'steps': steps}})}\n\n"
+            async for event, data in bus.drain():
+                if event == "result":
+                    yield sse({"type": "result", "data": data})
+                else:
+                    yield sse({"event": event, "data": data})
+            yield sse({"event": "complete", "data": bus.summary()})
+        finally:
+            if not task.done():
+                task.cancel()
 
     return StreamingResponse(
         event_generator(),
@@ -91,7 +109,7 @@ async def answer_sync(req: AnswerRequest):
     def emit(event: str, data: Dict[str, Any]):
         steps.append({"event": event, "data": data})
 
-    result = run_answering_agent(
+    result = await run_answering_agent_async(
         question=req.question,
         namespace=req.namespace,
         threshold=req.threshold,
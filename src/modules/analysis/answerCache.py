@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Hashable
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+# A cached answer is reused when the new question's embedding is within this
+# cosine distance (1 - similarity) of the cached question's.
+ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+
+
+class _Bucket:
+    """Cached answers for one (namespace, retrieval settings) pair, all at one namespace version."""
+
+    def __init__(self, version: int):
+        self.version = version
+        # question -> (expires, unit vector, answer, matches)
+        self.entries: "OrderedDict[str, tuple[float, np.ndarray, str, list]]" = OrderedDict()
+
+
+class AnswerCache:
+    """Semantic cache of RAG answers.
+
+    Lookups compare the question embedding against cached questions of the
+    same bucket and return the closest one within `max_distance`. Each bucket
+    remembers the namespace version its answers were built from; once the
+    namespace is written to, the version moves and the bucket is dropped on
+    its next lookup.
+    """
+
+    def __init__(
+        self,
+        max_distance: float = ANSWER_CACHE_MAX_DISTANCE,
+        ttl: float = ANSWER_CACHE_TTL_S,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._buckets: dict[Hashable, _Bucket] = {}
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _bucket(self, key: Hashable, version: int) -> _Bucket:
+        # Caller holds self._lock.
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.version != version:
+            bucket = self._buckets[key] = _Bucket(version)
+        return bucket
+
+    def lookup(self, key: Hashable, version: int, vector) -> Optional[dict]:
+        """Return {answer, matches, question, similarity} for the closest fresh entry, or None."""
+        q = self._unit(vector)
+        with self._lock:
+            bucket = self._bucket(key, version)
+            now = time.monotonic()
+            for question in [k for k, entry in bucket.entries.items() if entry[0] < now]:
+                del bucket.entries[question]
+            if not bucket.entries:
+                self.misses += 1
+                return None
+            questions = list(bucket.entries)
+            scores = np.stack([entry[1] for entry in bucket.entries.values()]) @ q
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if 1.0 - similarity > self.max_distance:
+                self.misses += 1
+                return None
+            self.hits += 1
+            question = questions[best]
+            bucket.entries.move_to_end(question)
+            _, _, answer, matches = bucket.entries[question]
+        return {"answer": answer, "matches": matches, "question": question, "similarity": similarity}
+
+    def store(self, key: Hashable, version: int, question: str, vector, answer: str, matches: list) -> None:
+        entry = (time.monotonic() + self.ttl, self._unit(vector), answer, matches)
+        with self._lock:
+            bucket = self._bucket(key, version)
+            bucket.entries[question] = entry
+            bucket.entries.move_to_end(question)
+            while len(bucket.entries) > self.max_entries:
+                bucket.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": sum(len(b.entries) for b in self._buckets.values()),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Return the process-wide answer cache, or None when disabled via ANSWER_CACHE_ENABLED=0."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
@@ -1,4 +1,51 @@
-from typing import Callable, Optional, Dict, Any
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque, Counter
+from typing import Callable, Optional, Dict, Any, AsyncIterator, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Undelivered events per request before the bus starts shedding load.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+
+# Progress events where only the latest value matters: a newer one replaces a
+# queued, undelivered one.
+COALESCED_EVENTS = {
+    "pipeline.extract.page",
+    "pipeline.chunk.progress",
+    "pipeline.embed.batch",
+    "pipeline.upsert.batch",
+}
+# Events whose payload text is appended to a queued, undelivered one.
+CONCATENATED_EVENTS = {"answer.delta"}
+# Never dropped, even when the queue is full.
+CRITICAL_EVENTS = {"result", "error", "answer.delta"}
+
+
+_json_fallback_logged = False
+
+def dumps(obj: Any) -> str:
+    """JSON-encode an event payload (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    global _json_fallback_logged
+    if not _json_fallback_logged:
+        _json_fallback_logged = True
+        print("orjson is not installed; encoding events with json. Install the 'speedups' extra for faster streaming.")
+    return json.dumps(obj, default=str)
+
+def sse(payload: Any) -> str:
+    return f"data: {dumps(payload)}\n\n"
+
+def _is_critical(event: str) -> bool:
+    return event in CRITICAL_EVENTS or event.endswith((".error", ".complete"))
+
 
 def make_emit(cb: Optional[Callable[[str, Dict[str, Any]], None]] = None):
     def emit(event: str, data: Dict[str, Any]):
@@ -8,3 +55,90 @@ def make_emit(cb: Optional[Callable[[str, Dict[str, Any]], None]] = None):
             except Exception:
                 pass
     return emit
+
+
+class EventBus:
+    """Bounded, per-request event queue between publishers and one SSE consumer.
+
+    `publish` has the `emit(event, data)` signature, so it can be handed to
+    tools, services and callback handlers as is; it never blocks and is safe
+    to call from worker threads. When the consumer falls behind, progress
+    events coalesce into their latest value and, once `maxsize` undelivered
+    events are queued, non-critical events are dropped (and counted) rather
+    than buffered.
+    """
+
+    def __init__(self, maxsize: int = EVENT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._queue: "deque[list]" = deque()
+        # event name -> queued [event, data] entry still waiting for delivery
+        self._pending: Dict[str, list] = {}
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._started = time.perf_counter()
+        self.published: Counter = Counter()
+        self.coalesced: Counter = Counter()
+        self.dropped: Counter = Counter()
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        if threading.get_ident() != self._loop_thread:
+            try:
+                self._loop.call_soon_threadsafe(self._publish, event, data)
+            except RuntimeError:
+                pass  # loop already closed; the request is gone
+            return
+        self._publish(event, data)
+
+    def _publish(self, event: str, data: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        self.published[event] += 1
+        queued = self._pending.get(event)
+        if queued is not None:
+            if event in CONCATENATED_EVENTS:
+                queued[1] = {**queued[1], "text": queued[1].get("text", "") + data.get("text", "")}
+            else:
+                queued[1] = data
+            self.coalesced[event] += 1
+            return
+        if len(self._queue) >= self.maxsize and not _is_critical(event):
+            self.dropped[event] += 1
+            return
+        entry = [event, data]
+        self._queue.append(entry)
+        if event in COALESCED_EVENTS or event in CONCATENATED_EVENTS:
+            self._pending[event] = entry
+        self._ready.set()
+
+    def close(self) -> None:
+        """No more events; the consumer finishes once the queue is drained."""
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.close)
+            return
+        self._closed = True
+        self._ready.set()
+
+    async def drain(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) as they arrive until the bus is closed and empty."""
+        while True:
+            while self._queue:
+                entry = self._queue.popleft()
+                event, data = entry
+                if self._pending.get(event) is entry:
+                    del self._pending[event]
+                yield event, data
+            if self._closed:
+                return
+            self._ready.clear()
+            await self._ready.wait()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "elapsed_s": round(time.perf_counter() - self._started, 3),
+            "events": sum(self.published.values()),
+            "by_event": dict(self.published),
+            "coalesced": sum(self.coalesced.values()),
+            "dropped": sum(self.dropped.values()),
+        }
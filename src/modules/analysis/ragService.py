@@ -1,83 +1,303 @@
-from typing import List, Optional, Callable, Dict, Any
-from src.modules.openai.openaiService import get_embeddings, chat_completion
-from src.modules.pinecone.pineconeService import query_chunks
+from typing import List, Optional, Callable, Dict, Any, AsyncGenerator
+import os
+import re
+import asyncio
+
+import numpy as np
+
+from src.modules.openai.openaiService import get_embeddings_async, chat_completion_async, stream_chat_async
+from src.modules.openai.embeddingDimensions import namespace_dimensions
+from src.modules.openai.tokenizer import count_tokens, count_tokens_cached, context_window
+from src.modules.pinecone.pineconeService import query_chunks_async, lexical_query_async, fetch_vectors_async
+from src.modules.vectorstore.lexicalIndex import tokenize
+from src.modules.vectorstore.versions import get_namespace_versions
+from .answerCache import get_answer_cache
+from .rerank import mmr, rrf
 
 SYSTEM = (
     "You are a precise research assistant. Use ONLY the provided context. "
     "If the answer is not in the context, say you don't know. Cite titles/sections if present."
 )
 
-CTX_BUDGET = 4000
-
-def _truncate(text: str, max_chars: int) -> str:
-    return text[:max_chars]
-
-def _build_context(matches: List[dict]) -> str:
-    lines = []
-    used_chars = 0
-    for match in matches:
-        metadata = match.get("metadata") or {}
-        title = metadata.get("title")
-        section = metadata.get("section")
-        cite = " | ".join([p for p in [title, section] if p])
-        header = f"[score={match['score']:.3f}] {cite}" if cite else f"[score={match['score']:.3f}]"
-
-        chunk = match.get("text", "")
-        if used_chars + len(chunk) > CTX_BUDGET:
-            chunk = _truncate(chunk, CTX_BUDGET - used_chars)
-        lines.append(f"{header}\n{chunk}\n")
-        used_chars += len(chunk)
-        if used_chars >= CTX_BUDGET:
+ANSWER_MODEL = "gpt-4o-mini"
+ANSWER_MAX_TOKENS = 500
+# Tokens of retrieved context per prompt, further capped by what the answer
+# model's window leaves after the question and ANSWER_MAX_TOKENS.
+CONTEXT_MAX_TOKENS = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "3000"))
+
+CONTEXT_SEPARATOR = "\n---\n"
+
+# Retrieval fetches this many candidates per requested match (at least
+# MIN_CANDIDATES), so threshold fallback and MMR need no second query.
+CANDIDATE_MULTIPLIER = 4
+MIN_CANDIDATES = 10
+FALLBACK_THRESHOLD = 0.3
+MMR_LAMBDA = 0.5
+
+# Hybrid retrieval: BM25 hits covering at least this fraction of the
+# question's terms are fused with the vector matches by reciprocal rank.
+LEXICAL_MIN_COVERAGE = float(os.getenv("RAG_LEXICAL_MIN_COVERAGE", "0.5"))
+RRF_K = 60
+# Questions naming an identifier (see _names_identifier) may be answered
+# from the lexical index alone, skipping the query embedding.
+LEXICAL_FAST_PATH = os.getenv("RAG_LEXICAL_FAST_PATH", "1") != "0"
+# Terms mixing letters and digits, or joined by separators.
+_IDENTIFIER = re.compile(r"[._:/+-]|[a-z]\d|\d[a-z]")
+
+def _threshold_cascade(threshold: float) -> list[float]:
+    return [threshold, FALLBACK_THRESHOLD] if threshold > FALLBACK_THRESHOLD else [threshold]
+
+def _without_values(match: dict) -> dict:
+    return {k: v for k, v in match.items() if k != "values"}
+
+def _prompt(context: str, question: str) -> str:
+    return (
+        f"{SYSTEM}\n\nContext:\n{context}\n\n"
+        f"Question: {question}\n\nAnswer with citations."
+    )
+
+def _context_budget(question: str, model: str = ANSWER_MODEL, max_tokens: int = ANSWER_MAX_TOKENS) -> int:
+    """Tokens left for context once the template, question and answer are reserved."""
+    fixed = count_tokens(_prompt("", question), model)
+    return max(0, min(CONTEXT_MAX_TOKENS, context_window(model) - fixed - max_tokens))
+
+def _header(match: dict) -> str:
+    metadata = match.get("metadata") or {}
+    title = metadata.get("title")
+    section = metadata.get("section")
+    cite = " | ".join([p for p in [title, section] if p])
+    return f"[score={match['score']:.3f}] {cite}" if cite else f"[score={match['score']:.3f}]"
+
+def _build_context(matches: List[dict], budget: int, model: str = ANSWER_MODEL) -> tuple[str, List[dict], int]:
+    """Pack whole chunks, best score first, while they fit in `budget` tokens.
+
+    Chunk text token counts are cached across requests; headers are short
+    and counted each time. Sums of per-piece counts can be off by a token
+    at each join, which the budget's margin absorbs. Returns (context,
+    packed matches, tokens used).
+    """
+    separator = count_tokens_cached(CONTEXT_SEPARATOR, model)
+    packed, blocks, used = [], [], 0
+    for match in sorted(matches, key=lambda m: m["score"], reverse=True):
+        header = _header(match)
+        text = match.get("text", "")
+        # +2 for the newlines after the header and the text.
+        cost = count_tokens(header, model) + count_tokens_cached(text, model) + 2
+        if blocks:
+            cost += separator
+        if used + cost > budget:
+            continue
+        packed.append(match)
+        blocks.append(f"{header}\n{text}\n")
+        used += cost
+    return CONTEXT_SEPARATOR.join(blocks), packed, used
+
+
+class _Prepared:
+    """Retrieval outcome: either a finished `result` (cache hit / no context) or a prompt to send."""
+
+    def __init__(self, result: Optional[dict] = None, prompt: str = "", matches: Optional[List[dict]] = None,
+                 store: Optional[Callable[[str], None]] = None):
+        self.result = result
+        self.prompt = prompt
+        self.matches = matches or []
+        self.store = store or (lambda answer: None)
+
+
+def _names_identifier(question: str) -> bool:
+    """True for questions naming an identifier (arXiv id, "ImageNet-1k", "BLEU-4").
+
+    Short natural-language questions ("What is attention?") don't qualify:
+    plain words match too many chunks for BM25 alone to pick the answer.
+    """
+    return any(_IDENTIFIER.search(t) for t in tokenize(question))
+
+def _with_context(
+    question: str,
+    matches: List[dict],
+    emit: Optional[Callable[[str, Dict[str, Any]], None]],
+    store: Optional[Callable[[List[dict]], Callable[[str], None]]] = None,
+) -> _Prepared:
+    """Pack `matches` into the prompt; `store(packed)` makes the answer-cache callback."""
+    budget = _context_budget(question)
+    context, packed, used = _build_context(matches, budget)
+    if emit:
+        emit("rag.context", {"tokens": used, "budget": budget, "chunks": len(packed), "dropped": len(matches) - len(packed)})
+    if not packed:
+        return _Prepared({"ok": False, "reason": "no_context", "matches": []})
+    return _Prepared(prompt=_prompt(context, question), matches=packed, store=store(packed) if store else None)
+
+
+async def _cosine_scored(qvec, matches: List[dict], candidates: List[dict], namespace: str) -> List[dict]:
+    """Fused matches with their cosine similarity to the question as "score".
+
+    Lexical hits arrive scored by BM25; their vectors come from the wide
+    vector candidates when there, else from the store. Hits whose vector
+    is gone (deleted since they were indexed) are dropped.
+    """
+    pool = {c["id"]: c for c in candidates}
+    missing = [m["id"] for m in matches if m["id"] not in pool]
+    fetched = await fetch_vectors_async(missing, namespace) if missing else {}
+    q = np.asarray(qvec, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+    scored = []
+    for m in matches:
+        if m["id"] in pool:
+            scored.append({**m, "score": pool[m["id"]]["score"]})
+        elif m["id"] in fetched:
+            v = np.asarray(fetched[m["id"]], dtype=np.float32)
+            scored.append({**m, "score": float(v @ q) / max(float(np.linalg.norm(v)), 1e-12)})
+    return scored
+
+
+async def _prepare(
+    question: str,
+    namespace: str,
+    top_k: Optional[int],
+    threshold: float,
+    emit: Optional[Callable[[str, Dict[str, Any]], None]],
+) -> _Prepared:
+    top_k = int(top_k) if top_k and int(top_k) > 0 else 6
+    # One wide query; the threshold cascade and reranking run locally.
+    candidate_k = max(top_k * CANDIDATE_MULTIPLIER, MIN_CANDIDATES)
+
+    # Questions naming an identifier try the lexical index first: when one
+    # chunk contains every query term, answer from it without embedding the
+    # question. With no query vector there is no cosine score; report term
+    # coverage (0-1) as the score rather than an unbounded BM25 value.
+    lexical = None
+    if LEXICAL_FAST_PATH and _names_identifier(question):
+        lexical = await lexical_query_async(question, top_k=candidate_k, namespace=namespace)
+        if lexical and lexical[0]["coverage"] >= 1.0:
+            matches = [
+                {**m, "score": m["coverage"], "bm25": m["score"]}
+                for m in lexical if m["coverage"] >= LEXICAL_MIN_COVERAGE
+            ][:top_k]
+            if emit: emit("rag.lexical.fast_path", {"hits": len(lexical), "matches": len(matches)})
+            return _with_context(question, matches, emit)
+
+    if emit: emit("rag.embed_query.start", {"question": question})
+    qvec = (await get_embeddings_async([question], dimensions=namespace_dimensions(namespace)))[0]
+    if emit: emit("rag.embed_query.end", {"dim": len(qvec)})
+
+    # Near-duplicate questions against an unchanged namespace reuse the cached answer.
+    cache = get_answer_cache()
+    cache_key = (namespace, top_k, threshold)
+    version = await asyncio.to_thread(get_namespace_versions().get, namespace) if cache is not None else 0
+    if cache is not None:
+        cached = cache.lookup(cache_key, version, qvec)
+        if cached is not None:
+            if emit: emit("rag.cache.hit", {"similarity": round(cached["similarity"], 4), "question": cached["question"]})
+            return _Prepared({"ok": True, "answer": cached["answer"], "matches": cached["matches"], "cached": True})
+
+    if emit: emit("rag.query_pinecone.start", {"namespace": namespace, "top_k": candidate_k, "threshold": threshold})
+    vector_query = query_chunks_async(qvec, top_k=candidate_k, namespace=namespace, include_values=True)
+    if lexical is None:
+        candidates, lexical = await asyncio.gather(
+            vector_query, lexical_query_async(question, top_k=candidate_k, namespace=namespace)
+        )
+    else:
+        candidates = await vector_query
+    if emit: emit("rag.query_pinecone.end", {"hits": len(candidates), "lexical_hits": len(lexical)})
+
+    matches = []
+    for i, cutoff in enumerate(_threshold_cascade(threshold)):
+        if i and emit: emit("rag.retry_lower_threshold", {"new_threshold": cutoff})
+        matches = [c for c in candidates if c["score"] >= cutoff]
+        if matches:
             break
-    return "\n---\n".join(lines)
 
+    # MMR diversifies the vector matches (it needs their vectors); lexical
+    # hits then join by rank fusion. Without any vector match they must
+    # hold every query term, or a stray keyword would pre-empt the agent's
+    # own search for better sources.
+    matches = mmr(qvec, matches, top_k, MMR_LAMBDA)
+    min_coverage = LEXICAL_MIN_COVERAGE if matches else 1.0
+    lexical = [m for m in lexical if m["coverage"] >= min_coverage]
+    if lexical:
+        if emit: emit("rag.hybrid", {"vector": len(matches), "lexical": len(lexical)})
+        matches = await _cosine_scored(qvec, rrf([matches, lexical], RRF_K)[:top_k], candidates, namespace)
 
-def answer_with_rag(
+    if not matches:
+        if emit: emit("rag.debug_all_results", {
+            "total_available": len(candidates),
+            "scores": [c["score"] for c in candidates[:5]],
+            "sample_texts": [c["text"][:50] for c in candidates[:3]]
+        })
+        return _Prepared({"ok": False, "reason": "no_context", "matches": []})
+
+    matches = [_without_values(m) for m in matches]
+    if emit:
+        emit("rag.debug", {"matches": [{"score": m["score"], "text_preview": m["text"][:100]} for m in matches]})
+
+    def store(packed: List[dict]) -> Callable[[str], None]:
+        def save(answer: str) -> None:
+            if cache is not None:
+                cache.store(cache_key, version, question, qvec, answer, packed)
+        return save
+
+    return _with_context(question, matches, emit, store)
+
+
+async def answer_with_rag_async(
     question: str,
     namespace: str,
     top_k: Optional[int] = 3,
     threshold: float = 0.50,
     emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
 ) -> dict:
-    top_k = int(top_k) if top_k and int(top_k) > 0 else 6
+    prepared = await _prepare(question, namespace, top_k, threshold, emit)
+    if prepared.result is not None:
+        return prepared.result
 
-    if emit: emit("rag.embed_query.start", {"question": question})
-    qvec = get_embeddings([question])[0]
-    if emit: emit("rag.embed_query.end", {"dim": len(qvec)})
+    if emit: emit("rag.llm.answer.start", {"model": ANSWER_MODEL})
+    answer = await chat_completion_async(prepared.prompt, model=ANSWER_MODEL, max_tokens=ANSWER_MAX_TOKENS)
+    if emit: emit("rag.llm.answer.end", {"chars": len(answer)})
 
-    if emit: emit("rag.query_pinecone.start", {"namespace": namespace, "top_k": top_k, "threshold": threshold})
-    matches = query_chunks(qvec, top_k=top_k, namespace=namespace, score_threshold=threshold)
-    if emit: emit("rag.query_pinecone.end", {"hits": len(matches)})
+    if emit: emit("rag.complete", {"matches": len(prepared.matches), "answer_chars": len(answer)})
+    prepared.store(answer)
+    return {"ok": True, "answer": answer, "matches": prepared.matches}
 
-    if emit and matches:
-        emit("rag.debug", {"matches": [{"score": m["score"], "text_preview": m["text"][:100]} for m in matches]})
 
-    if not matches:
-        if emit: emit("rag.retry_lower_threshold", {"new_threshold": 0.3})
-        matches = query_chunks(qvec, top_k=top_k, namespace=namespace, score_threshold=0.3)
-        if emit: emit("rag.retry_result", {"hits": len(matches)})
-        
-        if not matches:
-            if emit: emit("rag.debug_no_threshold", {"checking_all_results": True})
-            all_matches = query_chunks(qvec, top_k=10, namespace=namespace, score_threshold=None)
-            if emit: emit("rag.debug_all_results", {
-                "total_available": len(all_matches),
-                "scores": [m["score"] for m in all_matches[:5]],
-                "sample_texts": [m["text"][:50] for m in all_matches[:3]]
-            })
-            return {"ok": False, "reason": "no_context", "matches": []}
-
-    context = _build_context(matches)
-    prompt = (
-        f"{SYSTEM}\n\nContext:\n{context}\n\n"
-        f"Question: {question}\n\nAnswer with citations."
-    )
+async def stream_answer_with_rag_async(
+    question: str,
+    namespace: str,
+    top_k: Optional[int] = 3,
+    threshold: float = 0.50,
+    emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Streaming variant of answer_with_rag_async.
+
+    Yields {"type": "delta", "text"} as the model produces tokens, then
+    {"type": "result", **result} where result is what answer_with_rag_async
+    would return. A cached answer arrives as a single delta.
+    """
+    prepared = await _prepare(question, namespace, top_k, threshold, emit)
+    if prepared.result is not None:
+        if prepared.result.get("ok"):
+            yield {"type": "delta", "text": prepared.result["answer"]}
+        yield {"type": "result", **prepared.result}
+        return
 
-    model = "gpt-4o-mini"
-    if emit: emit("rag.llm.answer.start", {"model": model})
-    answer = chat_completion(prompt, model=model, max_tokens=500)
+    if emit: emit("rag.llm.answer.start", {"model": ANSWER_MODEL, "stream": True})
+    parts: List[str] = []
+    async for delta in stream_chat_async(prepared.prompt, model=ANSWER_MODEL, max_tokens=ANSWER_MAX_TOKENS):
+        parts.append(delta)
+        yield {"type": "delta", "text": delta}
+    answer = "".join(parts)
     if emit: emit("rag.llm.answer.end", {"chars": len(answer)})
 
-    if emit: emit("rag.complete", {"matches": len(matches), "answer_chars": len(answer)})
+    if emit: emit("rag.complete", {"matches": len(prepared.matches), "answer_chars": len(answer)})
+    prepared.store(answer)
+    yield {"type": "result", "ok": True, "answer": answer, "matches": prepared.matches}
 
-    return {"ok": True, "answer": answer, "matches": matches}
+
+def answer_with_rag(
+    question: str,
+    namespace: str,
+    top_k: Optional[int] = 3,
+    threshold: float = 0.50,
+    emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> dict:
+    """Blocking wrapper around answer_with_rag_async for scripts and sync callers."""
+    return asyncio.run(answer_with_rag_async(question, namespace, top_k, threshold, emit))
@@ -0,0 +1,58 @@
+from typing import List
+
+import numpy as np
+
+
+def mmr(query_vector, matches: List[dict], k: int, lambda_: float = 0.7) -> List[dict]:
+    """Pick `k` matches by maximal marginal relevance.
+
+    Each step takes the candidate maximizing
+    `lambda_ * sim(query, c) - (1 - lambda_) * max sim(c, already picked)`,
+    so overlapping chunks (neighbours from the chunker's overlap, repeated
+    passages) don't crowd out other relevant text. Matches need "values";
+    ones without fall back to plain score order.
+    """
+    if len(matches) <= 1 or k <= 0:
+        return matches[:k]
+    if any("values" not in m for m in matches):
+        return sorted(matches, key=lambda m: m["score"], reverse=True)[:k]
+
+    vectors = np.asarray([m["values"] for m in matches], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query_vector, dtype=np.float32)
+    # Not in place: the query vector may be the caller's (or a read-only cache) array.
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+    relevance = vectors @ q
+    similarity = vectors @ vectors.T
+    picked: List[int] = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to anything picked so far.
+    redundancy = similarity[picked[0]].copy()
+    available = np.ones(len(matches), dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < min(k, len(matches)):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return [matches[i] for i in picked]
+
+
+def rrf(rankings: List[List[dict]], k: int = 60) -> List[dict]:
+    """Fuse ranked match lists by reciprocal rank fusion.
+
+    A match scores `sum(1 / (k + rank))` over the lists it appears in
+    (ranks from 1), so only positions matter and lists with incomparable
+    scores (cosine, BM25) combine cleanly. Fused matches keep the fields of
+    their first occurrence, earlier lists first, and carry the fused score
+    as "rrf_score" ("score" is left alone). Returned best first.
+    """
+    first: dict = {}
+    scores: dict = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, 1):
+            first.setdefault(match["id"], match)
+            scores[match["id"]] = scores.get(match["id"], 0.0) + 1.0 / (k + rank)
+    return sorted(({**m, "rrf_score": scores[id_]} for id_, m in first.items()), key=lambda m: m["rrf_score"], reverse=True)
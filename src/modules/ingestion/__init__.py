@@ -0,0 +1 @@
+# Background ingestion jobs
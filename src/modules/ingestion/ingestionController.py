@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import os
+
+from src.modules.analysis.events import sse
+from .jobStore import get_job_store
+from .ingestionService import create_job, get_job_runner
+
+# How often the SSE stream re-reads job progress from the store.
+INGEST_POLL_S = float(os.getenv("INGEST_POLL_S", "1"))
+
+ingestionRouter = APIRouter(prefix="/ingestion", tags=["ingestion"])
+
+class CreateJobBody(BaseModel):
+    namespace: str = "default"
+    arxivIds: Optional[List[str]] = None
+    query: Optional[str] = None
+    maxResults: int = 10
+
+
+def _get_job(job_id: str, include_papers: bool = True) -> dict:
+    job = get_job_store().get(job_id, include_papers)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@ingestionRouter.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_ingestion_job(body: CreateJobBody):
+    try:
+        job_id = await asyncio.to_thread(
+            create_job, body.namespace, body.arxivIds, body.query, body.maxResults
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    get_job_runner().submit(job_id)
+    return {"job": await asyncio.to_thread(_get_job, job_id, False)}
+
+
+@ingestionRouter.get("/jobs")
+async def list_ingestion_jobs(limit: int = 50):
+    return {"jobs": await asyncio.to_thread(get_job_store().list, limit)}
+
+
+@ingestionRouter.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    return {"job": await asyncio.to_thread(_get_job, job_id)}
+
+
+@ingestionRouter.get("/jobs/{job_id}/events")
+async def stream_ingestion_job(job_id: str):
+    """
+    SSE stream of job progress: a snapshot whenever the job changes, until it finishes.
+    """
+    await asyncio.to_thread(_get_job, job_id, False)
+
+    async def event_generator():
+        last_updated = None
+        while True:
+            job = await asyncio.to_thread(get_job_store().get, job_id, False)
+            if job["updated"] != last_updated:
+                last_updated = job["updated"]
+                yield sse({"event": "job.progress", "data": job})
+            if job["status"] in ("done", "failed"):
+                yield sse({"event": "complete", "data": job})
+                return
+            await asyncio.sleep(INGEST_POLL_S)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+    )
@@ -0,0 +1,172 @@
+import os
+import asyncio
+import threading
+from typing import Optional, List, Dict
+
+from src.agents.tools.utils import download_pdf_async, extract_arxiv_pages_async, search_arxiv_async, extract_arxiv_id, document_id
+from src.agents.tools.ingest_pipeline import ingest_pdf_stream
+from src.modules.vectorstore import write_buffer
+from .jobStore import JobStore, get_job_store
+
+# Papers of one job in flight at once.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Per-stage limits, shared by every job in the process: arXiv asks for gentle
+# downloads, extraction is CPU bound, indexing is bound by OpenAI/Pinecone quota.
+INGEST_DOWNLOAD_CONCURRENCY = int(os.getenv("INGEST_DOWNLOAD_CONCURRENCY", "2"))
+INGEST_EXTRACT_CONCURRENCY = int(os.getenv("INGEST_EXTRACT_CONCURRENCY", "2"))
+INGEST_INDEX_CONCURRENCY = int(os.getenv("INGEST_INDEX_CONCURRENCY", "2"))
+# A running job whose heartbeat is older than this is taken over on startup.
+INGEST_STALE_S = float(os.getenv("INGEST_STALE_S", "120"))
+INGEST_MAX_PAPERS = int(os.getenv("INGEST_MAX_PAPERS", "1000"))
+
+
+class JobRunner:
+    """Runs ingestion jobs in the background of the current event loop.
+
+    Each job fans its papers out to `workers` coroutines; every paper then
+    passes download -> extract -> index, each stage behind its own
+    semaphore, so a slow stage queues papers instead of piling up memory or
+    connections. Progress is written to the JobStore after every stage.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        workers: int = INGEST_WORKERS,
+        download_concurrency: int = INGEST_DOWNLOAD_CONCURRENCY,
+        extract_concurrency: int = INGEST_EXTRACT_CONCURRENCY,
+        index_concurrency: int = INGEST_INDEX_CONCURRENCY,
+    ):
+        self.store = store or get_job_store()
+        self.workers = workers
+        self.owner = f"{os.getpid()}-{id(self):x}"
+        self._download = asyncio.Semaphore(download_concurrency)
+        self._extract = asyncio.Semaphore(extract_concurrency)
+        self._index = asyncio.Semaphore(index_concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, job_id: str) -> bool:
+        """Start running a job unless it is already running here or owned by a live process."""
+        if job_id in self._tasks or not self.store.claim(job_id, self.owner, INGEST_STALE_S):
+            return False
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return True
+
+    def resume(self) -> List[str]:
+        """Pick up jobs left unfinished by a stopped or crashed process."""
+        return [job_id for job_id in self.store.stale_jobs(INGEST_STALE_S) if self.submit(job_id)]
+
+    async def shutdown(self) -> None:
+        # Jobs stay "running" in the store; their heartbeat goes stale and the
+        # next process to start resumes them from the unfinished papers.
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(INGEST_STALE_S / 4)
+            await asyncio.to_thread(self.store.heartbeat, job_id)
+
+    async def _run(self, job_id: str) -> None:
+        beat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            job = await asyncio.to_thread(self.store.get, job_id, False)
+            if job["query"] and job["progress"]["total"] == 0:
+                await self._resolve_query(job_id, job["query"], job["max_results"])
+            pending = await asyncio.to_thread(self.store.pending_papers, job_id)
+            queue: asyncio.Queue = asyncio.Queue()
+            for arxiv_id in pending:
+                queue.put_nowait(arxiv_id)
+            await asyncio.gather(*(self._worker(job_id, job["namespace"], queue) for _ in range(self.workers)))
+            job = await asyncio.to_thread(self.store.get, job_id, False)
+            progress = job["progress"]
+            if progress["total"] and progress["failed"] == progress["total"]:
+                await asyncio.to_thread(self.store.finish, job_id, "failed", "every paper failed")
+            else:
+                await asyncio.to_thread(self.store.finish, job_id, "done")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, "failed", str(e))
+        finally:
+            beat.cancel()
+
+    async def _resolve_query(self, job_id: str, query: str, max_results: int) -> None:
+        results = await search_arxiv_async(query, max_results=max_results or 10)
+        arxiv_ids = [arxiv_id for arxiv_id in (extract_arxiv_id(r["url"]) for r in results) if arxiv_id]
+        await asyncio.to_thread(self.store.add_papers, job_id, arxiv_ids)
+
+    async def _worker(self, job_id: str, namespace: str, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            arxiv_id = queue.get_nowait()
+            try:
+                await self._ingest_paper(job_id, namespace, arxiv_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.store.update_paper, job_id, arxiv_id, status="failed", error=str(e))
+
+    async def _ingest_paper(self, job_id: str, namespace: str, arxiv_id: str) -> None:
+        update = self.store.update_paper
+
+        await asyncio.to_thread(update, job_id, arxiv_id, status="download")
+        async with self._download:
+            pdf_content = await download_pdf_async(arxiv_id)
+        if not pdf_content:
+            raise RuntimeError(f"Could not download PDF for {arxiv_id}")
+
+        await asyncio.to_thread(update, job_id, arxiv_id, status="extract")
+        async with self._extract:
+            pages = await extract_arxiv_pages_async(arxiv_id, pdf_content)
+        await asyncio.to_thread(update, job_id, arxiv_id, pages=len(pages))
+
+        await asyncio.to_thread(update, job_id, arxiv_id, status="index")
+        async with self._index:
+            result = await ingest_pdf_stream(
+                pdf_content,
+                namespace=namespace,
+                meta={"arxiv_id": arxiv_id},
+                pages=pages,
+                doc_id=document_id(arxiv_id),
+            )
+        # Nobody is waiting to query a background paper right away, so don't
+        # hold its vectors for read-after-write; the index serves them shortly.
+        write_buffer.forget(result.get("ids") or [], namespace)
+        if not result.get("ok"):
+            raise RuntimeError(result.get("error") or "indexing failed")
+        await asyncio.to_thread(
+            update, job_id, arxiv_id,
+            status="done", chunks=result["chunks_count"], upserted=result["upserted"], error=None,
+        )
+
+
+def create_job(namespace: str, arxiv_ids: Optional[List[str]] = None, query: Optional[str] = None,
+               max_results: int = 10) -> str:
+    """Record a job for a list of arXiv ids/URLs, or for the results of a search query."""
+    ids = []
+    for item in arxiv_ids or []:
+        arxiv_id = extract_arxiv_id(item) if "arxiv.org" in item else item.strip()
+        if arxiv_id and arxiv_id not in ids:
+            ids.append(arxiv_id)
+    if not ids and not query:
+        raise ValueError("Provide arxiv ids or a search query")
+    if len(ids) > INGEST_MAX_PAPERS or max_results > INGEST_MAX_PAPERS:
+        raise ValueError(f"At most {INGEST_MAX_PAPERS} papers per job")
+    return get_job_store().create(namespace, ids, query=None if ids else query, max_results=max_results)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """Process-wide runner; first call must happen on the server's event loop."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
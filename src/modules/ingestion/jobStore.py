@@ -0,0 +1,205 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Optional, List
+
+INGEST_JOBS_DB = os.getenv("INGEST_JOBS_DB", ".cache/ingest_jobs.sqlite3")
+
+# Job states: queued -> running -> done | failed. A paper moves through
+# queued -> download -> extract -> index -> done | failed.
+FINAL_PAPER_STATES = ("done", "failed")
+
+
+class JobStore:
+    """Durable ingestion job state.
+
+    Every paper's stage and counts are written as they change, so a status
+    request from any worker process sees live progress and a job interrupted
+    by a restart can be resumed from the papers that are not finished yet.
+    `heartbeat` is refreshed by whichever process runs the job; a job whose
+    heartbeat has gone stale is free to be claimed by another.
+    """
+
+    def __init__(self, path: str = INGEST_JOBS_DB):
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                query TEXT,
+                max_results INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                error TEXT,
+                owner TEXT,
+                heartbeat REAL NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_papers (
+                job_id TEXT NOT NULL,
+                arxiv_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                upserted INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated REAL NOT NULL,
+                PRIMARY KEY (job_id, arxiv_id)
+            );
+            """
+        )
+
+    def create(self, namespace: str, arxiv_ids: List[str], query: Optional[str] = None, max_results: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """INSERT INTO jobs (id, namespace, query, max_results, status, created, updated)
+                       VALUES (?, ?, ?, ?, 'queued', ?, ?)""",
+                    (job_id, namespace, query, max_results, now, now),
+                )
+                self._insert_papers(job_id, arxiv_ids, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def _insert_papers(self, job_id: str, arxiv_ids: List[str], now: float) -> None:
+        # Caller holds self._lock inside a transaction.
+        start = self._conn.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM job_papers WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+        self._conn.executemany(
+            """INSERT OR IGNORE INTO job_papers (job_id, arxiv_id, position, status, updated)
+               VALUES (?, ?, ?, 'queued', ?)""",
+            [(job_id, arxiv_id, start + i, now) for i, arxiv_id in enumerate(arxiv_ids)],
+        )
+
+    def add_papers(self, job_id: str, arxiv_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert_papers(job_id, arxiv_ids, time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, job_id: str, owner: str, stale_after: float) -> bool:
+        """Take ownership of an active job unless another live process holds it."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                """UPDATE jobs SET owner = ?, heartbeat = ?, status = 'running', updated = ?
+                   WHERE id = ? AND status IN ('queued', 'running')
+                     AND (owner IS NULL OR owner = ? OR heartbeat < ?)""",
+                (owner, now, now, job_id, owner, now - stale_after),
+            )
+        return cur.rowcount == 1
+
+    def stale_jobs(self, stale_after: float) -> List[str]:
+        """Active jobs nobody has touched for `stale_after` seconds (e.g. their process died)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND heartbeat < ? ORDER BY created",
+                (time.time() - stale_after,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def heartbeat(self, job_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat = ?, updated = ? WHERE id = ?", (now, now, job_id))
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated = ? WHERE id = ?",
+                (status, error, now, job_id),
+            )
+
+    def update_paper(self, job_id: str, arxiv_id: str, **fields) -> None:
+        """Set any of status/pages/chunks/upserted/error on one paper."""
+        now = time.time()
+        columns = [c for c in ("status", "pages", "chunks", "upserted", "error") if c in fields]
+        assignments = "".join(f"{c} = ?, " for c in columns)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE job_papers SET {assignments}updated = ? WHERE job_id = ? AND arxiv_id = ?",
+                (*(fields[c] for c in columns), now, job_id, arxiv_id),
+            )
+            self._conn.execute("UPDATE jobs SET heartbeat = ?, updated = ? WHERE id = ?", (now, now, job_id))
+
+    def pending_papers(self, job_id: str) -> List[str]:
+        """Papers of a job that still need work, in submission order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT arxiv_id FROM job_papers WHERE job_id = ? AND status NOT IN (?, ?) ORDER BY position",
+                (job_id, *FINAL_PAPER_STATES),
+            ).fetchall()
+        return [row["arxiv_id"] for row in rows]
+
+    def get(self, job_id: str, include_papers: bool = True) -> Optional[dict]:
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            papers = self._conn.execute(
+                """SELECT arxiv_id, status, pages, chunks, upserted, error, updated
+                   FROM job_papers WHERE job_id = ? ORDER BY position""",
+                (job_id,),
+            ).fetchall()
+        by_status: dict = {}
+        for paper in papers:
+            by_status[paper["status"]] = by_status.get(paper["status"], 0) + 1
+        result = {
+            "id": job["id"],
+            "namespace": job["namespace"],
+            "query": job["query"],
+            "max_results": job["max_results"],
+            "status": job["status"],
+            "error": job["error"],
+            "created": job["created"],
+            "updated": job["updated"],
+            "progress": {
+                "total": len(papers),
+                "done": by_status.get("done", 0),
+                "failed": by_status.get("failed", 0),
+                "by_status": by_status,
+                "chunks": sum(p["chunks"] for p in papers),
+                "upserted": sum(p["upserted"] for p in papers),
+            },
+        }
+        if include_papers:
+            result["papers"] = [dict(p) for p in papers]
+        return result
+
+    def list(self, limit: int = 50) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [job for job in (self.get(row["id"], include_papers=False) for row in rows) if job is not None]
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
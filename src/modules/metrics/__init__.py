@@ -0,0 +1 @@
+# Process metrics exposed at /metrics
@@ -0,0 +1,290 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans cache hits (sub-ms) to slow LLM completions and PDF downloads.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """A metric family: one child per distinct label values.
+
+    `labels(...)` resolves a child with one dict lookup; hold on to the
+    child for the hottest paths. Families without labels proxy their single
+    child. Each child guards its numbers with its own lock, so recording is
+    a lock, an add and (for histograms) a bisect.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Sample]:
+        yield f"{name}_total", labels, self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def track_inprogress(self) -> "_InProgress":
+        return _InProgress(self)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Sample]:
+        yield name, labels, self.value
+
+
+class _InProgress:
+    __slots__ = ("gauge",)
+
+    def __init__(self, gauge: _GaugeChild):
+        self.gauge = gauge
+
+    def __enter__(self):
+        self.gauge.inc()
+        return self
+
+    def __exit__(self, *exc):
+        self.gauge.dec()
+        return False
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Sample]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+
+class _Timer:
+    """Context manager observing elapsed seconds; counts a stage error when the block raises."""
+
+    __slots__ = ("histogram", "errors", "started")
+
+    def __init__(self, histogram: _HistogramChild, errors: Optional[_CounterChild] = None):
+        self.histogram = histogram
+        self.errors = errors
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        if exc_type is not None and self.errors is not None and not issubclass(exc_type, GeneratorExit):
+            self.errors.inc()
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]) -> None:
+        """Add a callable run at scrape time yielding (name, kind, help, samples).
+
+        For numbers that already live elsewhere (e.g. cache stats), so the
+        hot path pays nothing for exposing them.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, documentation: str, samples: Iterable[Sample]) -> None:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        for metric in list(self._metrics):
+            family(metric.name, metric.kind, metric.documentation, metric.samples())
+        for collector in list(self._collectors):
+            try:
+                for name, kind, documentation, samples in collector():
+                    family(name, kind, documentation, samples)
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metrics are per worker process; each uvicorn worker reports its own numbers
+# and Prometheus aggregates across them.
+STAGE_SECONDS = Histogram(
+    "analyzer_stage_duration_seconds",
+    "Time spent per pipeline stage.",
+    ["stage"],
+)
+STAGE_ERRORS = Counter("analyzer_stage_errors", "Pipeline stage calls that raised.", ["stage"])
+BYTES_PROCESSED = Counter("analyzer_bytes_processed", "Bytes (or characters, for text stages) handled per stage.", ["stage"])
+TOKENS_PROCESSED = Counter("analyzer_tokens_processed", "Tokens sent to or received from OpenAI.", ["model", "kind"])
+ITEMS_PROCESSED = Counter("analyzer_items_processed", "Items handled per stage (chunks, vectors, results, pages).", ["stage"])
+HTTP_IN_FLIGHT = Gauge("analyzer_http_requests_in_flight", "HTTP requests currently being served.", ["route"])
+HTTP_SECONDS = Histogram(
+    "analyzer_http_request_duration_seconds",
+    "Time until the response (or the end of its stream) was sent.",
+    ["route", "method", "status"],
+)
+
+STAGES = (
+    "scout_search", "pdf_download", "pdf_extract", "chunk", "embed",
+    "vector_query", "lexical_query", "lexical_index", "upsert", "llm_completion", "llm_first_token", "agent_llm",
+)
+
+
+def timed(stage: str) -> _Timer:
+    """`with timed("embed"): ...` records the block's duration under `stage`."""
+    return _Timer(STAGE_SECONDS.labels(stage), STAGE_ERRORS.labels(stage))
+
+def count_error(stage: str) -> None:
+    STAGE_ERRORS.labels(stage).inc()
+
+def observe(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+def count_bytes(stage: str, amount: int) -> None:
+    BYTES_PROCESSED.labels(stage).inc(amount)
+
+def count_items(stage: str, amount: int) -> None:
+    ITEMS_PROCESSED.labels(stage).inc(amount)
+
+def count_tokens_used(model: str, kind: str, amount: int) -> None:
+    TOKENS_PROCESSED.labels(model, kind).inc(amount)
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# Pre-create the stage children so every stage is exported from the first
+# scrape (with zero counts) and lookups on the hot path never allocate.
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)
+    STAGE_ERRORS.labels(_stage)
@@ -0,0 +1,47 @@
+import time
+
+from starlette.routing import Match
+
+from .metrics import HTTP_IN_FLIGHT, HTTP_SECONDS
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording in-flight requests and request duration per route.
+
+    Duration runs until the last body chunk is sent, so SSE endpoints are
+    measured over the whole stream rather than until the headers went out.
+    Routes are labelled by their path template ("/ingestion/jobs/{job_id}"),
+    never by the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route(self, scope) -> str:
+        router = getattr(scope.get("app"), "router", None)
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        with HTTP_IN_FLIGHT.labels(route).track_inprogress():
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                HTTP_SECONDS.labels(route, scope["method"], status).observe(time.perf_counter() - started)
@@ -0,0 +1,162 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Awaitable, Optional
+
+import numpy as np
+
+from .tokenizer import get_encoding
+
+# Provider limits for /v1/embeddings, with some headroom on the token cap.
+MAX_INPUTS_PER_REQUEST = int(os.getenv("EMBEDDING_MAX_INPUTS_PER_REQUEST", "2048"))
+MAX_TOKENS_PER_REQUEST = int(os.getenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", "250000"))
+MAX_TOKENS_PER_INPUT = 8191
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _fit_input(text: str, model: str) -> tuple[str, int]:
+    """Return the text clipped to the per-input token limit, and its token count."""
+    enc = get_encoding(model)
+    if enc is None:
+        tokens = len(text) // 4 + 1
+        if tokens > MAX_TOKENS_PER_INPUT:
+            text = text[: MAX_TOKENS_PER_INPUT * 4]
+            tokens = MAX_TOKENS_PER_INPUT
+        return text, tokens
+    ids = enc.encode(text, disallowed_special=())
+    if len(ids) > MAX_TOKENS_PER_INPUT:
+        ids = ids[:MAX_TOKENS_PER_INPUT]
+        text = enc.decode(ids)
+    return text, len(ids)
+
+def plan_batches(
+    texts: list[str],
+    model: str,
+    max_items: int = MAX_INPUTS_PER_REQUEST,
+    max_tokens: int = MAX_TOKENS_PER_REQUEST,
+) -> list[list[str]]:
+    """Split `texts` into consecutive sub-batches within item and token limits.
+
+    Concatenating the returned batches gives back the (clipped) inputs in order.
+    """
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in texts:
+        text, tokens = _fit_input(text, model)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def is_retryable(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUS
+    # Connection errors and timeouts carry no status code.
+    return type(e).__name__ in {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout"}
+
+def _backoff(e: Exception, attempt: int) -> float:
+    response = getattr(e, "response", None)
+    retry_after = None
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is not None:
+        return min(retry_after, 60.0)
+    return min(0.5 * (2 ** attempt), 20.0) * (0.5 + random.random() / 2)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY, thread_name_prefix="embed")
+    return _executor
+
+def embed_in_batches(
+    texts: list[str],
+    embed_batch: Callable[[list[str]], np.ndarray],
+    model: str,
+    max_concurrency: int = EMBEDDING_CONCURRENCY,
+    max_retries: int = EMBEDDING_MAX_RETRIES,
+) -> np.ndarray:
+    """Embed `texts` through `embed_batch` in token-aware sub-batches on a thread pool.
+
+    Results come back as one matrix in input order. A failing sub-batch is
+    retried with exponential backoff; the last error is raised once retries
+    run out.
+    """
+    batches = plan_batches(texts, model)
+    if len(batches) == 1:
+        return _call_with_retry(embed_batch, batches[0], max_retries)
+
+    semaphore = threading.Semaphore(max_concurrency)
+
+    def run(batch: list[str]) -> np.ndarray:
+        with semaphore:
+            return _call_with_retry(embed_batch, batch, max_retries)
+
+    futures = [_get_executor().submit(run, batch) for batch in batches]
+    return np.concatenate([future.result() for future in futures])
+
+async def embed_in_batches_async(
+    texts: list[str],
+    embed_batch: Callable[[list[str]], Awaitable[np.ndarray]],
+    model: str,
+    max_concurrency: int = EMBEDDING_CONCURRENCY,
+    max_retries: int = EMBEDDING_MAX_RETRIES,
+) -> np.ndarray:
+    """Async variant of embed_in_batches; sub-batches run as concurrent tasks."""
+    batches = plan_batches(texts, model)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(batch: list[str]) -> np.ndarray:
+        async with semaphore:
+            return await _call_with_retry_async(embed_batch, batch, max_retries)
+
+    if len(batches) == 1:
+        return await run(batches[0])
+    return np.concatenate(await asyncio.gather(*(run(batch) for batch in batches)))
+
+def _call_with_retry(embed_batch, batch: list[str], max_retries: int) -> np.ndarray:
+    attempt = 0
+    while True:
+        try:
+            return _checked(embed_batch(batch), batch)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            time.sleep(_backoff(e, attempt))
+            attempt += 1
+
+async def _call_with_retry_async(embed_batch, batch: list[str], max_retries: int) -> np.ndarray:
+    attempt = 0
+    while True:
+        try:
+            return _checked(await embed_batch(batch), batch)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(_backoff(e, attempt))
+            attempt += 1
+
+def _checked(vectors: np.ndarray, batch: list[str]) -> np.ndarray:
+    if len(vectors) != len(batch):
+        raise ValueError(f"embedding API returned {len(vectors)} vectors for {len(batch)} inputs")
+    return vectors
@@ -0,0 +1,167 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") != "0"
+
+# Evict down to this fraction of the cap so we don't evict on every insert.
+_LOW_WATER = 0.9
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+def _encode(vector) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+def _decode(blob: bytes) -> np.ndarray:
+    # Read-only view over the row's bytes; callers copy when they stack rows.
+    return np.frombuffer(blob, dtype="<f4")
+
+
+class EmbeddingCache:
+    """Content-addressed embedding store on SQLite.
+
+    Rows are keyed by (model, sha256(text)) and hold float32 blobs, so a
+    1536-dim vector costs 6 KB on disk. Least-recently-used rows are evicted
+    once the total blob size passes `max_bytes`. Safe to share between threads;
+    several workers may point at the same file (WAL mode).
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """Return cached vectors aligned with `texts`, None for misses."""
+        if not texts:
+            return []
+        hashes = [text_hash(t) for t in texts]
+        found: dict[bytes, bytes] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+            results = [_decode(found[h]) if h in found else None for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model: str, texts: list[str], vectors) -> None:
+        if not texts:
+            return
+        now = time.time()
+        rows = []
+        for text, vec in zip(texts, vectors):
+            blob = _encode(vec)
+            rows.append((model, text_hash(text), blob, len(blob), now))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    if cur.rowcount:
+                        self._total_bytes += row[3]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * _LOW_WATER)
+        # Other workers may have written to the same file; resync first.
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            freed = 0
+            victims = []
+            for model, h, size in rows:
+                victims.append((model, h))
+                freed += size
+                if self._total_bytes - freed <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+            self._total_bytes -= freed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._total_bytes = 0
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide cache, or None when disabled via EMBEDDING_CACHE_ENABLED=0."""
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,44 @@
+import os
+from typing import Optional
+
+# Native output sizes. text-embedding-3 models can also return shortened
+# (still unit-length) vectors through the API's `dimensions` parameter.
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+_REDUCIBLE_PREFIX = "text-embedding-3-"
+
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+
+def _parse_overrides(spec: str) -> dict[str, int]:
+    overrides = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        namespace, _, dims = part.rpartition("=")
+        try:
+            overrides[namespace.strip()] = int(dims)
+        except ValueError:
+            print(f"Ignoring malformed EMBEDDING_NAMESPACE_DIMENSIONS entry {part!r}")
+    return overrides
+
+# Per-namespace sizes, e.g. "scratch=256,papers=512"; other namespaces use EMBEDDING_DIMENSIONS.
+NAMESPACE_DIMENSIONS = _parse_overrides(os.getenv("EMBEDDING_NAMESPACE_DIMENSIONS", ""))
+
+def namespace_dimensions(namespace: str) -> int:
+    """Embedding size used for every vector written to or queried from `namespace`."""
+    return NAMESPACE_DIMENSIONS.get(namespace, EMBEDDING_DIMENSIONS)
+
+def request_dimensions(model: str, dimensions: Optional[int]) -> Optional[int]:
+    """The `dimensions` value to send for `model`, or None for its native size."""
+    if dimensions is None or dimensions == NATIVE_DIMENSIONS.get(model):
+        return None
+    if not model.startswith(_REDUCIBLE_PREFIX):
+        raise ValueError(f"{model} does not support reduced dimensions (asked for {dimensions})")
+    return dimensions
+
+def output_dimensions(model: str, dimensions: Optional[int]) -> int:
+    """Length of the vectors `model` returns when asked for `dimensions`."""
+    return dimensions or NATIVE_DIMENSIONS.get(model, EMBEDDING_DIMENSIONS)
@@ -1,51 +1,286 @@
 import os
 import time
-from typing import Iterable
-from functools import wraps
-from openai import OpenAI
+import base64
+import asyncio
+import threading
+import weakref
+from typing import AsyncIterator, Iterable, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+import numpy as np
+
+from .embeddingCache import get_embedding_cache
+from .embeddingBatcher import embed_in_batches, embed_in_batches_async
+from .rateLimiter import get_rate_limiter
+from .embeddingDimensions import request_dimensions, output_dimensions
+from .tokenizer import count_tokens, context_window, truncate_middle
+from src.modules.metrics.metrics import timed, observe, count_items, count_tokens_used
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def rate_limit(calls_per_minute=15):
-    min_interval = 60.0 / calls_per_minute
-    last_called = [0.0]
-    
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            elapsed = time.time() - last_called[0]
-            left_to_wait = min_interval - elapsed
-            if left_to_wait > 0:
-                time.sleep(left_to_wait)
-            ret = func(*args, **kwargs)
-            last_called[0] = time.time()
-            return ret
-        return wrapper
-    return decorator
-
-def get_embeddings(texts: list[str], model="text-embedding-3-small") -> list[list[float]]:
+# Clients are built on first use: importing the SDK costs a few hundred ms and
+# construction fails without an API key, neither of which should block boot.
+_client = None
+_client_lock = threading.Lock()
+
+# AsyncOpenAI keeps an httpx connection pool bound to the loop it first ran on.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+def get_client() -> "OpenAI":
+    """Return the process-wide sync OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def get_async_client() -> "AsyncOpenAI":
+    """Return the pooled async OpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        from openai import AsyncOpenAI
+        async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        _async_clients[loop] = async_client
+    return async_client
+
+def __getattr__(name: str):
+    # Keep `openaiService.client` working for existing callers.
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 429s on chat calls are retried here; embedding retries live in the batcher.
+CHAT_MAX_RETRIES = int(os.getenv("OPENAI_CHAT_MAX_RETRIES", "3"))
+
+def _chat_cost(prompt_tokens: int, max_tokens: int) -> int:
+    # The provider counts max_tokens against the TPM quota up front.
+    return prompt_tokens + max_tokens
+
+def _embed_cost(texts: list[str]) -> int:
+    return sum(len(t) for t in texts) // 4 + len(texts)
+
+def _is_rate_limited(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 429
+
+def _limited(kind: str, model: str, cost: int, send, retries: int = 0):
+    """Send a `with_raw_response` request through the shared rate limiter and parse it.
+
+    Response headers update the limiter; a 429 pauses the bucket and is
+    retried up to `retries` times before it is raised.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return send().parse()
+    key = f"{kind}:{model}"
+    attempt = 0
+    while True:
+        limiter.acquire(key, cost)
+        try:
+            raw = send()
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            limiter.throttled(key, e.response.headers, attempt)
+            if attempt >= retries:
+                raise
+            attempt += 1
+            continue
+        limiter.observe(key, raw.headers)
+        return raw.parse()
+
+async def _limited_async(kind: str, model: str, cost: int, send, retries: int = 0):
+    """Async variant of _limited; `send` returns an awaitable."""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return (await send()).parse()
+    key = f"{kind}:{model}"
+    attempt = 0
+    while True:
+        await limiter.acquire_async(key, cost)
+        try:
+            raw = await send()
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            await asyncio.to_thread(limiter.throttled, key, e.response.headers, attempt)
+            if attempt >= retries:
+                raise
+            attempt += 1
+            continue
+        await asyncio.to_thread(limiter.observe, key, raw.headers)
+        return raw.parse()
+
+# Chat formatting around a single user message (role markers, priming).
+_MESSAGE_OVERHEAD_TOKENS = 8
+
+def _fit_prompt(prompt: str, model: str, max_tokens: int) -> tuple[str, int]:
+    """Return the prompt (shortened from the middle if it would overflow the
+    model's context window together with `max_tokens`) and its token count.
+
+    Callers are expected to budget their prompts (see ragService); this is
+    the backstop, and it logs when it has to cut.
+    """
+    tokens = count_tokens(prompt, model)
+    limit = context_window(model) - max_tokens - _MESSAGE_OVERHEAD_TOKENS
+    if tokens <= limit:
+        return prompt, tokens
+    print(f"Prompt of {tokens} tokens exceeds {model}'s limit of {limit}; truncating the middle")
+    prompt = truncate_middle(prompt, limit, model)
+    return prompt, count_tokens(prompt, model)
+
+def _unique_misses(texts: list[str], cached: list) -> list[str]:
+    return list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+
+def _merge(texts: list[str], cached: list, fresh: dict) -> np.ndarray:
+    return np.stack([v if v is not None else fresh[t] for t, v in zip(texts, cached)])
+
+def _cache_model(model: str, dimensions: Optional[int]) -> str:
+    # Shortened vectors are not prefixes of the native ones; cache them separately.
+    return f"{model}@{dimensions}" if dimensions else model
+
+def _empty(model: str, dimensions: Optional[int]) -> np.ndarray:
+    return np.empty((0, output_dimensions(model, dimensions)), dtype=np.float32)
+
+def _decode_embeddings(data) -> np.ndarray:
+    """Stack the response's embeddings, in input order, into one float32 matrix.
+
+    Requests ask for base64 so vectors arrive as packed little-endian
+    float32 and never exist as Python floats; servers that ignore the
+    format and send JSON arrays are handled too.
     """
-    Call OpenAI embedding API and return list of vectors.
+    rows = [None] * len(data)
+    for item in data:
+        embedding = item.embedding
+        if isinstance(embedding, str):
+            rows[item.index] = np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+        else:
+            rows[item.index] = np.asarray(embedding, dtype=np.float32)
+    return np.stack(rows).astype(np.float32, copy=False)
+
+def _embed_params(texts: list[str], model: str, dimensions: Optional[int]) -> dict:
+    params = {"input": texts, "model": model, "encoding_format": "base64"}
+    if dimensions:
+        params["dimensions"] = dimensions
+    return params
+
+def _count_usage(model: str, usage) -> None:
+    if usage is None:
+        return
+    count_tokens_used(model, "prompt", getattr(usage, "prompt_tokens", 0) or 0)
+    count_tokens_used(model, "completion", getattr(usage, "completion_tokens", 0) or 0)
+
+def _embed_request(texts: list[str], model: str, dimensions: Optional[int] = None) -> np.ndarray:
+    with timed("embed"):
+        response = _limited(
+            "embeddings", model, _embed_cost(texts),
+            lambda: get_client().embeddings.with_raw_response.create(**_embed_params(texts, model, dimensions)),
+        )
+    count_items("embed", len(texts))
+    _count_usage(model, response.usage)
+    return _decode_embeddings(response.data)
+
+async def _embed_request_async(texts: list[str], model: str, dimensions: Optional[int] = None) -> np.ndarray:
+    with timed("embed"):
+        response = await _limited_async(
+            "embeddings", model, _embed_cost(texts),
+            lambda: get_async_client().embeddings.with_raw_response.create(**_embed_params(texts, model, dimensions)),
+        )
+    count_items("embed", len(texts))
+    _count_usage(model, response.usage)
+    return _decode_embeddings(response.data)
+
+def _embed_remote(texts: list[str], model: str, dimensions: Optional[int]) -> np.ndarray:
+    return embed_in_batches(texts, lambda batch: _embed_request(batch, model, dimensions), model)
+
+async def _embed_remote_async(texts: list[str], model: str, dimensions: Optional[int]) -> np.ndarray:
+    return await embed_in_batches_async(texts, lambda batch: _embed_request_async(batch, model, dimensions), model)
+
+def get_embeddings(texts: list[str], model="text-embedding-3-small", dimensions: Optional[int] = None) -> np.ndarray:
     """
-    response = client.embeddings.create(input=texts, model=model)
-    return [item.embedding for item in response.data]
+    Call OpenAI embedding API and return a (len(texts), dims) float32 matrix.
+    Vectors already in the embedding cache are served locally; the misses
+    go to the API in token-aware sub-batches sent concurrently. `dimensions`
+    asks text-embedding-3 models for shortened vectors (see
+    embeddingDimensions.namespace_dimensions).
+    """
+    dimensions = request_dimensions(model, dimensions)
+    if not texts:
+        return _empty(model, dimensions)
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_remote(texts, model, dimensions)
+
+    key = _cache_model(model, dimensions)
+    cached = cache.get_many(key, texts)
+    misses = _unique_misses(texts, cached)
+    fresh = {}
+    if misses:
+        vectors = _embed_remote(misses, model, dimensions)
+        cache.put_many(key, misses, vectors)
+        fresh = dict(zip(misses, vectors))
+    return _merge(texts, cached, fresh)
+
+async def get_embeddings_async(texts: list[str], model="text-embedding-3-small", dimensions: Optional[int] = None) -> np.ndarray:
+    """Async variant of get_embeddings; cache I/O runs in a worker thread."""
+    dimensions = request_dimensions(model, dimensions)
+    if not texts:
+        return _empty(model, dimensions)
+    cache = get_embedding_cache()
+    if cache is None:
+        return await _embed_remote_async(texts, model, dimensions)
+
+    key = _cache_model(model, dimensions)
+    cached = await asyncio.to_thread(cache.get_many, key, texts)
+    misses = _unique_misses(texts, cached)
+    fresh = {}
+    if misses:
+        vectors = await _embed_remote_async(misses, model, dimensions)
+        await asyncio.to_thread(cache.put_many, key, misses, vectors)
+        fresh = dict(zip(misses, vectors))
+    return _merge(texts, cached, fresh)
+
+def embedding_cache_stats() -> dict:
+    cache = get_embedding_cache()
+    return cache.stats() if cache else {"enabled": False}
 
-@rate_limit(calls_per_minute=15)
 def chat_completion(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.0, max_tokens: int = 1000) -> str:
     """Simple non-streaming chat with token limits."""
-    estimated_tokens = len(prompt) // 4
-    if estimated_tokens > 6000:
-        prompt = prompt[:24000]
-    
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
+    prompt, prompt_tokens = _fit_prompt(prompt, model, max_tokens)
+    with timed("llm_completion"):
+        resp = _limited(
+            "chat", model, _chat_cost(prompt_tokens, max_tokens),
+            lambda: get_client().chat.completions.with_raw_response.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ),
+            retries=CHAT_MAX_RETRIES,
+        )
+    _count_usage(model, resp.usage)
+    return resp.choices[0].message.content
+
+async def chat_completion_async(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.0, max_tokens: int = 1000) -> str:
+    """Async variant of chat_completion; shares its rate limit."""
+    prompt, prompt_tokens = _fit_prompt(prompt, model, max_tokens)
+    with timed("llm_completion"):
+        resp = await _limited_async(
+            "chat", model, _chat_cost(prompt_tokens, max_tokens),
+            lambda: get_async_client().chat.completions.with_raw_response.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ),
+            retries=CHAT_MAX_RETRIES,
+        )
+    _count_usage(model, resp.usage)
     return resp.choices[0].message.content
 
 def stream_chat(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.0) -> Iterable[str]:
@@ -53,7 +288,7 @@ def stream_chat(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.
     Streaming generator of tokens. Yields text deltas as they arrive.
     You can forward these chunks to SSE/WebSocket.
     """
-    with client.chat.completions.create(
+    with get_client().chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=temperature,
@@ -63,3 +298,42 @@ def stream_chat(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.
             delta = event.choices[0].delta.content or ""
             if delta:
                 yield delta
+
+async def stream_chat_async(
+    prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.0, max_tokens: int = 1000
+) -> AsyncIterator[str]:
+    """Async generator of text deltas as the model produces them.
+
+    Shares chat_completion's rate limit. Closing the generator early (e.g.
+    the SSE client went away) closes the underlying HTTP stream.
+    """
+    prompt, prompt_tokens = _fit_prompt(prompt, model, max_tokens)
+    started = time.perf_counter()
+    stream = await _limited_async(
+        "chat", model, _chat_cost(prompt_tokens, max_tokens),
+        lambda: get_async_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        ),
+        retries=CHAT_MAX_RETRIES,
+    )
+    first = True
+    try:
+        async for event in stream:
+            if not event.choices:
+                # The final event carries only the usage totals.
+                _count_usage(model, getattr(event, "usage", None))
+                continue
+            delta = event.choices[0].delta.content or ""
+            if delta:
+                if first:
+                    observe("llm_first_token", time.perf_counter() - started)
+                    first = False
+                yield delta
+        observe("llm_completion", time.perf_counter() - started)
+    finally:
+        await stream.close()
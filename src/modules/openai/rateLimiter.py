@@ -0,0 +1,194 @@
+import os
+import re
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from typing import Optional, Mapping
+
+RATE_LIMIT_DB = os.getenv("OPENAI_RATE_LIMIT_DB", ".cache/openai_ratelimits.sqlite3")
+RATE_LIMIT_ENABLED = os.getenv("OPENAI_RATE_LIMIT_ENABLED", "1") != "0"
+
+# Starting quotas per call kind (requests/min, tokens/min). Rate-limit response
+# headers replace them with the account's real limits on the first reply.
+DEFAULT_LIMITS = {
+    "chat": (float(os.getenv("OPENAI_CHAT_RPM", "500")), float(os.getenv("OPENAI_CHAT_TPM", "200000"))),
+    "embeddings": (float(os.getenv("OPENAI_EMBED_RPM", "3000")), float(os.getenv("OPENAI_EMBED_TPM", "1000000"))),
+}
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in an OpenAI reset header ("1s", "6m0s", "20ms"), or None."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+def retry_delay(headers: Mapping[str, str]) -> Optional[float]:
+    """How long a 429 response asks us to wait, from its headers."""
+    ms = _header_float(headers, "retry-after-ms")
+    if ms is not None:
+        return ms / 1000
+    seconds = _header_float(headers, "retry-after")
+    if seconds is not None:
+        return seconds
+    resets = [parse_duration(headers.get(h)) for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class RateLimiter:
+    """Token buckets for requests/min and tokens/min, shared by every process on the host.
+
+    Bucket state lives in a small SQLite file; each reservation is one short
+    IMMEDIATE transaction, so uvicorn workers draw from the same quota
+    instead of each assuming the whole of it. Reservations may drive a bucket
+    negative: the caller then waits until the refill covers its share, which
+    queues callers in arrival order without busy polling.
+
+    Limits adapt to the provider: `observe` applies x-ratelimit-* headers
+    from successful responses and `throttled` pauses a bucket after a 429.
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_DB, limits: Optional[dict] = None):
+        self.limits = limits or DEFAULT_LIMITS
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                rpm REAL NOT NULL,
+                tpm REAL NOT NULL,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0
+            )"""
+        )
+
+    def _transaction(self, key: str, update):
+        """Run `update(state, now) -> result` on the refilled bucket inside one transaction."""
+        kind = key.split(":", 1)[0]
+        rpm, tpm = self.limits.get(kind, self.limits["chat"])
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT rpm, tpm, requests, tokens, updated, blocked_until FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    state = {"rpm": rpm, "tpm": tpm, "requests": rpm, "tokens": tpm, "blocked_until": 0.0}
+                else:
+                    rpm, tpm, requests, tokens, updated, blocked_until = row
+                    elapsed = max(0.0, now - updated)
+                    state = {
+                        "rpm": rpm,
+                        "tpm": tpm,
+                        "requests": min(rpm, requests + elapsed * rpm / 60),
+                        "tokens": min(tpm, tokens + elapsed * tpm / 60),
+                        "blocked_until": blocked_until,
+                    }
+                result = update(state, now)
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO buckets (key, rpm, tpm, requests, tokens, updated, blocked_until)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (key, state["rpm"], state["tpm"], state["requests"], state["tokens"], now, state["blocked_until"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def reserve(self, key: str, tokens: int) -> float:
+        """Take one request and `tokens` tokens; return seconds to wait before sending."""
+        def update(state: dict, now: float) -> float:
+            cost = min(float(tokens), state["tpm"])
+            state["requests"] -= 1
+            state["tokens"] -= cost
+            return max(
+                0.0,
+                -state["requests"] * 60 / state["rpm"],
+                -state["tokens"] * 60 / state["tpm"],
+                state["blocked_until"] - now,
+            )
+        return self._transaction(key, update)
+
+    def acquire(self, key: str, tokens: int) -> None:
+        delay = self.reserve(key, tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, key: str, tokens: int) -> None:
+        delay = await asyncio.to_thread(self.reserve, key, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, key: str, headers: Mapping[str, str]) -> None:
+        """Adopt the limits and remaining quota reported by a response."""
+        limit_requests = _header_float(headers, "x-ratelimit-limit-requests")
+        limit_tokens = _header_float(headers, "x-ratelimit-limit-tokens")
+        remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+        if all(v is None for v in (limit_requests, limit_tokens, remaining_requests, remaining_tokens)):
+            return
+
+        def update(state: dict, now: float) -> None:
+            if limit_requests:
+                state["rpm"] = limit_requests
+            if limit_tokens:
+                state["tpm"] = limit_tokens
+            # Our own in-flight reservations are already deducted, so only
+            # ever lower the local view towards the provider's.
+            if remaining_requests is not None:
+                state["requests"] = min(state["requests"], remaining_requests)
+            if remaining_tokens is not None:
+                state["tokens"] = min(state["tokens"], remaining_tokens)
+        self._transaction(key, update)
+
+    def throttled(self, key: str, headers: Optional[Mapping[str, str]] = None, attempt: int = 0) -> float:
+        """Record a 429: pause the bucket for the advertised (or a backoff) delay and return it."""
+        delay = retry_delay(headers or {})
+        if delay is None:
+            delay = min(0.5 * (2 ** attempt), 20.0) * (0.5 + random.random() / 2)
+        delay = min(delay, 60.0)
+
+        def update(state: dict, now: float) -> None:
+            state["blocked_until"] = max(state["blocked_until"], now + delay)
+            state["requests"] = min(state["requests"], 0.0)
+        self._transaction(key, update)
+        return delay
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Return the process-wide limiter, or None when disabled via OPENAI_RATE_LIMIT_ENABLED=0."""
+    global _limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """Return the tiktoken encoding for `model`, or None when tiktoken can't load one.
+
+    Callers fall back to a ~4 characters per token estimate when this is None.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        name = "cl100k_base"
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # The BPE file is fetched on first use; fall back to estimates when offline.
+        print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    enc = get_encoding(model)
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=65536)
+def count_tokens_cached(text: str, model: str) -> int:
+    """count_tokens memoized on (text, model); for texts seen repeatedly, like retrieved chunks."""
+    return count_tokens(text, model)
+
+# Context windows (prompt + completion tokens) by model name prefix; the
+# longest matching prefix wins.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+def context_window(model: str) -> int:
+    prefixes = [p for p in MODEL_CONTEXT_WINDOWS if model.startswith(p)]
+    return MODEL_CONTEXT_WINDOWS[max(prefixes, key=len)] if prefixes else DEFAULT_CONTEXT_WINDOW
+
+def truncate_middle(text: str, max_tokens: int, model: str) -> str:
+    """Cut tokens out of the middle of `text` so it fits in `max_tokens`.
+
+    The start (instructions) and the end (the question) of a prompt are the
+    parts that must survive; retrieved context sits in between.
+    """
+    if max_tokens <= 0:
+        return ""
+    enc = get_encoding(model)
+    marker = "\n...\n"
+    if enc is None:
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return text
+        head = (max_chars - len(marker)) // 2
+        return text[:head] + marker + text[len(text) - (max_chars - len(marker) - head):]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - len(enc.encode(marker)))
+    head = keep // 2
+    return enc.decode(tokens[:head]) + marker + enc.decode(tokens[len(tokens) - (keep - head):])
@@ -1,82 +1,353 @@
+from typing import Optional, Sequence
 import os
-from typing import Optional
-from pinecone import Pinecone, ServerlessSpec
-from dotenv import load_dotenv
+import time
+import asyncio
 import hashlib
 
-load_dotenv()
+import numpy as np
 
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX", "analyzer-index")
+from src.modules.vectorstore import get_vector_store, write_buffer
+from src.modules.vectorstore.writeBuffer import merge_hits
+from src.modules.vectorstore.versions import get_namespace_versions
+from src.modules.vectorstore.manifests import get_chunk_manifests
+from src.modules.vectorstore.lexicalIndex import get_lexical_index
+from src.modules.metrics.metrics import timed, count_items
 
-if index_name not in pc.list_indexes().names():
-    pc.create_index(
-        name=index_name,
-        dimension=1536,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-    )
-
-index = pc.Index(index_name)
+# How long callers wait for freshly upserted ids to become queryable.
+INDEX_VISIBILITY_TIMEOUT_S = float(os.getenv("INDEX_VISIBILITY_TIMEOUT_S", "15"))
 
 def _stable_id(namespace: str, chunk: str, i: int) -> str:
     h = hashlib.sha1(f"{namespace}|{i}|{chunk}".encode("utf-8")).hexdigest()[:20]
     return f"{namespace}-{h}"
 
+def content_id(namespace: str, doc_id: str, chunk: str) -> str:
+    """Id of a chunk of a known document: depends on its text, not its position."""
+    h = hashlib.sha1(f"{namespace}|{doc_id}|{chunk}".encode("utf-8")).hexdigest()[:20]
+    return f"{namespace}-{h}"
+
+def _build_payloads(
+    chunks: list[str],
+    vectors: Sequence,
+    namespace: str,
+    metadata: dict,
+    start_index: int = 0,
+    ids: Optional[list[str]] = None,
+) -> list[dict]:
+    assert len(chunks) == len(vectors), "chunks and vectors length mismatch"
+
+    if ids is None:
+        ids = [_stable_id(namespace, chunk, i) for i, chunk in enumerate(chunks, start_index)]
+    # Rows of an embedding matrix stay NumPy views; stores convert them at the wire.
+    return [
+        {"id": id_, "values": vec, "metadata": {"text": chunk, **metadata}}
+        for id_, vec, chunk in zip(ids, vectors, chunks)
+    ]
+
+def _to_matches(hits: list[dict], score_threshold: Optional[float]) -> list[dict]:
+    matches = []
+    for hit in hits:
+        if score_threshold is not None and hit["score"] < score_threshold:
+            continue
+        match = {
+            "id": hit["id"],
+            "score": hit["score"],
+            "text": hit["metadata"].get("text"),
+            "metadata": hit["metadata"],
+        }
+        if "values" in hit:
+            match["values"] = hit["values"]
+        matches.append(match)
+    return matches
+
+def _after_write(namespace: str) -> None:
+    # Invalidates caches derived from this namespace (e.g. the answer cache).
+    get_namespace_versions().bump(namespace)
+
+def _index_lexical(payloads: list[dict], namespace: str) -> None:
+    # Keeps the BM25 index in step with the vector store for hybrid and keyword-only retrieval.
+    lexical = get_lexical_index()
+    if lexical is not None:
+        with timed("lexical_index"):
+            lexical.add(namespace, [(p["id"], p["metadata"]) for p in payloads])
+
+def _unindex_lexical(ids: Optional[list[str]], namespace: str) -> None:
+    """Drop `ids`, or the whole namespace when ids is None, from the lexical index."""
+    lexical = get_lexical_index()
+    if lexical is None:
+        return
+    if ids is None:
+        lexical.drop_namespace(namespace)
+    else:
+        lexical.remove(namespace, ids)
+
+def _buffer_writes(payloads: list[dict], namespace: str) -> list[str]:
+    # Eventually consistent stores may not serve these yet; keep them searchable locally.
+    if not get_vector_store().read_after_write:
+        write_buffer.add(payloads, namespace)
+    return [p["id"] for p in payloads]
+
 def delete_namespace(namespace: str) -> None:
-    index.delete(namespace=namespace, delete_all=True)
+    write_buffer.drop_namespace(namespace)
+    get_vector_store().delete_namespace(namespace)
+    get_chunk_manifests().drop_namespace(namespace)
+    _unindex_lexical(None, namespace)
+    _after_write(namespace)
 
 def delete_ids(ids: list[str], namespace: str) -> None:
     if ids:
-        index.delete(ids=ids, namespace=namespace)
+        write_buffer.forget(ids, namespace)
+        get_vector_store().delete_ids(ids, namespace)
+        _unindex_lexical(ids, namespace)
+        _after_write(namespace)
+
+async def delete_namespace_async(namespace: str) -> None:
+    write_buffer.drop_namespace(namespace)
+    await get_vector_store().delete_namespace_async(namespace)
+    await asyncio.to_thread(get_chunk_manifests().drop_namespace, namespace)
+    await asyncio.to_thread(_unindex_lexical, None, namespace)
+    await asyncio.to_thread(_after_write, namespace)
+
+async def delete_ids_async(ids: list[str], namespace: str) -> None:
+    if ids:
+        write_buffer.forget(ids, namespace)
+        await get_vector_store().delete_ids_async(ids, namespace)
+        await asyncio.to_thread(_unindex_lexical, ids, namespace)
+        await asyncio.to_thread(_after_write, namespace)
 
 def upsert_chunks(
     chunks: list[str],
-    vectors: list[list[float]],
+    vectors: Sequence,
     namespace: str,
     metadata: dict = {},
     batch_size: int = 100,
-) -> int:
-    assert len(chunks) == len(vectors), "chunks and vectors length mismatch"
+    start_index: int = 0,
+    ids: Optional[list[str]] = None,
+) -> list[str]:
+    """Upsert chunks with their vectors and return the ids written.
 
-    ids = [_stable_id(namespace, chunk, i) for i, chunk in enumerate(chunks)]
-    payloads = [
-        {"id": id_, "values": vec, "metadata": {"text": chunk, **metadata}}
-        for id_, vec, chunk in zip(ids, vectors, chunks)
-    ]
+    `vectors` is a (len(chunks), dims) matrix as returned by get_embeddings
+    (a list of lists works too). Pass `ids` (e.g. from DocumentSync.admit)
+    to override positional ids.
+    """
+    payloads = _build_payloads(chunks, vectors, namespace, metadata, start_index, ids)
+    with timed("upsert"):
+        get_vector_store().upsert(payloads, namespace, batch_size)
+    count_items("upsert", len(payloads))
+    _index_lexical(payloads, namespace)
+    _after_write(namespace)
+    return _buffer_writes(payloads, namespace)
+
+async def upsert_chunks_async(
+    chunks: list[str],
+    vectors: Sequence,
+    namespace: str,
+    metadata: dict = {},
+    batch_size: int = 100,
+    start_index: int = 0,
+    ids: Optional[list[str]] = None,
+) -> list[str]:
+    """Async variant of upsert_chunks.
+
+    `start_index` is the position of chunks[0] in the whole document, so a
+    document upserted in pieces gets the same ids as one upserted at once.
+    """
+    payloads = _build_payloads(chunks, vectors, namespace, metadata, start_index, ids)
+    with timed("upsert"):
+        await get_vector_store().upsert_async(payloads, namespace, batch_size)
+    count_items("upsert", len(payloads))
+    await asyncio.to_thread(_index_lexical, payloads, namespace)
+    await asyncio.to_thread(_after_write, namespace)
+    return _buffer_writes(payloads, namespace)
+
+class DocumentSync:
+    """Incremental re-ingestion of one document against its chunk manifest.
+
+    Feed every chunk of the new version through `admit`, which returns the
+    chunk's content id when it still has to be embedded and upserted, or
+    None when the index already holds it. `commit` then deletes the chunks
+    the new version no longer has and records the new manifest. After a
+    failed run, `abort` keeps whatever was written in the manifest so a
+    retry neither re-upserts it nor leaves it behind.
+    """
+
+    def __init__(self, namespace: str, doc_id: str):
+        self.namespace = namespace
+        self.doc_id = doc_id
+        self.stored = set(get_chunk_manifests().get(namespace, doc_id))
+        self.ids: list[str] = []
+        self._seen: set[str] = set()
+
+    def admit(self, chunk: str) -> Optional[str]:
+        id_ = content_id(self.namespace, self.doc_id, chunk)
+        if id_ in self._seen:
+            return None
+        self._seen.add(id_)
+        self.ids.append(id_)
+        return None if id_ in self.stored else id_
 
-    total = 0
-    for i in range(0, len(payloads), batch_size):
-        batch = payloads[i : i + batch_size]
-        index.upsert(vectors=batch, namespace=namespace)
-        total += len(batch)
-    return total
+    @property
+    def skipped(self) -> int:
+        return sum(1 for id_ in self.ids if id_ in self.stored)
+
+    def stale(self) -> list[str]:
+        return [id_ for id_ in self.stored if id_ not in self._seen]
+
+    def commit(self) -> list[str]:
+        """Delete chunks the document no longer has; return their ids."""
+        stale = self.stale()
+        delete_ids(stale, self.namespace)
+        get_chunk_manifests().replace(self.namespace, self.doc_id, self.ids)
+        return stale
+
+    async def commit_async(self) -> list[str]:
+        stale = self.stale()
+        await delete_ids_async(stale, self.namespace)
+        await asyncio.to_thread(get_chunk_manifests().replace, self.namespace, self.doc_id, self.ids)
+        return stale
+
+    def abort(self, written: list[str]) -> None:
+        written = set(written)
+        keep = [id_ for id_ in self.ids if id_ in self.stored or id_ in written]
+        keep += [id_ for id_ in self.stored if id_ not in self._seen]
+        get_chunk_manifests().replace(self.namespace, self.doc_id, keep)
+
+def _next_delay(delay: float, deadline: float, max_delay: float) -> tuple[float, float]:
+    """(seconds to sleep now, next delay) for exponential backoff capped by the deadline."""
+    return max(0.0, min(delay, deadline - time.monotonic())), min(delay * 2, max_delay)
+
+def wait_until_visible(
+    ids: list[str],
+    namespace: str,
+    timeout: float = INDEX_VISIBILITY_TIMEOUT_S,
+    initial_delay: float = 0.05,
+    max_delay: float = 2.0,
+) -> bool:
+    """Poll the store until every id is fetchable, backing off exponentially.
+
+    Returns False if some ids are still missing at the deadline; they stay
+    queryable through the write buffer in the meantime.
+    """
+    store = get_vector_store()
+    remaining = set(ids)
+    if store.read_after_write or not remaining:
+        return True
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        found = store.fetch_ids(list(remaining), namespace)
+        write_buffer.forget(found, namespace)
+        remaining -= found
+        if not remaining:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        sleep_for, delay = _next_delay(delay, deadline, max_delay)
+        time.sleep(sleep_for)
+
+async def wait_until_visible_async(
+    ids: list[str],
+    namespace: str,
+    timeout: float = INDEX_VISIBILITY_TIMEOUT_S,
+    initial_delay: float = 0.05,
+    max_delay: float = 2.0,
+) -> bool:
+    """Async variant of wait_until_visible."""
+    store = get_vector_store()
+    remaining = set(ids)
+    if store.read_after_write or not remaining:
+        return True
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        found = await store.fetch_ids_async(list(remaining), namespace)
+        write_buffer.forget(found, namespace)
+        remaining -= found
+        if not remaining:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        sleep_for, delay = _next_delay(delay, deadline, max_delay)
+        await asyncio.sleep(sleep_for)
 
 def query_chunks(
-    query_vector: list[float],
+    query_vector: Sequence[float],
     top_k: Optional[int] = 5,
     namespace: str = "",
     score_threshold: Optional[float] = None,
     metadata_filter: Optional[dict] = None,
+    include_values: bool = False,
 ) -> list[dict]:
+    """Top matches for a query vector; `include_values` also returns each match's vector."""
     # safeguard top_k
     top_k = int(top_k) if top_k and int(top_k) > 0 else 5
 
-    res = index.query(
-        vector=query_vector,
-        top_k=top_k,
-        namespace=namespace,
-        include_metadata=True,
-        filter=metadata_filter or None,
-    )
-    matches = [
-        {
-            "id": match["id"],
-            "score": match["score"],
-            "text": match["metadata"].get("text"),
-            "metadata": match["metadata"],
-        }
-        for match in res["matches"]
-        if score_threshold is None or match["score"] >= score_threshold
-    ]
-    return matches
+    with timed("vector_query"):
+        hits = get_vector_store().query(query_vector, top_k, namespace, metadata_filter, include_values)
+    buffered = write_buffer.search(query_vector, top_k, namespace, metadata_filter, include_values)
+    hits = merge_hits(hits, buffered, top_k)
+    return _to_matches(hits, score_threshold)
+
+async def query_chunks_async(
+    query_vector: Sequence[float],
+    top_k: Optional[int] = 5,
+    namespace: str = "",
+    score_threshold: Optional[float] = None,
+    metadata_filter: Optional[dict] = None,
+    include_values: bool = False,
+) -> list[dict]:
+    """Async variant of query_chunks."""
+    top_k = int(top_k) if top_k and int(top_k) > 0 else 5
+
+    with timed("vector_query"):
+        hits = await get_vector_store().query_async(query_vector, top_k, namespace, metadata_filter, include_values)
+    buffered = write_buffer.search(query_vector, top_k, namespace, metadata_filter, include_values)
+    hits = merge_hits(hits, buffered, top_k)
+    return _to_matches(hits, score_threshold)
+
+def fetch_vectors(ids: list[str], namespace: str = "") -> dict[str, np.ndarray]:
+    """Stored vectors of `ids`, recent unindexed writes included; unknown ids are left out."""
+    buffered = write_buffer.vectors(ids, namespace)
+    rest = [id_ for id_ in ids if id_ not in buffered]
+    stored = get_vector_store().fetch_vectors(rest, namespace) if rest else {}
+    return {**stored, **buffered}
+
+async def fetch_vectors_async(ids: list[str], namespace: str = "") -> dict[str, np.ndarray]:
+    """Async variant of fetch_vectors."""
+    buffered = write_buffer.vectors(ids, namespace)
+    rest = [id_ for id_ in ids if id_ not in buffered]
+    stored = await get_vector_store().fetch_vectors_async(rest, namespace) if rest else {}
+    return {**stored, **buffered}
+
+def lexical_query(
+    query: str,
+    top_k: Optional[int] = 5,
+    namespace: str = "",
+    metadata_filter: Optional[dict] = None,
+) -> list[dict]:
+    """Top BM25 matches for a text query, no embedding needed.
+
+    Matches look like query_chunks' but "score" is a BM25 score (not
+    comparable to cosine scores) and "coverage" is the fraction of the
+    query's terms the chunk contains. Empty when the lexical index is off.
+    """
+    lexical = get_lexical_index()
+    if lexical is None:
+        return []
+    top_k = int(top_k) if top_k and int(top_k) > 0 else 5
+    try:
+        with timed("lexical_query"):
+            hits = lexical.search(query, top_k, namespace, metadata_filter)
+    except Exception as e:
+        # The index only supplements vector search; never fail retrieval over it.
+        print(f"Lexical search failed for namespace {namespace!r}: {e}")
+        return []
+    return [{**match, "coverage": hit["coverage"]} for match, hit in zip(_to_matches(hits, None), hits)]
+
+async def lexical_query_async(
+    query: str,
+    top_k: Optional[int] = 5,
+    namespace: str = "",
+    metadata_filter: Optional[dict] = None,
+) -> list[dict]:
+    """Async variant of lexical_query; the search runs in a worker thread."""
+    return await asyncio.to_thread(lexical_query, query, top_k, namespace, metadata_filter)
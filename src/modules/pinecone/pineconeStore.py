@@ -0,0 +1,277 @@
+import os
+import asyncio
+import threading
+import weakref
+from typing import Optional
+from dotenv import load_dotenv
+
+import numpy as np
+
+from src.modules.vectorstore.vectorStore import VectorStore
+from src.modules.openai.embeddingDimensions import EMBEDDING_DIMENSIONS, namespace_dimensions
+
+load_dotenv()
+
+
+class PineconeVectorStore(VectorStore):
+    """VectorStore backed by managed Pinecone serverless indexes.
+
+    Construction is free of network calls: the client, the index existence
+    check and the index handle are all created on first use (or by warm_up),
+    so workers boot even while Pinecone is unreachable.
+
+    A Pinecone index has one dimension, so namespaces configured for reduced
+    embedding sizes (EMBEDDING_NAMESPACE_DIMENSIONS) live in a sibling index
+    named `<index>-<dims>d`, created with that dimension on first use.
+    Vectors may be NumPy arrays; they become JSON lists one batch at a time,
+    right before they are sent.
+    """
+
+    def __init__(self, index_name: Optional[str] = None, dimension: int = EMBEDDING_DIMENSIONS):
+        self.index_name = index_name or os.getenv("PINECONE_INDEX", "analyzer-index")
+        self.dimension = dimension
+        self._pc = None
+        self._indexes: dict[int, object] = {}
+        self._init_lock = threading.Lock()
+        # The asyncio index holds an aiohttp session tied to the loop that created it.
+        self._async_indexes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[int, object]]" = weakref.WeakKeyDictionary()
+        self._hosts: dict[int, str] = {}
+
+    @property
+    def pc(self):
+        if self._pc is None:
+            with self._init_lock:
+                if self._pc is None:
+                    from pinecone import Pinecone
+                    self._pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        return self._pc
+
+    @property
+    def index(self):
+        return self._index(self.dimension)
+
+    def index_name_for(self, dimension: int) -> str:
+        return self.index_name if dimension == self.dimension else f"{self.index_name}-{dimension}d"
+
+    def _index(self, dimension: int):
+        index = self._indexes.get(dimension)
+        if index is None:
+            pc = self.pc
+            with self._init_lock:
+                index = self._indexes.get(dimension)
+                if index is None:
+                    # A fixed data-plane host (e.g. a local stand-in) skips the control
+                    # plane and serves every dimension.
+                    host = os.getenv("PINECONE_INDEX_HOST")
+                    if host:
+                        self._hosts[dimension] = host
+                        index = pc.Index(host=host)
+                    else:
+                        name = self.index_name_for(dimension)
+                        self._ensure_index(pc, name, dimension)
+                        index = pc.Index(name)
+                    self._indexes[dimension] = index
+        return index
+
+    def _namespace_index(self, namespace: str):
+        return self._index(namespace_dimensions(namespace))
+
+    def _ensure_index(self, pc, name: str, dimension: int) -> None:
+        if name not in pc.list_indexes().names():
+            from pinecone import ServerlessSpec
+            pc.create_index(
+                name=name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+            )
+
+    def warm_up(self) -> None:
+        self.index
+
+    def _host(self, dimension: int) -> str:
+        """Data-plane host of the index for `dimension`; may create the index (blocking)."""
+        if dimension not in self._hosts:
+            self._index(dimension)
+        if dimension not in self._hosts:
+            self._hosts[dimension] = self.pc.describe_index(self.index_name_for(dimension)).host
+        return self._hosts[dimension]
+
+    async def _async_index(self, dimension: int):
+        """Return a pooled asyncio index handle for the running loop.
+
+        Returns None when the asyncio extra (aiohttp) is unavailable, or the
+        host can't be resolved right now; callers then run the sync index in
+        a worker thread. Only the missing extra is remembered, so a transient
+        control-plane failure is retried on the next call.
+        """
+        loop = asyncio.get_running_loop()
+        handles = self._async_indexes.setdefault(loop, {})
+        if dimension in handles:
+            return handles[dimension]
+        try:
+            # Resolving the host may list, create and describe indexes: keep it off the loop.
+            host = self._hosts.get(dimension) or await asyncio.to_thread(self._host, dimension)
+            async_index = self.pc.IndexAsyncio(host=host)
+        except ImportError as e:
+            print(f"Async Pinecone index unavailable, using thread offload: {e}")
+            async_index = None
+        except Exception as e:
+            print(f"Could not open async Pinecone index, using thread offload for now: {e}")
+            return None
+        handles[dimension] = async_index
+        return async_index
+
+    @staticmethod
+    def _wire(vector) -> list[float]:
+        return vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
+
+    @classmethod
+    def _wire_batch(cls, records: list[dict]) -> list[dict]:
+        return [{**record, "values": cls._wire(record["values"])} for record in records]
+
+    @staticmethod
+    def _batch_dimension(records: list[dict]) -> int:
+        return len(records[0]["values"])
+
+    @staticmethod
+    def _to_hits(res, include_values: bool = False) -> list[dict]:
+        hits = []
+        for match in res["matches"]:
+            hit = {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+            if include_values:
+                hit["values"] = match["values"]
+            hits.append(hit)
+        return hits
+
+    def upsert(self, records: list[dict], namespace: str, batch_size: int = 100) -> int:
+        if not records:
+            return 0
+        index = self._index(self._batch_dimension(records))
+        total = 0
+        for i in range(0, len(records), batch_size):
+            batch = records[i : i + batch_size]
+            index.upsert(vectors=self._wire_batch(batch), namespace=namespace)
+            total += len(batch)
+        return total
+
+    async def upsert_async(self, records: list[dict], namespace: str, batch_size: int = 100, max_concurrency: int = 4) -> int:
+        if not records:
+            return 0
+        async_index = await self._async_index(self._batch_dimension(records))
+        if async_index is None:
+            return await super().upsert_async(records, namespace, batch_size)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def send(batch: list[dict]) -> int:
+            async with semaphore:
+                await async_index.upsert(vectors=self._wire_batch(batch), namespace=namespace)
+            return len(batch)
+
+        counts = await asyncio.gather(*(
+            send(records[i : i + batch_size]) for i in range(0, len(records), batch_size)
+        ))
+        return sum(counts)
+
+    def query(self, vector, top_k: int, namespace: str, metadata_filter: Optional[dict] = None,
+              include_values: bool = False) -> list[dict]:
+        res = self._index(len(vector)).query(
+            vector=self._wire(vector),
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True,
+            include_values=include_values,
+            filter=metadata_filter or None,
+        )
+        return self._to_hits(res, include_values)
+
+    async def query_async(self, vector, top_k: int, namespace: str, metadata_filter: Optional[dict] = None,
+                          include_values: bool = False) -> list[dict]:
+        async_index = await self._async_index(len(vector))
+        if async_index is None:
+            return await super().query_async(vector, top_k, namespace, metadata_filter, include_values)
+        res = await async_index.query(
+            vector=self._wire(vector),
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True,
+            include_values=include_values,
+            filter=metadata_filter or None,
+        )
+        return self._to_hits(res, include_values)
+
+    @staticmethod
+    def _fetched(res) -> dict:
+        vectors = getattr(res, "vectors", None)
+        if vectors is None:
+            vectors = res.get("vectors") or {}
+        return vectors
+
+    @classmethod
+    def _fetched_ids(cls, res) -> set[str]:
+        return set(cls._fetched(res).keys())
+
+    @classmethod
+    def _fetched_vectors(cls, res) -> dict[str, np.ndarray]:
+        return {
+            id_: np.asarray(v["values"] if isinstance(v, dict) else v.values, dtype=np.float32)
+            for id_, v in cls._fetched(res).items()
+        }
+
+    def fetch_ids(self, ids: list[str], namespace: str, batch_size: int = 100) -> set[str]:
+        index = self._namespace_index(namespace)
+        found: set[str] = set()
+        for i in range(0, len(ids), batch_size):
+            found |= self._fetched_ids(index.fetch(ids=ids[i : i + batch_size], namespace=namespace))
+        return found
+
+    async def fetch_ids_async(self, ids: list[str], namespace: str, batch_size: int = 100) -> set[str]:
+        async_index = await self._async_index(namespace_dimensions(namespace))
+        if async_index is None:
+            return await super().fetch_ids_async(ids, namespace)
+        results = await asyncio.gather(*(
+            async_index.fetch(ids=ids[i : i + batch_size], namespace=namespace) for i in range(0, len(ids), batch_size)
+        ))
+        return set().union(*(self._fetched_ids(res) for res in results))
+
+    def fetch_vectors(self, ids: list[str], namespace: str, batch_size: int = 100) -> dict[str, np.ndarray]:
+        index = self._namespace_index(namespace)
+        found: dict[str, np.ndarray] = {}
+        for i in range(0, len(ids), batch_size):
+            found.update(self._fetched_vectors(index.fetch(ids=ids[i : i + batch_size], namespace=namespace)))
+        return found
+
+    async def fetch_vectors_async(self, ids: list[str], namespace: str, batch_size: int = 100) -> dict[str, np.ndarray]:
+        async_index = await self._async_index(namespace_dimensions(namespace))
+        if async_index is None:
+            return await super().fetch_vectors_async(ids, namespace)
+        results = await asyncio.gather(*(
+            async_index.fetch(ids=ids[i : i + batch_size], namespace=namespace) for i in range(0, len(ids), batch_size)
+        ))
+        found: dict[str, np.ndarray] = {}
+        for res in results:
+            found.update(self._fetched_vectors(res))
+        return found
+
+    def delete_ids(self, ids: list[str], namespace: str) -> None:
+        if ids:
+            self._namespace_index(namespace).delete(ids=ids, namespace=namespace)
+
+    async def delete_ids_async(self, ids: list[str], namespace: str) -> None:
+        if not ids:
+            return
+        async_index = await self._async_index(namespace_dimensions(namespace))
+        if async_index is None:
+            await super().delete_ids_async(ids, namespace)
+        else:
+            await async_index.delete(ids=ids, namespace=namespace)
+
+    def delete_namespace(self, namespace: str) -> None:
+        self._namespace_index(namespace).delete(namespace=namespace, delete_all=True)
+
+    async def delete_namespace_async(self, namespace: str) -> None:
+        async_index = await self._async_index(namespace_dimensions(namespace))
+        if async_index is None:
+            await super().delete_namespace_async(namespace)
+        else:
+            await async_index.delete(namespace=namespace, delete_all=True)
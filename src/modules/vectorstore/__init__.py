@@ -0,0 +1,4 @@
+from .vectorStore import VectorStore, get_vector_store, set_vector_store
+from .writeBuffer import WriteBuffer, write_buffer
+
+__all__ = ['VectorStore', 'get_vector_store', 'set_vector_store', 'WriteBuffer', 'write_buffer']
@@ -0,0 +1,32 @@
+from typing import Optional
+
+_OPS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+def matches_filter(metadata: dict, metadata_filter: Optional[dict]) -> bool:
+    """Evaluate the subset of Pinecone's metadata filter language we use."""
+    if not metadata_filter:
+        return True
+    for key, cond in metadata_filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            for op, arg in cond.items():
+                if not _OPS[op](value, arg):
+                    return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
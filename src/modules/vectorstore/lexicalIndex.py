@@ -0,0 +1,456 @@
+import os
+import re
+import json
+import zlib
+import sqlite3
+import threading
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+from .filters import matches_filter
+
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "1") != "0"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", ".cache/lexical.sqlite3")
+
+# Okapi BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Merge a namespace's postings into one segment once this many segments
+# pile up, or once deleted documents outnumber live ones.
+_MAX_SEGMENTS = 64
+_MIN_COMPACT_DOCS = 1024
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._:/+-][a-z0-9]+)*")
+_SEPARATOR = re.compile(r"[._:/+-]")
+_ARXIV_ID = re.compile(r"\d{4}\.\d{4,5}")
+_ARXIV_VERSION = re.compile(r"(\d{4}\.\d{4,5})v\d+\b")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have how i if in into is it its "
+    "me my of on or our so than that the their them then there these they this those to was we were what when "
+    "where which who whom why will with would you your about explain tell describe give".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms of `text`, stopwords dropped.
+
+    Identifiers survive whole and in parts: "ImageNet-1k" yields
+    "imagenet-1k", "imagenet" and "1k"; "arXiv:2401.12345v2" also yields
+    "2401.12345" (versions are dropped), so a bare arXiv id matches a
+    versioned mention.
+    """
+    terms = []
+    for match in _TOKEN.finditer(_ARXIV_VERSION.sub(r"\1", text.lower())):
+        token = match.group()
+        parts = _SEPARATOR.split(token)
+        if len(parts) == 1:
+            if token not in _STOPWORDS and (len(token) > 1 or token.isdigit()):
+                terms.append(token)
+            continue
+        terms.append(token)
+        terms.extend(p for p in parts if p not in _STOPWORDS and len(p) > 1)
+        terms.extend(a for a in _ARXIV_ID.findall(token) if a != token)
+    return terms
+
+def _encode_docs(docs: np.ndarray) -> bytes:
+    # Doc numbers ascend within a segment, so their deltas are small and compress well.
+    return zlib.compress(np.diff(docs, prepend=np.uint32(0)).astype("<u4").tobytes())
+
+def _decode_docs(blob: bytes) -> np.ndarray:
+    return np.cumsum(np.frombuffer(zlib.decompress(blob), dtype="<u4"), dtype=np.uint32)
+
+def _encode_tfs(tfs: np.ndarray) -> bytes:
+    return zlib.compress(np.minimum(tfs, 0xFFFF).astype("<u2").tobytes())
+
+def _decode_tfs(blob: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype="<u2")
+
+
+class _Namespace:
+    """In-memory postings of one namespace, as of `generation`.
+
+    Documents are numbered in insertion order; a deleted or replaced
+    document keeps its number (dead) until compaction renumbers the
+    namespace. Postings per term are (doc numbers, term frequencies) array
+    pairs, one pair per segment, concatenated on first use.
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.rows: dict[str, int] = {}
+        self.lengths = np.zeros(1024, dtype=np.float32)
+        self.alive = np.zeros(1024, dtype=bool)
+        self.next_doc = 0
+        self.total_length = 0
+        self.postings: dict[str, list[tuple[np.ndarray, np.ndarray]]] = {}
+
+    @property
+    def live(self) -> int:
+        return len(self.rows)
+
+    def reserve(self, next_doc: int) -> None:
+        """Make room for doc numbers below `next_doc`, dead ones included."""
+        if next_doc > self.lengths.shape[0]:
+            capacity = self.lengths.shape[0]
+            while capacity < next_doc:
+                capacity *= 2
+            self.lengths = np.concatenate([self.lengths, np.zeros(capacity - self.lengths.shape[0], dtype=np.float32)])
+            self.alive = np.concatenate([self.alive, np.zeros(capacity - self.alive.shape[0], dtype=bool)])
+        self.next_doc = max(self.next_doc, next_doc)
+
+    def add_doc(self, doc: int, id_: str, length: int) -> None:
+        self.reserve(doc + 1)
+        self.rows[id_] = doc
+        self.lengths[doc] = length
+        self.alive[doc] = True
+        self.total_length += length
+
+    def remove_doc(self, id_: str) -> Optional[int]:
+        doc = self.rows.pop(id_, None)
+        if doc is not None:
+            self.alive[doc] = False
+            self.total_length -= int(self.lengths[doc])
+        return doc
+
+    def add_postings(self, term: str, docs: np.ndarray, tfs: np.ndarray) -> None:
+        self.postings.setdefault(term, []).append((docs, tfs))
+
+    def term_postings(self, term: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        parts = self.postings.get(term)
+        if not parts:
+            return None
+        if len(parts) > 1:
+            parts[:] = [(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))]
+        return parts[0]
+
+
+class LexicalIndex:
+    """BM25 inverted index per namespace, persisted in SQLite.
+
+    pineconeService feeds it every chunk it upserts and every delete, so it
+    mirrors the vector store's contents and can answer keyword queries
+    without an embedding. Each write appends a segment of zlib-compressed,
+    delta-encoded postings; the document table holds each chunk's id,
+    length and metadata, and metadata is only read back for the hits a
+    query returns. Namespaces are loaded into memory on first query and
+    reloaded when another process has written to them since.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._namespaces: dict[str, _Namespace] = {}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lexical_namespaces (
+                namespace TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                next_doc INTEGER NOT NULL,
+                segments INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lexical_docs (
+                namespace TEXT NOT NULL,
+                doc INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (namespace, doc)
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS lexical_docs_id ON lexical_docs (namespace, id)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lexical_segments (
+                namespace TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                term TEXT NOT NULL,
+                docs BLOB NOT NULL,
+                tfs BLOB NOT NULL,
+                PRIMARY KEY (namespace, segment, term)
+            ) WITHOUT ROWID"""
+        )
+
+    # -- writes (caller holds self._lock) ----------------------------------
+
+    def _state(self, namespace: str) -> tuple[int, int, int]:
+        row = self._conn.execute(
+            "SELECT generation, next_doc, segments FROM lexical_namespaces WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row if row else (0, 0, 0)
+
+    def _set_state(self, namespace: str, generation: int, next_doc: int, segments: int) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO lexical_namespaces (namespace, generation, next_doc, segments) VALUES (?, ?, ?, ?)",
+            (namespace, generation, next_doc, segments),
+        )
+
+    def _current(self, namespace: str, generation: int) -> Optional[_Namespace]:
+        """The loaded namespace if it is up to date with `generation`; else forget it."""
+        ns = self._namespaces.get(namespace)
+        if ns is not None and ns.generation != generation:
+            del self._namespaces[namespace]
+            return None
+        return ns
+
+    def _delete_docs(self, namespace: str, ns: Optional[_Namespace], ids: list[str]) -> int:
+        removed = 0
+        for i in range(0, len(ids), 500):
+            part = ids[i : i + 500]
+            marks = ",".join("?" * len(part))
+            cur = self._conn.execute(f"DELETE FROM lexical_docs WHERE namespace = ? AND id IN ({marks})", [namespace, *part])
+            removed += cur.rowcount
+        if ns is not None:
+            for id_ in ids:
+                ns.remove_doc(id_)
+        return removed
+
+    def add(self, namespace: str, records: list[tuple[str, dict]]) -> None:
+        """Index (id, metadata) pairs; metadata["text"] is the indexed text. Re-adding an id replaces it."""
+        if not records:
+            return
+        records = list({id_: meta for id_, meta in records}.items())
+        docs_terms = [Counter(tokenize((meta or {}).get("text") or "")) for _, meta in records]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation, next_doc, segments = self._state(namespace)
+                ns = self._current(namespace, generation)
+                self._delete_docs(namespace, ns, [id_ for id_, _ in records])
+
+                postings: dict[str, tuple[list[int], list[int]]] = {}
+                rows = []
+                for offset, ((id_, meta), terms) in enumerate(zip(records, docs_terms)):
+                    doc = next_doc + offset
+                    length = sum(terms.values())
+                    rows.append((namespace, doc, id_, length, json.dumps(meta or {})))
+                    for term, tf in terms.items():
+                        entry = postings.setdefault(term, ([], []))
+                        entry[0].append(doc)
+                        entry[1].append(tf)
+                self._conn.executemany(
+                    "INSERT INTO lexical_docs (namespace, doc, id, length, metadata) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                encoded = {
+                    term: (np.asarray(docs, dtype=np.uint32), np.asarray(tfs, dtype=np.uint16))
+                    for term, (docs, tfs) in postings.items()
+                }
+                self._conn.executemany(
+                    "INSERT INTO lexical_segments (namespace, segment, term, docs, tfs) VALUES (?, ?, ?, ?, ?)",
+                    [(namespace, generation + 1, term, _encode_docs(d), _encode_tfs(t)) for term, (d, t) in encoded.items()],
+                )
+                self._set_state(namespace, generation + 1, next_doc + len(records), segments + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            if ns is not None:
+                ns.generation = generation + 1
+                for _, doc, id_, length, _ in rows:
+                    ns.add_doc(doc, id_, length)
+                for term, (docs, tfs) in encoded.items():
+                    ns.add_postings(term, docs, tfs)
+            self._maybe_compact(namespace)
+
+    def remove(self, namespace: str, ids: list[str]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation, next_doc, segments = self._state(namespace)
+                ns = self._current(namespace, generation)
+                if self._delete_docs(namespace, ns, list(ids)):
+                    self._set_state(namespace, generation + 1, next_doc, segments)
+                    if ns is not None:
+                        ns.generation = generation + 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._maybe_compact(namespace)
+
+    def drop_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("lexical_docs", "lexical_segments", "lexical_namespaces"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE namespace = ?", (namespace,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _maybe_compact(self, namespace: str) -> None:
+        generation, next_doc, segments = self._state(namespace)
+        live = self._conn.execute("SELECT COUNT(*) FROM lexical_docs WHERE namespace = ?", (namespace,)).fetchone()[0]
+        dead = next_doc - live
+        if segments > _MAX_SEGMENTS or (next_doc >= _MIN_COMPACT_DOCS and dead > live):
+            self._compact(namespace)
+
+    def _compact(self, namespace: str) -> None:
+        """Renumber live documents densely and merge every segment into one."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            generation, next_doc, _ = self._state(namespace)
+            docs = [r[0] for r in self._conn.execute(
+                "SELECT doc FROM lexical_docs WHERE namespace = ? ORDER BY doc", (namespace,)
+            )]
+            renumber = np.full(max(next_doc, 1), -1, dtype=np.int64)
+            renumber[docs] = np.arange(len(docs))
+            merged: dict[str, list[tuple[np.ndarray, np.ndarray]]] = {}
+            for term, docs_blob, tfs_blob in self._conn.execute(
+                "SELECT term, docs, tfs FROM lexical_segments WHERE namespace = ? ORDER BY segment", (namespace,)
+            ).fetchall():
+                merged.setdefault(term, []).append((_decode_docs(docs_blob), _decode_tfs(tfs_blob)))
+            segment_rows = []
+            for term, parts in merged.items():
+                term_docs = np.concatenate([p[0] for p in parts])
+                term_tfs = np.concatenate([p[1] for p in parts])
+                new_docs = renumber[term_docs]
+                keep = new_docs >= 0
+                if keep.any():
+                    segment_rows.append((namespace, 0, term, _encode_docs(new_docs[keep].astype(np.uint32)), _encode_tfs(term_tfs[keep])))
+            self._conn.execute("DELETE FROM lexical_segments WHERE namespace = ?", (namespace,))
+            self._conn.executemany(
+                "INSERT INTO lexical_segments (namespace, segment, term, docs, tfs) VALUES (?, ?, ?, ?, ?)", segment_rows
+            )
+            # Shift doc numbers out of the way first so the renumbering never collides.
+            self._conn.execute("UPDATE lexical_docs SET doc = -doc - 1 WHERE namespace = ?", (namespace,))
+            self._conn.executemany(
+                "UPDATE lexical_docs SET doc = ? WHERE namespace = ? AND doc = ?",
+                [(new, namespace, -old - 1) for new, old in enumerate(docs)],
+            )
+            self._set_state(namespace, generation + 1, len(docs), 1)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._namespaces.pop(namespace, None)
+
+    # -- reads ---------------------------------------------------------------
+
+    def _load(self, namespace: str) -> Optional[_Namespace]:
+        """Up-to-date in-memory namespace (caller holds self._lock); None if it has no documents."""
+        generation, next_doc, _ = self._state(namespace)
+        if generation == 0:
+            return None
+        ns = self._current(namespace, generation)
+        if ns is not None:
+            return ns
+        ns = _Namespace(generation)
+        # Postings keep the numbers of deleted documents until compaction,
+        # so size by the namespace's counter, not its highest live document.
+        ns.reserve(next_doc)
+        for doc, id_, length in self._conn.execute(
+            "SELECT doc, id, length FROM lexical_docs WHERE namespace = ?", (namespace,)
+        ):
+            ns.add_doc(doc, id_, length)
+        for term, docs_blob, tfs_blob in self._conn.execute(
+            "SELECT term, docs, tfs FROM lexical_segments WHERE namespace = ? ORDER BY segment", (namespace,)
+        ):
+            ns.add_postings(term, _decode_docs(docs_blob), _decode_tfs(tfs_blob))
+        self._namespaces[namespace] = ns
+        return ns
+
+    def search(self, query: str, top_k: int, namespace: str, metadata_filter: Optional[dict] = None) -> list[dict]:
+        """Top BM25 matches as {"id", "score", "coverage", "metadata"}, best first.
+
+        `coverage` is the fraction of the query's distinct terms the chunk
+        contains, a scale-free confidence signal BM25 scores lack.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        with self._lock:
+            ns = self._load(namespace)
+            if ns is None or ns.live == 0:
+                return []
+            size = ns.next_doc
+            alive = ns.alive[:size]
+            lengths = ns.lengths[:size]
+            average = max(ns.total_length / ns.live, 1.0)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average)
+            scores = np.zeros(size, dtype=np.float32)
+            matched = np.zeros(size, dtype=np.uint16)
+            for term in terms:
+                postings = ns.term_postings(term)
+                if postings is None:
+                    continue
+                docs, tfs = postings
+                if docs.size and int(docs.max()) >= size:
+                    inside = docs < size
+                    docs, tfs = docs[inside], tfs[inside]
+                df = int(np.count_nonzero(alive[docs]))
+                if df == 0:
+                    continue
+                idf = np.log1p((ns.live - df + 0.5) / (df + 0.5))
+                tf = tfs.astype(np.float32)
+                scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+                matched[docs] += 1
+            scores[~alive] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if candidates.size == 0:
+                return []
+            fetch = min(candidates.size, top_k * 5 if metadata_filter else top_k)
+            top = candidates[np.argpartition(-scores[candidates], fetch - 1)[:fetch]] if fetch < candidates.size else candidates
+            top = top[np.argsort(-scores[top], kind="stable")]
+            marks = ",".join("?" * len(top))
+            rows = dict(
+                (doc, (id_, metadata)) for doc, id_, metadata in self._conn.execute(
+                    f"SELECT doc, id, metadata FROM lexical_docs WHERE namespace = ? AND doc IN ({marks})",
+                    [namespace, *(int(d) for d in top)],
+                )
+            )
+        hits = []
+        for doc in top:
+            if int(doc) not in rows:
+                continue
+            id_, metadata = rows[int(doc)]
+            metadata = json.loads(metadata)
+            if not matches_filter(metadata, metadata_filter):
+                continue
+            hits.append({
+                "id": id_,
+                "score": float(scores[doc]),
+                "coverage": int(matched[doc]) / len(terms),
+                "metadata": metadata,
+            })
+            if len(hits) == top_k:
+                break
+        return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces, docs = self._conn.execute(
+                "SELECT COUNT(DISTINCT namespace), COUNT(*) FROM lexical_docs"
+            ).fetchone()
+            postings_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(docs) + LENGTH(tfs)), 0) FROM lexical_segments"
+            ).fetchone()[0]
+        return {"namespaces": namespaces, "documents": docs, "postings_bytes": postings_bytes,
+                "loaded_namespaces": len(self._namespaces)}
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+def get_lexical_index() -> Optional[LexicalIndex]:
+    """Return the process-wide lexical index, or None when disabled via LEXICAL_INDEX_ENABLED=0."""
+    global _index
+    if not LEXICAL_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex()
+    return _index
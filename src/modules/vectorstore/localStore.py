@@ -0,0 +1,367 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from .vectorStore import VectorStore
+from .filters import matches_filter
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", ".cache/vectors")
+# Namespaces at or above this size are searched through HNSW (when hnswlib is installed).
+ANN_THRESHOLD = int(os.getenv("LOCAL_VECTOR_ANN_THRESHOLD", "20000"))
+ANN_EF_SEARCH = int(os.getenv("LOCAL_VECTOR_ANN_EF", "128"))
+
+_INITIAL_CAPACITY = 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _file_stem(namespace: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)[:40]
+    digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:12]
+    return f"{safe}-{digest}"
+
+class _Namespace:
+    """Dense float32 matrix of unit vectors plus row -> (id, metadata) mapping,
+    as of `generation`.
+
+    Rows `[0, count)` are live; deletes move the last row into the hole so the
+    matrix stays contiguous and brute-force search is a single GEMV.
+    """
+
+    def __init__(self, path: str, dim: int, count: int, ids: list[str], metadata: list[dict], generation: int = 0):
+        self.path = path
+        self.dim = dim
+        self.generation = generation
+        self.count = count
+        self.ids = ids
+        self.metadata = metadata
+        self.rows = {id_: row for row, id_ in enumerate(ids)}
+        self.ann = None
+        self.vectors = self._open()
+
+    def _open(self) -> np.memmap:
+        if os.path.exists(self.path):
+            return np.load(self.path, mmap_mode="r+")
+        return self._allocate(_INITIAL_CAPACITY)
+
+    def _allocate(self, capacity: int) -> np.memmap:
+        tmp = self.path + ".tmp"
+        arr = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        old = getattr(self, "vectors", None)
+        if old is not None:
+            live = min(self.count, old.shape[0])
+            arr[:live] = old[:live]
+        arr.flush()
+        del arr
+        os.replace(tmp, self.path)
+        return np.load(self.path, mmap_mode="r+")
+
+    @property
+    def capacity(self) -> int:
+        return self.vectors.shape[0]
+
+    def ensure_capacity(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.vectors = self._allocate(capacity)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store on memory-mapped float32 matrices.
+
+    Each namespace keeps its vectors in `<root>/<namespace>.npy` and its ids and
+    metadata in a shared SQLite file. Small namespaces are searched exactly;
+    namespaces with at least `ann_threshold` vectors use an HNSW index built on
+    first query and kept current on upsert and delete.
+
+    Several processes may share a root: writes hold an IMMEDIATE transaction
+    and bump the namespace's generation, and a process reloads a namespace
+    (and rebuilds its HNSW index) once it sees a newer generation.
+    """
+
+    read_after_write = True
+
+    def __init__(self, root: str = LOCAL_VECTOR_DIR, ann_threshold: int = ANN_THRESHOLD):
+        self.root = root
+        self.ann_threshold = ann_threshold
+        self._lock = threading.RLock()
+        self._namespaces: dict[str, _Namespace] = {}
+        self._ann_missing_logged = False
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "records.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS records (
+                namespace TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (namespace, row)
+            ) WITHOUT ROWID"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS namespaces (
+                namespace TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        if "generation" not in {c[1] for c in self._db.execute("PRAGMA table_info(namespaces)")}:
+            self._db.execute("ALTER TABLE namespaces ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        # Store-wide counter, so a namespace deleted and created again never
+        # reuses a generation another process may still have loaded.
+        self._db.execute("CREATE TABLE IF NOT EXISTS generation (value INTEGER NOT NULL)")
+        self._db.execute("INSERT INTO generation (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM generation)")
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.root, _file_stem(namespace) + ".npy")
+
+    def _load(self, namespace: str) -> Optional[_Namespace]:
+        """The namespace as of its latest committed generation, reloading a stale copy."""
+        row = self._db.execute(
+            "SELECT dim, count, generation FROM namespaces WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        if row is None:
+            self._namespaces.pop(namespace, None)
+            return None
+        dim, count, generation = row
+        ns = self._namespaces.get(namespace)
+        if ns is not None and ns.generation == generation:
+            return ns
+        records = self._db.execute(
+            "SELECT id, metadata FROM records WHERE namespace = ? AND row < ? ORDER BY row", (namespace, count)
+        ).fetchall()
+        ns = _Namespace(
+            self._path(namespace), dim, count,
+            [r[0] for r in records], [json.loads(r[1]) for r in records], generation,
+        )
+        self._namespaces[namespace] = ns
+        return ns
+
+    @contextmanager
+    def _write(self, namespace: str):
+        """Serialize a write to `namespace` across processes."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            # The in-memory copy may be ahead of what was rolled back.
+            self._namespaces.pop(namespace, None)
+            raise
+
+    def _create(self, namespace: str, dim: int) -> _Namespace:
+        self._db.execute("INSERT INTO namespaces (namespace, dim, count) VALUES (?, ?, 0)", (namespace, dim))
+        if os.path.exists(self._path(namespace)):
+            os.remove(self._path(namespace))
+        ns = _Namespace(self._path(namespace), dim, 0, [], [])
+        self._namespaces[namespace] = ns
+        return ns
+
+    def upsert(self, records: list[dict], namespace: str, batch_size: int = 100) -> int:
+        if not records:
+            return 0
+        matrix = _normalize(np.asarray([r["values"] for r in records], dtype=np.float32))
+        with self._lock, self._write(namespace):
+            ns = self._load(namespace) or self._create(namespace, matrix.shape[1])
+            if matrix.shape[1] != ns.dim:
+                raise ValueError(f"vector dimension {matrix.shape[1]} does not match namespace dimension {ns.dim}")
+
+            rows = np.empty(len(records), dtype=np.int64)
+            written = []
+            for i, record in enumerate(records):
+                row = ns.rows.get(record["id"])
+                if row is None:
+                    row = ns.count
+                    ns.count += 1
+                    ns.ids.append(record["id"])
+                    ns.metadata.append(record.get("metadata") or {})
+                    ns.rows[record["id"]] = row
+                else:
+                    ns.metadata[row] = record.get("metadata") or {}
+                rows[i] = row
+                written.append((namespace, int(row), record["id"], json.dumps(ns.metadata[row])))
+
+            ns.ensure_capacity(ns.count)
+            ns.vectors[rows] = matrix
+            ns.vectors.flush()
+            self._persist(namespace, ns, written)
+
+            if ns.ann is not None:
+                if ns.ann.get_max_elements() < ns.capacity:
+                    ns.ann.resize_index(ns.capacity)
+                ns.ann.add_items(matrix, rows)
+        return len(records)
+
+    def _persist(self, namespace: str, ns: _Namespace, written: list[tuple]) -> None:
+        """Record rows and count under a new generation; call inside `_write`."""
+        self._db.executemany(
+            "INSERT OR REPLACE INTO records (namespace, row, id, metadata) VALUES (?, ?, ?, ?)", written
+        )
+        self._db.execute("UPDATE generation SET value = value + 1")
+        ns.generation = self._db.execute("SELECT value FROM generation").fetchone()[0]
+        self._db.execute(
+            "UPDATE namespaces SET count = ?, generation = ? WHERE namespace = ?", (ns.count, ns.generation, namespace)
+        )
+
+    def query(
+        self,
+        vector: list[float],
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[dict] = None,
+        include_values: bool = False,
+    ) -> list[dict]:
+        with self._lock:
+            ns = self._load(namespace)
+            if ns is None or ns.count == 0:
+                return []
+            q = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(q)
+            if norm:
+                q = q / norm
+
+            hits = None
+            if ns.count >= self.ann_threshold:
+                if hnswlib is not None:
+                    hits = self._query_ann(ns, q, top_k, metadata_filter)
+                elif not self._ann_missing_logged:
+                    self._ann_missing_logged = True
+                    print(
+                        f"Namespace {namespace!r} has {ns.count} vectors (ANN threshold {self.ann_threshold}) "
+                        "but hnswlib is not installed; searching exactly. Install the 'ann' extra for HNSW."
+                    )
+            if hits is None:
+                hits = self._query_exact(ns, q, top_k, metadata_filter)
+            if include_values:
+                for hit in hits:
+                    hit["values"] = np.array(ns.vectors[ns.rows[hit["id"]]])
+            return hits
+
+    def _query_exact(self, ns: _Namespace, q: np.ndarray, top_k: int, metadata_filter: Optional[dict]) -> list[dict]:
+        scores = ns.vectors[: ns.count] @ q
+        if metadata_filter:
+            keep = np.fromiter(
+                (matches_filter(m, metadata_filter) for m in ns.metadata), dtype=bool, count=ns.count
+            )
+            candidates = np.flatnonzero(keep)
+            if candidates.size == 0:
+                return []
+            scores_c = scores[candidates]
+        else:
+            candidates = None
+            scores_c = scores
+
+        k = min(top_k, scores_c.shape[0])
+        top = np.argpartition(-scores_c, k - 1)[:k] if k < scores_c.shape[0] else np.arange(scores_c.shape[0])
+        top = top[np.argsort(-scores_c[top], kind="stable")]
+        rows = candidates[top] if candidates is not None else top
+        return [self._hit(ns, int(r), float(scores[r])) for r in rows]
+
+    def _query_ann(self, ns: _Namespace, q: np.ndarray, top_k: int, metadata_filter: Optional[dict]) -> Optional[list[dict]]:
+        if ns.ann is None:
+            ns.ann = self._build_ann(ns)
+        fetch = top_k if not metadata_filter else top_k * 10
+        fetch = min(fetch, ns.count)
+        ns.ann.set_ef(max(ANN_EF_SEARCH, fetch))
+        labels, distances = ns.ann.knn_query(q, k=fetch)
+        hits = []
+        for label, distance in zip(labels[0], distances[0]):
+            row = int(label)
+            if metadata_filter and not matches_filter(ns.metadata[row], metadata_filter):
+                continue
+            hits.append(self._hit(ns, row, 1.0 - float(distance)))
+            if len(hits) == top_k:
+                return hits
+        # Too few survivors after filtering; let the caller fall back to exact search.
+        return hits if not metadata_filter else None
+
+    def _build_ann(self, ns: _Namespace):
+        ann = hnswlib.Index(space="ip", dim=ns.dim)
+        ann.init_index(max_elements=ns.capacity, ef_construction=200, M=16)
+        ann.add_items(ns.vectors[: ns.count], np.arange(ns.count))
+        return ann
+
+    @staticmethod
+    def _hit(ns: _Namespace, row: int, score: float) -> dict:
+        return {"id": ns.ids[row], "score": score, "metadata": ns.metadata[row]}
+
+    def fetch_ids(self, ids: list[str], namespace: str) -> set[str]:
+        with self._lock:
+            ns = self._load(namespace)
+            if ns is None:
+                return set()
+            return {id_ for id_ in ids if id_ in ns.rows}
+
+    def fetch_vectors(self, ids: list[str], namespace: str) -> dict[str, np.ndarray]:
+        with self._lock:
+            ns = self._load(namespace)
+            if ns is None:
+                return {}
+            return {id_: np.array(ns.vectors[ns.rows[id_]]) for id_ in ids if id_ in ns.rows}
+
+    def delete_ids(self, ids: list[str], namespace: str) -> None:
+        if not ids:
+            return
+        with self._lock, self._write(namespace):
+            ns = self._load(namespace)
+            if ns is None:
+                return
+            moved = []
+            for id_ in ids:
+                row = ns.rows.pop(id_, None)
+                if row is None:
+                    continue
+                last = ns.count - 1
+                if ns.ann is not None:
+                    # HNSW labels are rows: retire the freed row and the last
+                    # one, then re-add the moved vector under its new row.
+                    ns.ann.mark_deleted(row)
+                    if row != last:
+                        ns.ann.mark_deleted(last)
+                if row != last:
+                    ns.vectors[row] = ns.vectors[last]
+                    ns.ids[row] = ns.ids[last]
+                    ns.metadata[row] = ns.metadata[last]
+                    ns.rows[ns.ids[row]] = row
+                    moved.append(row)
+                    if ns.ann is not None:
+                        ns.ann.add_items(ns.vectors[row : row + 1], [row])
+                ns.ids.pop()
+                ns.metadata.pop()
+                ns.count -= 1
+            ns.vectors.flush()
+            written = [
+                (namespace, row, ns.ids[row], json.dumps(ns.metadata[row])) for row in set(moved) if row < ns.count
+            ]
+            self._db.execute("DELETE FROM records WHERE namespace = ? AND row >= ?", (namespace, ns.count))
+            self._persist(namespace, ns, written)
+
+    def delete_namespace(self, namespace: str) -> None:
+        with self._lock, self._write(namespace):
+            self._namespaces.pop(namespace, None)
+            self._db.execute("DELETE FROM records WHERE namespace = ?", (namespace,))
+            self._db.execute("DELETE FROM namespaces WHERE namespace = ?", (namespace,))
+            path = self._path(namespace)
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import threading
+from typing import Optional, List
+
+CHUNK_MANIFESTS_PATH = os.getenv("CHUNK_MANIFESTS_PATH", ".cache/chunk_manifests.sqlite3")
+
+
+class ChunkManifests:
+    """Which chunk ids each document currently has in a namespace.
+
+    Re-ingesting a document diffs its new chunk ids against the manifest:
+    only ids missing from it are embedded and upserted, and ids that are no
+    longer produced are deleted from the index.
+    """
+
+    def __init__(self, path: str = CHUNK_MANIFESTS_PATH):
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                namespace TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (namespace, doc_id, chunk_id)
+            )"""
+        )
+
+    def get(self, namespace: str, doc_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE namespace = ? AND doc_id = ? ORDER BY position",
+                (namespace, doc_id),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def replace(self, namespace: str, doc_id: str, chunk_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE namespace = ? AND doc_id = ?", (namespace, doc_id))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO chunks (namespace, doc_id, chunk_id, position) VALUES (?, ?, ?, ?)",
+                    [(namespace, doc_id, chunk_id, i) for i, chunk_id in enumerate(chunk_ids)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def drop_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+
+
+_manifests: Optional[ChunkManifests] = None
+_manifests_lock = threading.Lock()
+
+def get_chunk_manifests() -> ChunkManifests:
+    global _manifests
+    if _manifests is None:
+        with _manifests_lock:
+            if _manifests is None:
+                _manifests = ChunkManifests()
+    return _manifests
@@ -0,0 +1,111 @@
+import os
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+
+
+class VectorStore(ABC):
+    """Backend-neutral vector storage used by pineconeService.
+
+    Records are `{"id", "values", "metadata"}` dicts; queries return
+    `{"id", "score", "metadata"}` dicts (plus "values" with include_values)
+    sorted by descending cosine similarity.
+    Async methods default to running the sync ones in a worker thread;
+    backends with native async clients override them.
+    """
+
+    # True when upserted records are queryable as soon as upsert returns;
+    # eventually consistent backends leave it False.
+    read_after_write = False
+
+    @abstractmethod
+    def upsert(self, records: list[dict], namespace: str, batch_size: int = 100) -> int:
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        vector: list[float],
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[dict] = None,
+        include_values: bool = False,
+    ) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def fetch_ids(self, ids: list[str], namespace: str) -> set[str]:
+        """Return the subset of `ids` currently stored in `namespace`."""
+
+    @abstractmethod
+    def fetch_vectors(self, ids: list[str], namespace: str) -> dict[str, np.ndarray]:
+        """Stored vectors of those `ids` present in `namespace`, by id."""
+
+    @abstractmethod
+    def delete_ids(self, ids: list[str], namespace: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str) -> None:
+        ...
+
+    def warm_up(self) -> None:
+        """Open connections / load state ahead of the first request."""
+
+    async def upsert_async(self, records: list[dict], namespace: str, batch_size: int = 100) -> int:
+        return await asyncio.to_thread(self.upsert, records, namespace, batch_size)
+
+    async def query_async(
+        self,
+        vector: list[float],
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[dict] = None,
+        include_values: bool = False,
+    ) -> list[dict]:
+        return await asyncio.to_thread(self.query, vector, top_k, namespace, metadata_filter, include_values)
+
+    async def fetch_ids_async(self, ids: list[str], namespace: str) -> set[str]:
+        return await asyncio.to_thread(self.fetch_ids, ids, namespace)
+
+    async def fetch_vectors_async(self, ids: list[str], namespace: str) -> dict[str, np.ndarray]:
+        return await asyncio.to_thread(self.fetch_vectors, ids, namespace)
+
+    async def delete_ids_async(self, ids: list[str], namespace: str) -> None:
+        await asyncio.to_thread(self.delete_ids, ids, namespace)
+
+    async def delete_namespace_async(self, namespace: str) -> None:
+        await asyncio.to_thread(self.delete_namespace, namespace)
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide store selected by VECTOR_STORE (pinecone | local)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store(VECTOR_STORE)
+    return _store
+
+def set_vector_store(store: Optional[VectorStore]) -> None:
+    """Swap the process-wide store, e.g. to run benchmarks against a local backend."""
+    global _store
+    with _store_lock:
+        _store = store
+
+def _create_store(kind: str) -> VectorStore:
+    if kind == "local":
+        from .localStore import LocalVectorStore
+        return LocalVectorStore()
+    if kind == "pinecone":
+        from src.modules.pinecone.pineconeStore import PineconeVectorStore
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE '{kind}', expected 'pinecone' or 'local'")
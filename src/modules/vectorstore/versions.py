@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+NAMESPACE_VERSIONS_PATH = os.getenv("NAMESPACE_VERSIONS_PATH", ".cache/namespace_versions.sqlite3")
+
+
+class NamespaceVersions:
+    """Monotonic per-namespace write counters.
+
+    pineconeService bumps a namespace on every upsert and delete; caches of
+    anything derived from a namespace's contents store the version they saw
+    and treat a different current version as invalidation. Kept in SQLite so
+    every worker process sees the others' writes.
+    """
+
+    def __init__(self, path: str = NAMESPACE_VERSIONS_PATH):
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+
+    def get(self, namespace: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM versions WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO versions (namespace, version) VALUES (?, 0)", (namespace,)
+                )
+                self._conn.execute("UPDATE versions SET version = version + 1 WHERE namespace = ?", (namespace,))
+                version = self._conn.execute(
+                    "SELECT version FROM versions WHERE namespace = ?", (namespace,)
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return version
+
+
+_versions: Optional[NamespaceVersions] = None
+_versions_lock = threading.Lock()
+
+def get_namespace_versions() -> NamespaceVersions:
+    global _versions
+    if _versions is None:
+        with _versions_lock:
+            if _versions is None:
+                _versions = NamespaceVersions()
+    return _versions
@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+from typing import Optional
+
+import numpy as np
+
+from .filters import matches_filter
+
+# Records older than this are assumed indexed even if nobody confirmed them.
+WRITE_BUFFER_TTL_S = float(os.getenv("WRITE_BUFFER_TTL_S", "300"))
+# Oldest records are dropped past this many per namespace; they are the
+# likeliest to be indexed already, and searching the buffer is a full scan.
+WRITE_BUFFER_MAX_PER_NAMESPACE = int(os.getenv("WRITE_BUFFER_MAX_PER_NAMESPACE", "5000"))
+
+
+class WriteBuffer:
+    """Recently upserted records that an eventually consistent index may not serve yet.
+
+    pineconeService adds every upsert here and searches the buffer next to
+    the index, so a query issued right after an upsert sees the new chunks.
+    Entries leave once fetch_ids confirms them, when they are deleted, or
+    after `ttl` seconds; every add sweeps expired entries from all
+    namespaces, and each namespace keeps at most `max_per_namespace`.
+    """
+
+    def __init__(self, ttl: float = WRITE_BUFFER_TTL_S, max_per_namespace: int = WRITE_BUFFER_MAX_PER_NAMESPACE):
+        self.ttl = ttl
+        self.max_per_namespace = max_per_namespace
+        self._lock = threading.Lock()
+        # namespace -> id -> (expires, unit vector, metadata), oldest first
+        self._namespaces: dict[str, dict[str, tuple[float, np.ndarray, dict]]] = {}
+
+    def _expire(self, now: float) -> None:
+        # Caller holds self._lock. Entries are kept in insertion order with a
+        # fixed ttl, so expired ones are always at the front.
+        for namespace in list(self._namespaces):
+            entries = self._namespaces[namespace]
+            while entries:
+                id_ = next(iter(entries))
+                if entries[id_][0] >= now:
+                    break
+                del entries[id_]
+            if not entries:
+                del self._namespaces[namespace]
+
+    def add(self, records: list[dict], namespace: str) -> None:
+        if not records:
+            return
+        matrix = np.asarray([r["values"] for r in records], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        now = time.monotonic()
+        expires = now + self.ttl
+        with self._lock:
+            self._expire(now)
+            entries = self._namespaces.setdefault(namespace, {})
+            for record, vec in zip(records, matrix):
+                # Re-insert so the entry moves to the back with its new expiry.
+                entries.pop(record["id"], None)
+                entries[record["id"]] = (expires, vec, record.get("metadata") or {})
+            while len(entries) > self.max_per_namespace:
+                del entries[next(iter(entries))]
+
+    def forget(self, ids, namespace: str) -> None:
+        """Drop records the index now serves itself, or that were deleted."""
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries:
+                return
+            for id_ in ids:
+                entries.pop(id_, None)
+            if not entries:
+                del self._namespaces[namespace]
+
+    def drop_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+
+    def vectors(self, ids, namespace: str) -> dict[str, np.ndarray]:
+        """Buffered (unit) vectors of those `ids` still held for `namespace`."""
+        with self._lock:
+            entries = self._namespaces.get(namespace) or {}
+            return {id_: entries[id_][1] for id_ in ids if id_ in entries}
+
+    def pending(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._namespaces.get(namespace) or {})
+
+    def search(
+        self,
+        vector: list[float],
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[dict] = None,
+        include_values: bool = False,
+    ) -> list[dict]:
+        """Exact cosine search over the buffered records of `namespace`."""
+        with self._lock:
+            self._expire(time.monotonic())
+            entries = self._namespaces.get(namespace)
+            if not entries:
+                return []
+            candidates = [
+                (id_, vec, meta) for id_, (_, vec, meta) in entries.items()
+                if matches_filter(meta, metadata_filter)
+            ]
+        if not candidates:
+            return []
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+        scores = np.stack([vec for _, vec, _ in candidates]) @ q
+        order = np.argsort(-scores)[:top_k]
+        hits = []
+        for i in order:
+            hit = {"id": candidates[i][0], "score": float(scores[i]), "metadata": candidates[i][2]}
+            if include_values:
+                hit["values"] = candidates[i][1]
+            hits.append(hit)
+        return hits
+
+
+def merge_hits(index_hits: list[dict], buffered_hits: list[dict], top_k: int) -> list[dict]:
+    """Union of index and buffer hits by id, best score first, cut to top_k."""
+    if not buffered_hits:
+        return index_hits
+    by_id = {hit["id"]: hit for hit in buffered_hits}
+    by_id.update((hit["id"], hit) for hit in index_hits)
+    return sorted(by_id.values(), key=lambda hit: hit["score"], reverse=True)[:top_k]
+
+
+write_buffer = WriteBuffer()
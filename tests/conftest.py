@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# Point every on-disk cache at a scratch directory before any src module
+# reads its path, and keep the vector store in-process.
+_SCRATCH = tempfile.mkdtemp(prefix="analyzer-tests-")
+for name, value in {
+    "VECTOR_STORE": "local",
+    "LOCAL_VECTOR_DIR": os.path.join(_SCRATCH, "vectors"),
+    "EMBEDDING_CACHE_PATH": os.path.join(_SCRATCH, "embeddings.sqlite3"),
+    "NAMESPACE_VERSIONS_PATH": os.path.join(_SCRATCH, "namespace_versions.sqlite3"),
+    "CHUNK_MANIFESTS_PATH": os.path.join(_SCRATCH, "chunk_manifests.sqlite3"),
+    "LEXICAL_INDEX_PATH": os.path.join(_SCRATCH, "lexical.sqlite3"),
+    "OPENAI_RATE_LIMIT_DB": os.path.join(_SCRATCH, "openai_ratelimits.sqlite3"),
+    "INGEST_JOBS_DB": os.path.join(_SCRATCH, "ingest_jobs.sqlite3"),
+    "PDF_CACHE_DIR": os.path.join(_SCRATCH, "pdfs"),
+}.items():
+    os.environ[name] = value
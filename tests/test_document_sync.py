@@ -0,0 +1,131 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from src.modules.pinecone import pineconeService
+from src.modules.pinecone.pineconeService import DocumentSync, content_id, upsert_chunks
+from src.modules.vectorstore.localStore import LocalVectorStore
+from src.modules.vectorstore.manifests import ChunkManifests
+from src.modules.vectorstore.vectorStore import set_vector_store
+
+NAMESPACE = "papers"
+DOC = "arxiv:2401.00001"
+
+
+@pytest.fixture
+def manifests(tmp_path, monkeypatch):
+    manifests = ChunkManifests(str(tmp_path / "manifests.sqlite3"))
+    monkeypatch.setattr(pineconeService, "get_chunk_manifests", lambda: manifests)
+    return manifests
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "vectors"))
+    set_vector_store(store)
+    yield store
+    set_vector_store(None)
+
+
+def _ingest(chunks):
+    """What processor_tool does: admit, upsert the new chunks, commit."""
+    sync = DocumentSync(NAMESPACE, DOC)
+    new = [(id_, chunk) for id_, chunk in ((sync.admit(c), c) for c in chunks) if id_]
+    if new:
+        vectors = np.random.default_rng(len(new)).random((len(new), 8), dtype=np.float32)
+        upsert_chunks([c for _, c in new], vectors, NAMESPACE, ids=[i for i, _ in new])
+    return sync, [i for i, _ in new], sync.commit()
+
+
+def test_first_ingest_admits_every_distinct_chunk(manifests, store):
+    _, written, stale = _ingest(["alpha", "beta", "alpha"])
+    ids = [content_id(NAMESPACE, DOC, c) for c in ("alpha", "beta")]
+    assert written == ids
+    assert stale == []
+    assert manifests.get(NAMESPACE, DOC) == ids
+    assert store.fetch_ids(ids, NAMESPACE) == set(ids)
+
+
+def test_reingest_upserts_only_changes_and_deletes_removed_chunks(manifests, store):
+    _ingest(["alpha", "beta", "gamma"])
+    sync, written, stale = _ingest(["alpha", "gamma", "delta"])
+
+    assert written == [content_id(NAMESPACE, DOC, "delta")]
+    assert sync.skipped == 2
+    assert stale == [content_id(NAMESPACE, DOC, "beta")]
+    assert manifests.get(NAMESPACE, DOC) == [content_id(NAMESPACE, DOC, c) for c in ("alpha", "gamma", "delta")]
+    assert store.fetch_ids(stale, NAMESPACE) == set()
+
+
+def test_unchanged_document_writes_nothing(manifests, store):
+    _ingest(["alpha", "beta"])
+    sync, written, stale = _ingest(["alpha", "beta"])
+    assert (written, stale, sync.skipped) == ([], [], 2)
+
+
+def test_abort_records_what_was_written_and_keeps_old_chunks(manifests, store):
+    _ingest(["alpha", "beta"])
+    sync = DocumentSync(NAMESPACE, DOC)
+    admitted = [sync.admit(c) for c in ("alpha", "gamma", "delta")]
+    assert admitted[0] is None
+    # Only "gamma" made it to the index before the run failed.
+    sync.abort([admitted[1]])
+
+    kept = set(manifests.get(NAMESPACE, DOC))
+    assert kept == {content_id(NAMESPACE, DOC, c) for c in ("alpha", "beta", "gamma")}
+    # The retry skips what the failed run wrote and cleans up what the document lost.
+    sync, written, stale = _ingest(["alpha", "gamma", "delta"])
+    assert written == [content_id(NAMESPACE, DOC, "delta")]
+    assert stale == [content_id(NAMESPACE, DOC, "beta")]
+
+
+def test_manifests_are_per_document_and_namespace(manifests):
+    manifests.replace("a", "doc", ["1", "2"])
+    manifests.replace("b", "doc", ["3"])
+    manifests.replace("a", "other", ["4"])
+    assert manifests.get("a", "doc") == ["1", "2"]
+    manifests.drop_namespace("a")
+    assert manifests.get("a", "doc") == [] and manifests.get("a", "other") == []
+    assert manifests.get("b", "doc") == ["3"]
+
+
+def test_processor_tool_aborts_when_embedding_fails(manifests, store, monkeypatch):
+    tool = importlib.import_module("src.agents.tools.processor_tool")
+
+    _ingest(["alpha", "beta"])
+    before = manifests.get(NAMESPACE, DOC)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("embeddings unavailable")
+
+    monkeypatch.setattr(tool, "get_embeddings", fail)
+    result = tool.processor_tool("gamma", namespace=NAMESPACE, doc_id=DOC)
+
+    assert result == {"ok": False, "error": "embeddings unavailable"}
+    # Nothing was written, so the manifest and the old chunks are untouched.
+    assert set(manifests.get(NAMESPACE, DOC)) == set(before)
+    assert store.fetch_ids(before, NAMESPACE) == set(before)
+
+
+def test_processor_tool_without_doc_id_does_not_duplicate_resubmitted_text(manifests, store, monkeypatch):
+    tool = importlib.import_module("src.agents.tools.processor_tool")
+    monkeypatch.setattr(
+        tool, "get_embeddings",
+        lambda chunks, **kwargs: np.random.default_rng(0).random((len(chunks), 8), dtype=np.float32),
+    )
+
+    first = tool.processor_tool("some pasted notes", namespace=NAMESPACE)
+    again = tool.processor_tool("some pasted notes", namespace=NAMESPACE)
+
+    assert first["ok"] and first["upserted"] == 1
+    assert again["doc_id"] == first["doc_id"]
+    assert (again["upserted"], again["skipped"]) == (0, 1)
+
+
+def test_default_doc_id_prefers_source_metadata():
+    tool = importlib.import_module("src.agents.tools.processor_tool")
+    assert tool.default_doc_id("x", {"doc_id": "mine"}) == "mine"
+    assert tool.default_doc_id("x", {"arxiv_id": "2401.00001v3"}) == DOC
+    assert tool.default_doc_id("x", {"url": "https://example.org/a"}) == "url:https://example.org/a"
+    assert tool.default_doc_id("x") == tool.default_doc_id("x", {}) != tool.default_doc_id("y")
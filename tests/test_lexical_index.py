@@ -0,0 +1,94 @@
+import pytest
+
+from src.modules.vectorstore import lexicalIndex
+from src.modules.vectorstore.lexicalIndex import LexicalIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+
+
+def _ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_tokenize_keeps_identifiers_whole_and_in_parts():
+    terms = tokenize("How does ImageNet-1k compare in arXiv:2401.12345v2?")
+    assert "imagenet-1k" in terms and "imagenet" in terms and "1k" in terms
+    assert "2401.12345" in terms
+    assert "how" not in terms and "does" not in terms
+
+
+def test_search_ranks_by_bm25_and_reports_coverage(index):
+    index.add("ns", [
+        ("a", {"text": "sparse attention for long documents", "title": "A"}),
+        ("b", {"text": "attention attention attention", "title": "B"}),
+        ("c", {"text": "convolutional networks for images", "title": "C"}),
+    ])
+    hits = index.search("sparse attention", 5, "ns")
+    assert _ids(hits) == ["a", "b"]
+    assert hits[0]["coverage"] == 1.0 and hits[1]["coverage"] == 0.5
+    assert hits[0]["metadata"]["title"] == "A"
+    assert index.search("attention", 5, "other") == []
+
+
+def test_metadata_filter(index):
+    index.add("ns", [("a", {"text": "attention", "year": 2020}), ("b", {"text": "attention", "year": 2024})])
+    assert _ids(index.search("attention", 5, "ns", {"year": 2024})) == ["b"]
+
+
+def test_readding_an_id_replaces_its_text(index):
+    index.add("ns", [("a", {"text": "dropout regularization"})])
+    index.add("ns", [("a", {"text": "batch normalization"})])
+    assert index.search("dropout", 5, "ns") == []
+    assert _ids(index.search("normalization", 5, "ns")) == ["a"]
+
+
+def test_search_after_removing_newest_document(index):
+    index.add("ns", [("a", {"text": "alpha"}), ("b", {"text": "beta"}), ("c", {"text": "gamma"})])
+    index.remove("ns", ["c"])
+
+    assert index.search("gamma", 5, "ns") == []
+    assert _ids(index.search("beta", 5, "ns")) == ["b"]
+    # A fresh instance loads the namespace from disk rather than memory.
+    reopened = LexicalIndex(index.path)
+    assert reopened.search("gamma", 5, "ns") == []
+    assert sorted(_ids(reopened.search("alpha beta", 5, "ns"))) == ["a", "b"]
+
+
+def test_compaction_preserves_results(index, monkeypatch):
+    monkeypatch.setattr(lexicalIndex, "_MAX_SEGMENTS", 4)
+    for i in range(12):
+        index.add("ns", [(f"d{i}", {"text": f"shared term{i} " + "filler " * i})])
+    index.remove("ns", ["d0", "d11"])
+    before = index.search("shared term3 term7", 20, "ns")
+
+    # Twelve appends would leave twelve segments without compaction.
+    _, _, segments = index._state("ns")
+    assert segments <= 4
+    assert "d0" not in _ids(before) and "d11" not in _ids(before)
+
+    reopened = LexicalIndex(index.path)
+    after = reopened.search("shared term3 term7", 20, "ns")
+    assert _ids(after) == _ids(before)
+    assert [h["score"] for h in after] == pytest.approx([h["score"] for h in before])
+
+
+def test_compaction_drops_dead_documents(index, monkeypatch):
+    monkeypatch.setattr(lexicalIndex, "_MIN_COMPACT_DOCS", 4)
+    index.add("ns", [(f"d{i}", {"text": "common"}) for i in range(6)])
+    index.remove("ns", ["d0", "d1", "d2", "d3"])
+    _, next_doc, segments = index._state("ns")
+    assert (next_doc, segments) == (2, 1)
+    assert sorted(_ids(index.search("common", 10, "ns"))) == ["d4", "d5"]
+    index.add("ns", [("d6", {"text": "common"})])
+    assert sorted(_ids(LexicalIndex(index.path).search("common", 10, "ns"))) == ["d4", "d5", "d6"]
+
+
+def test_drop_namespace(index):
+    index.add("ns", [("a", {"text": "alpha"})])
+    index.add("keep", [("a", {"text": "alpha"})])
+    index.drop_namespace("ns")
+    assert index.search("alpha", 5, "ns") == []
+    assert _ids(index.search("alpha", 5, "keep")) == ["a"]
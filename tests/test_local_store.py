@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.modules.vectorstore import localStore
+from src.modules.vectorstore.localStore import LocalVectorStore
+
+NAMESPACE = "papers"
+
+
+def _records(ids, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).random((len(ids), dim), dtype=np.float32)
+    return [{"id": id_, "values": v, "metadata": {"n": i}} for i, (id_, v) in enumerate(zip(ids, vectors))]
+
+
+def test_writes_from_another_process_are_seen(tmp_path):
+    # Two stores on one root stand in for two workers.
+    a = LocalVectorStore(str(tmp_path))
+    b = LocalVectorStore(str(tmp_path))
+    records = _records([f"d{i}" for i in range(5)])
+
+    a.upsert(records[:3], NAMESPACE)
+    assert b.fetch_ids(["d0", "d1", "d2"], NAMESPACE) == {"d0", "d1", "d2"}
+
+    # b has the namespace loaded now; a's next writes must still reach it.
+    a.upsert(records[3:], NAMESPACE)
+    a.delete_ids(["d0"], NAMESPACE)
+    assert b.fetch_ids([r["id"] for r in records], NAMESPACE) == {"d1", "d2", "d3", "d4"}
+    hits = b.query(records[4]["values"], top_k=1, namespace=NAMESPACE)
+    assert hits[0]["id"] == "d4"
+
+    # b writing on top of a's changes keeps both.
+    b.upsert(_records(["e0"], seed=1), NAMESPACE)
+    assert a.fetch_ids(["d4", "e0"], NAMESPACE) == {"d4", "e0"}
+
+
+def test_recreated_namespace_is_not_mistaken_for_the_cached_one(tmp_path):
+    a = LocalVectorStore(str(tmp_path))
+    b = LocalVectorStore(str(tmp_path))
+    a.upsert(_records(["old"]), NAMESPACE)
+    assert b.fetch_ids(["old"], NAMESPACE) == {"old"}
+
+    a.delete_namespace(NAMESPACE)
+    a.upsert(_records(["new"], seed=1), NAMESPACE)
+    assert b.fetch_ids(["old", "new"], NAMESPACE) == {"new"}
+
+
+@pytest.mark.skipif(localStore.hnswlib is None, reason="hnswlib not installed")
+def test_deletes_keep_the_ann_index_in_step(tmp_path):
+    store = LocalVectorStore(str(tmp_path), ann_threshold=10)
+    records = _records([f"d{i}" for i in range(40)])
+    store.upsert(records, NAMESPACE)
+    store.query(records[0]["values"], top_k=1, namespace=NAMESPACE)
+    ann = store._namespaces[NAMESPACE].ann
+    assert ann is not None
+
+    deleted = {f"d{i}" for i in range(0, 40, 3)}
+    store.delete_ids(sorted(deleted), NAMESPACE)
+
+    assert store._namespaces[NAMESPACE].ann is ann
+    for record in records:
+        ids = {h["id"] for h in store.query(record["values"], top_k=40, namespace=NAMESPACE)}
+        assert ids == {r["id"] for r in records} - deleted
+        if record["id"] not in deleted:
+            assert store.query(record["values"], top_k=1, namespace=NAMESPACE)[0]["id"] == record["id"]
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import httpx
+
+from src.agents.tools.pdf_cache import PdfCache
+
+PDF = b"%PDF-1.4 synthetic"
+
+
+def _transport(calls):
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, content=PDF)
+    return httpx.MockTransport(handler)
+
+
+def test_concurrent_fetches_download_once_and_release_fill_locks(tmp_path):
+    cache, calls = PdfCache(str(tmp_path)), []
+    with httpx.Client(transport=_transport(calls)) as client:
+        threads = [threading.Thread(target=cache.fetch, args=("2401.00001", "http://arxiv/pdf", client)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert cache.fetch("2401.00001", "http://arxiv/pdf", client) == PDF
+    assert len(calls) == 1
+    assert cache._fill_locks == {}
+
+
+def test_async_fill_locks_are_released(tmp_path):
+    cache, calls = PdfCache(str(tmp_path)), []
+
+    async def main():
+        async with httpx.AsyncClient(transport=_transport(calls)) as client:
+            results = await asyncio.gather(*(
+                cache.fetch_async(f"2401.0000{i % 2}", "http://arxiv/pdf", client) for i in range(8)
+            ))
+        assert results == [PDF] * 8
+        return dict(cache._async_fill_locks[asyncio.get_running_loop()])
+
+    assert asyncio.run(main()) == {}
+    assert len(calls) == 2
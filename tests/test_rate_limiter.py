@@ -0,0 +1,101 @@
+import types
+
+import pytest
+
+from src.modules.openai import rateLimiter
+from src.modules.openai.rateLimiter import RateLimiter, parse_duration, retry_delay
+
+LIMITS = {"chat": (60.0, 6000.0), "embeddings": (120.0, 1000.0)}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen wall clock the limiter reads; tests advance it by hand."""
+    clock = types.SimpleNamespace(now=1_000_000.0, slept=[])
+    fake = types.SimpleNamespace(time=lambda: clock.now, sleep=clock.slept.append)
+    monkeypatch.setattr(rateLimiter, "time", fake)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    return RateLimiter(str(tmp_path / "ratelimits.sqlite3"), LIMITS)
+
+
+def test_reserve_is_free_within_quota(limiter):
+    assert [limiter.reserve("chat:gpt", 100) for _ in range(60)] == [0.0] * 60
+
+
+def test_reserve_goes_negative_and_queues_callers(limiter):
+    for _ in range(60):
+        limiter.reserve("chat:gpt", 0)
+    # 60 rpm refills one request per second; each extra caller waits one more.
+    assert limiter.reserve("chat:gpt", 0) == pytest.approx(1.0)
+    assert limiter.reserve("chat:gpt", 0) == pytest.approx(2.0)
+
+
+def test_token_bucket_limits_independently(limiter):
+    assert limiter.reserve("embeddings:small", 1000) == 0.0
+    # 1000 tpm: 500 more tokens take 30 s to refill.
+    assert limiter.reserve("embeddings:small", 500) == pytest.approx(30.0)
+
+
+def test_oversized_request_costs_at_most_one_minute_of_tokens(limiter):
+    assert limiter.reserve("embeddings:small", 50_000) == 0.0
+    assert limiter.reserve("embeddings:small", 1) == pytest.approx(0.06)
+
+
+def test_buckets_refill_over_time(limiter, clock):
+    for _ in range(61):
+        limiter.reserve("chat:gpt", 0)
+    clock.now += 2.0
+    assert limiter.reserve("chat:gpt", 0) == 0.0
+
+
+def test_workers_share_one_quota(tmp_path, clock):
+    path = str(tmp_path / "shared.sqlite3")
+    first, second = RateLimiter(path, LIMITS), RateLimiter(path, LIMITS)
+    for _ in range(30):
+        first.reserve("chat:gpt", 0)
+        second.reserve("chat:gpt", 0)
+    assert first.reserve("chat:gpt", 0) == pytest.approx(1.0)
+
+
+def test_throttled_pauses_the_bucket(limiter, clock):
+    assert limiter.throttled("chat:gpt", {"retry-after-ms": "1500"}) == pytest.approx(1.5)
+    assert limiter.reserve("chat:gpt", 0) == pytest.approx(1.5)
+    clock.now += 2.0
+    # The pause is over, but the 429 also emptied the request bucket.
+    assert limiter.reserve("chat:gpt", 0) == 0.0
+
+
+def test_throttled_without_headers_backs_off_exponentially(limiter):
+    delays = [limiter.throttled("chat:gpt", {}, attempt) for attempt in range(8)]
+    assert 0.25 <= delays[0] <= 0.5
+    assert 2.0 <= delays[3] <= 4.0
+    assert all(d <= 20.0 for d in delays)
+
+
+def test_observe_adopts_provider_limits(limiter):
+    limiter.observe("chat:gpt", {
+        "x-ratelimit-limit-requests": "600",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "6000",
+    })
+    # Nothing left, now refilling at 600 rpm: one request per 0.1 s.
+    assert limiter.reserve("chat:gpt", 0) == pytest.approx(0.1)
+
+
+def test_acquire_sleeps_for_the_reserved_delay(limiter, clock):
+    limiter.throttled("chat:gpt", {"retry-after": "3"})
+    limiter.acquire("chat:gpt", 0)
+    assert clock.slept == [pytest.approx(3.0)]
+
+
+def test_header_parsing():
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("soon") is None
+    assert retry_delay({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "2m"}) == 120.0
+    assert retry_delay({}) is None
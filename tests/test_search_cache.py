@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from src.agents.tools.search_cache import SearchCache
+
+
+def test_concurrent_lookups_share_one_fetch():
+    cache, calls = SearchCache(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["paper"]
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch_async("q", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == [["paper"]] * 5
+    assert len(calls) == 1
+    assert cache.get_or_fetch("q", lambda: pytest.fail("should be cached")) == ["paper"]
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    cache = SearchCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("arXiv 503")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch_async("q", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(main())] == ["arXiv 503"] * 3
+    assert cache.get_or_fetch("q", lambda: ["retry"]) == ["retry"]
+
+
+def test_cancelled_leader_hands_the_fetch_to_a_waiter():
+    cache, started = SearchCache(), []
+
+    async def fetch():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return ["paper"]
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_fetch_async("q", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch_async("q", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == ["paper"]
+    assert len(started) == 2
+
+
+def test_cancelled_waiter_leaves_the_shared_fetch_alone():
+    cache = SearchCache()
+
+    async def fetch():
+        await asyncio.sleep(0.03)
+        return ["paper"]
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_fetch_async("q", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch_async("q", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == ["paper"]
@@ -0,0 +1,44 @@
+import types
+
+import numpy as np
+import pytest
+
+from src.modules.vectorstore import writeBuffer
+from src.modules.vectorstore.writeBuffer import WriteBuffer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(writeBuffer, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _records(*ids):
+    return [{"id": id_, "values": np.eye(4, dtype=np.float32)[i % 4], "metadata": {"text": id_}} for i, id_ in enumerate(ids)]
+
+
+def test_add_sweeps_expired_entries_of_every_namespace(clock):
+    buffer = WriteBuffer(ttl=10)
+    buffer.add(_records("a", "b"), "ingest")
+    clock.now += 11
+    buffer.add(_records("c"), "other")
+    assert buffer.pending("ingest") == 0
+    assert buffer.pending("other") == 1
+
+
+def test_readding_refreshes_expiry(clock):
+    buffer = WriteBuffer(ttl=10)
+    buffer.add(_records("a", "b"), "ns")
+    clock.now += 6
+    buffer.add(_records("a"), "ns")
+    clock.now += 6
+    buffer.add(_records("c"), "ns")
+    assert sorted(h["id"] for h in buffer.search([1, 0, 0, 0], 10, "ns")) == ["a", "c"]
+
+
+def test_namespace_is_capped_oldest_first(clock):
+    buffer = WriteBuffer(ttl=10, max_per_namespace=3)
+    buffer.add(_records("a", "b", "c", "d"), "ns")
+    buffer.add(_records("e"), "ns")
+    assert sorted(buffer.vectors(["a", "b", "c", "d", "e"], "ns")) == ["c", "d", "e"]